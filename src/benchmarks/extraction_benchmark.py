@@ -0,0 +1,92 @@
+# Offline benchmark for the crawler's HTML extraction on fixture pages
+# Checks that the lxml path extracts exactly what the BeautifulSoup path does, and times both
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (src_dir, os.path.join(src_dir, 'crawlers')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from benchmarks.synthetic_corpus import generate_site
+
+
+def load_fixtures(fixtures_dir, base_url):
+    """URL -> HTML for saved pages (*.html), URL taken from the file name"""
+    pages = {}
+    for name in sorted(os.listdir(fixtures_dir)):
+        if name.endswith(('.html', '.htm')):
+            with open(os.path.join(fixtures_dir, name), 'r', encoding='utf-8') as f:
+                pages[f"{base_url.rstrip('/')}/{os.path.splitext(name)[0]}"] = f.read()
+    return pages
+
+
+def run_extraction(crawler, pages, rounds):
+    """(outputs, seconds per page) for one extraction path"""
+    outputs = {}
+    # The extractor logs every page, keep that out of the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for url, html in pages.items():
+                outputs[url] = crawler.parse_html(html, url)
+        elapsed = time.perf_counter() - start
+    return outputs, elapsed / (rounds * len(pages))
+
+
+def first_difference(expected, actual):
+    """Short description of where two extractions differ"""
+    (expected_content, expected_links), (content, links) = expected, actual
+    if expected_links != links:
+        return f"links: {sorted(expected_links ^ links)[:3]}"
+    if (expected_content is None) != (content is None):
+        return f"content: {expected_content is None} vs {content is None}"
+    for key in sorted(set(expected_content) | set(content)):
+        if expected_content.get(key) != content.get(key):
+            return f"{key}: {str(expected_content.get(key))[:80]!r} vs {str(content.get(key))[:80]!r}"
+    return "?"
+
+
+def main():
+    from improved_docs_crawler import ImprovedGitBookCrawler, lxml
+    
+    parser = argparse.ArgumentParser(description="Compare and time the crawler's HTML extraction paths")
+    parser.add_argument('--pages', type=int, default=200, help="Synthetic pages to generate")
+    parser.add_argument('--fixtures', help="Directory of saved .html pages to use instead")
+    parser.add_argument('--base-url', default="https://docs.example.com", help="Site the fixtures come from")
+    parser.add_argument('--rounds', type=int, default=3, help="Passes over the pages per path")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    if lxml is None:
+        print("lxml is not installed, nothing to compare (pip install lxml)")
+        sys.exit(1)
+    
+    pages = load_fixtures(args.fixtures, args.base_url) if args.fixtures else generate_site(args.pages, args.seed)
+    size_mb = sum(len(html.encode('utf-8')) for html in pages.values()) / 1024 / 1024
+    print(f"{len(pages)} pages, {size_mb:.1f} MB of HTML")
+    
+    baseline, baseline_time = run_extraction(ImprovedGitBookCrawler(args.base_url, fast_extract=False), pages, args.rounds)
+    fast, fast_time = run_extraction(ImprovedGitBookCrawler(args.base_url, fast_extract=True), pages, args.rounds)
+    
+    mismatches = [url for url in pages if baseline[url] != fast[url]]
+    print(f"{'path':<22} {'ms/page':>8} {'pages/s':>8}")
+    print(f"{'html.parser (bs4)':<22} {baseline_time * 1000:>8.2f} {1 / baseline_time:>8.0f}")
+    print(f"{'lxml single pass':<22} {fast_time * 1000:>8.2f} {1 / fast_time:>8.0f}")
+    print(f"Speedup: {baseline_time / fast_time:.1f}x")
+    
+    if mismatches:
+        print(f"\n✗ {len(mismatches)} of {len(pages)} pages differ, first ones:")
+        for url in mismatches[:5]:
+            print(f"  {url}: {first_difference(baseline[url], fast[url])}")
+        sys.exit(1)
+    print(f"✓ Identical content and links on all {len(pages)} pages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# Local stand-in for the Gemini REST API with controllable latency and failures
+# Point the bot at it with GEMINI_API_BASE=http://127.0.0.1:8089
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeGeminiServer:
+    """
+    Answers generateContent and streamGenerateContent (alt=sse)
+    Each request takes latency_ms, or slow_ms for a slow_rate fraction of
+    requests, and fails with HTTP 503 for an error_rate fraction. All of it
+    can be changed while the server runs with configure()
+    """
+    
+    def __init__(self, host='127.0.0.1', port=8089, latency_ms=300, jitter_ms=50, slow_rate=0.0,
+                 slow_ms=3000, error_rate=0.0, seed=0):
+        self.settings = {}
+        self.configure(latency_ms=latency_ms, jitter_ms=jitter_ms, slow_rate=slow_rate,
+                       slow_ms=slow_ms, error_rate=error_rate)
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+    
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+    
+    def configure(self, **settings):
+        self.settings.update(settings)
+    
+    def _plan(self):
+        """(seconds to wait, fail?) for the next request"""
+        with self._lock:
+            self.requests += 1
+            s = self.settings
+            if self._random.random() < s['slow_rate']:
+                latency = s['slow_ms']
+            else:
+                latency = max(0.0, self._random.gauss(s['latency_ms'], s['jitter_ms']))
+            return latency / 1000, self._random.random() < s['error_rate']
+    
+    @staticmethod
+    def _payload(text, prompt=None):
+        data = {'candidates': [{'content': {'role': 'model', 'parts': [{'text': text}]}}]}
+        if prompt is not None:
+            data['usageMetadata'] = {'promptTokenCount': len(prompt.split())}
+        return data
+    
+    @staticmethod
+    def answer_for(prompt):
+        question = prompt.rsplit('Question:', 1)[-1].split('\n')[0].strip() or prompt[-60:]
+        return f"This is a fake answer. You asked: {question} It comes from the local test server."
+    
+    def _handler_class(self):
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                prompt = ''.join(part.get('text', '') for content in body.get('contents', [])
+                                 for part in content.get('parts', []))
+                delay, fail = server._plan()
+                try:
+                    if ':streamGenerateContent' in self.path:
+                        self._stream(prompt, delay, fail)
+                    elif ':generateContent' in self.path:
+                        time.sleep(delay)
+                        if fail:
+                            return self._error()
+                        self._send_json(server._payload(server.answer_for(prompt), prompt))
+                    else:
+                        self.send_error(404)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client stopped waiting (deadline passed or a hedge won)
+            
+            def _error(self):
+                self._send_json({'error': {'code': 503, 'message': 'fake outage', 'status': 'UNAVAILABLE'}}, 503)
+            
+            def _send_json(self, data, status=200):
+                raw = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+            
+            def _stream(self, prompt, delay, fail):
+                # Time to first chunk is the request latency, the rest trickles out
+                time.sleep(delay)
+                if fail:
+                    return self._error()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.end_headers()
+                words = server.answer_for(prompt).split(' ')
+                pieces = [' '.join(words[i:i + 4]) + ' ' for i in range(0, len(words), 4)]
+                for i, piece in enumerate(pieces):
+                    last = i == len(pieces) - 1
+                    data = server._payload(piece, prompt if last else None)
+                    self.wfile.write(f"data: {json.dumps(data)}\r\n\r\n".encode('utf-8'))
+                    self.wfile.flush()
+                    if not last:
+                        time.sleep(0.02)
+                self.close_connection = True
+        
+        return Handler
+    
+    def start(self):
+        """Serve on a background thread"""
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+    
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Gemini REST API for local testing")
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-ms', type=float, default=300)
+    parser.add_argument('--jitter-ms', type=float, default=50)
+    parser.add_argument('--slow-rate', type=float, default=0.0, help="Fraction of requests that are slow")
+    parser.add_argument('--slow-ms', type=float, default=3000)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Fraction of requests answered with 503")
+    args = parser.parse_args()
+    
+    server = FakeGeminiServer(port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                              slow_rate=args.slow_rate, slow_ms=args.slow_ms, error_rate=args.error_rate)
+    print(f"Fake Gemini API on {server.url} (set GEMINI_API_BASE to use it)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
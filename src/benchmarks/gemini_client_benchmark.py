@@ -0,0 +1,163 @@
+# Offline check of the resilient Gemini client against the local fake server
+# Measures tail latency with and without hedging, and how the circuit breaker handles an outage
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from benchmarks.fake_gemini_server import FakeGeminiServer
+from bot.gemini_client import CircuitBreaker, CircuitOpenError, GeminiClientPool, RestBackend
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def run_calls(pool, calls, concurrency):
+    """(ms each caller waited, answered or not, failed call count)"""
+    def one_call(i):
+        start = time.perf_counter()
+        try:
+            pool.generate(f"Question: how do I configure connector {i}?")
+            ok = True
+        except Exception:
+            ok = False
+        return (time.perf_counter() - start) * 1000, ok
+    
+    with ThreadPoolExecutor(max_workers=concurrency) as callers:
+        results = list(callers.map(one_call, range(calls)))
+    return [ms for ms, _ in results], sum(1 for _, ok in results if not ok)
+
+
+def tail_latency(server, args):
+    print(f"Tail latency: {args.calls} calls, {args.slow_rate:.0%} take {args.slow_ms:.0f} ms, "
+          f"deadline {args.timeout:.1f}s")
+    server.configure(latency_ms=args.latency_ms, slow_rate=args.slow_rate, slow_ms=args.slow_ms, error_rate=0.0)
+    print(f"{'mode':<10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'failed':>7} {'hedged':>7} {'won':>5}")
+    rows = {}
+    for hedge in (False, True):
+        pool = GeminiClientPool(RestBackend(server.url, 'fake-model'), workers=args.concurrency * 2,
+                                timeout=args.timeout, hedge=hedge, hedge_min_delay=0.05,
+                                breaker=CircuitBreaker(failure_threshold=10 ** 6))
+        run_calls(pool, GeminiClientPool.HEDGE_MIN_SAMPLES, args.concurrency)  # Warm up the p95
+        latencies, failed = run_calls(pool, args.calls, args.concurrency)
+        counts = pool.stats()
+        mode = 'hedged' if hedge else 'single'
+        rows[mode] = percentile(latencies, 0.95)
+        print(f"{mode:<10} {percentile(latencies, 0.50):>8.0f} {rows[mode]:>8.0f} "
+              f"{percentile(latencies, 0.99):>8.0f} {failed:>7} {counts['hedged']:>7} {counts['hedge_wins']:>5}")
+        pool.shutdown()
+    return rows['hedged'] < rows['single']
+
+
+def outage(server, args):
+    print("\nOutage: every request fails with 503")
+    server.configure(latency_ms=args.latency_ms, slow_rate=0.0, error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=1.0)
+    pool = GeminiClientPool(RestBackend(server.url, 'fake-model'), timeout=args.timeout, breaker=breaker)
+    before = server.requests
+    fast = []
+    for i in range(20):
+        start = time.perf_counter()
+        try:
+            pool.generate(f"Question: outage {i}")
+        except CircuitOpenError:
+            fast.append((time.perf_counter() - start) * 1000)
+        except Exception:
+            pass
+    sent = server.requests - before
+    print(f"  20 calls: {sent} reached the server, {len(fast)} failed fast "
+          f"(max {max(fast) if fast else 0:.2f} ms), breaker {breaker.state}")
+    
+    server.configure(error_rate=0.0)
+    time.sleep(breaker.reset_timeout)
+    pool.generate("Question: are you back?")
+    print(f"  After recovery: breaker {breaker.state}")
+    pool.shutdown()
+    return sent == breaker.failure_threshold and len(fast) == 20 - sent and breaker.state == 'closed'
+
+
+def streaming(server, args):
+    print("\nStreaming")
+    server.configure(latency_ms=args.latency_ms, slow_rate=0.0, error_rate=0.0)
+    pool = GeminiClientPool(RestBackend(server.url, 'fake-model'), timeout=args.timeout)
+    prompt = "Question: what does streaming do?"
+    chunks = list(pool.stream(prompt))
+    text = ''.join(chunk.text for chunk in chunks).strip()
+    usage = chunks[-1].usage_metadata
+    print(f"  {len(chunks)} chunks, prompt tokens {usage.prompt_token_count if usage else None}")
+    
+    server.configure(latency_ms=args.timeout * 1000 * 2)
+    try:
+        list(pool.stream(prompt))
+        timed_out = False
+    except Exception as e:
+        timed_out = True
+        print(f"  Slow stream: {type(e).__name__}")
+    pool.shutdown()
+    return text == FakeGeminiServer.answer_for(prompt) and usage is not None and timed_out
+
+
+def abandoned_stream(server, args):
+    print("\nAbandoned stream: the half-open trial is a stream closed after one chunk (barge-in)")
+    server.configure(latency_ms=args.latency_ms, slow_rate=0.0, error_rate=1.0)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    pool = GeminiClientPool(RestBackend(server.url, 'fake-model'), timeout=args.timeout, breaker=breaker)
+    try:
+        pool.generate("Question: outage")
+    except Exception:
+        pass
+    
+    server.configure(error_rate=0.0)
+    time.sleep(breaker.reset_timeout)
+    trial = pool.stream("Question: will you be interrupted?")
+    next(trial)
+    trial.close()
+    try:
+        pool.generate("Question: still there?")
+        answered = True
+    except CircuitOpenError as e:
+        answered = False
+        print(f"  Next call: {str(e)}")
+    print(f"  After closing the trial: breaker {breaker.state}, next call {'answered' if answered else 'refused'}")
+    pool.shutdown()
+    return answered and breaker.state == 'closed'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the Gemini client pool against a fake model server")
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=150)
+    parser.add_argument('--slow-rate', type=float, default=0.05)
+    parser.add_argument('--slow-ms', type=float, default=2000)
+    parser.add_argument('--timeout', type=float, default=1.0, help="Per-call deadline in seconds")
+    args = parser.parse_args()
+    
+    server = FakeGeminiServer(port=0, jitter_ms=args.latency_ms / 5).start()
+    try:
+        checks = [
+            ('hedging lowers p95', tail_latency(server, args)),
+            ('breaker fails fast and recovers', outage(server, args)),
+            ('streaming answers and times out', streaming(server, args)),
+            ('abandoned stream releases the breaker', abandoned_stream(server, args)),
+        ]
+    finally:
+        server.stop()
+    
+    print()
+    for name, ok in checks:
+        print(f"{'✓' if ok else '✗'} {name}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
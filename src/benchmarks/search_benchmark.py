@@ -0,0 +1,162 @@
+# Offline benchmark for FastLocalSearcher on synthetic corpora
+# Reports load time, memory, query latency percentiles and top-k overlap between scorers
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from benchmarks.synthetic_corpus import generate_queries, write_corpus
+
+
+def rss_mb():
+    """Current resident set size of this process in MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        # Peak RSS where /proc is missing (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+
+
+def run_config(docs_file, scorer, queries, limit):
+    """
+    One (corpus, scorer) run in a fresh process so RSS is not shared between runs
+    Cold load indexes the JSON and compiles the binary index, warm load memory-maps it
+    """
+    from bot.fast_local_search import FastLocalSearcher
+    
+    index_file = os.path.splitext(docs_file)[0] + f".{scorer}.bin"
+    if os.path.exists(index_file):
+        os.remove(index_file)
+    
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    searcher = FastLocalSearcher(docs_file, scorer=scorer, index_file=index_file)
+    cold_load = time.perf_counter() - start
+    cold_rss = rss_mb() - base_rss
+    searcher.index.close()
+    
+    start = time.perf_counter()
+    searcher = FastLocalSearcher(docs_file, scorer=scorer, index_file=index_file)
+    warm_load = time.perf_counter() - start
+    
+    # Measure ranking, not the query cache
+    searcher.cache.max_size = 0
+    latencies = []
+    top_urls = []
+    for query in queries:
+        start = time.perf_counter()
+        _, citations = searcher.search_docs(query, limit)
+        latencies.append((time.perf_counter() - start) * 1000)
+        top_urls.append(citations)
+    
+    result = {
+        'scorer': searcher.scorer.name,
+        'passages': searcher.index.doc_count,
+        'cold_load_s': cold_load,
+        'warm_load_s': warm_load,
+        'cold_rss_mb': cold_rss,
+        'rss_mb': rss_mb(),
+        'index_mb': os.path.getsize(index_file) / 1024 / 1024 if os.path.exists(index_file) else 0.0,
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': sum(latencies) / len(latencies) if latencies else 0.0,
+        'top_urls': top_urls
+    }
+    searcher.index.close()
+    return result
+
+
+def overlap_at_k(results, baseline, k):
+    """Mean fraction of the baseline's top-k URLs that a scorer also returns"""
+    scores = []
+    for urls, expected in zip(results, baseline):
+        if expected:
+            scores.append(len(set(urls[:k]) & set(expected[:k])) / len(expected[:k]))
+    return sum(scores) / len(scores) if scores else 1.0
+
+
+def format_table(rows):
+    header = (f"{'pages':>7} {'scorer':<11} {'cold s':>7} {'warm s':>7} {'index MB':>8} {'RSS MB':>7} "
+              f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'overlap':>7}")
+    lines = [header, '-' * len(header)]
+    for row in rows:
+        lines.append(
+            f"{row['pages']:>7} {row['scorer']:<11} {row['cold_load_s']:>7.2f} {row['warm_load_s']:>7.3f} "
+            f"{row['index_mb']:>8.1f} {row['rss_mb']:>7.1f} {row['p50_ms']:>7.2f} {row['p95_ms']:>7.2f} "
+            f"{row['p99_ms']:>7.2f} {row['overlap']:>7.2f}"
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    from bot.search_scorers import SCORERS, get_scorer
+    
+    parser = argparse.ArgumentParser(description="Benchmark the documentation search on synthetic corpora")
+    parser.add_argument('--sizes', default='100,1000,10000,100000', help="Comma-separated corpus sizes in pages")
+    parser.add_argument('--scorers', default=','.join(SCORERS), help="Comma-separated scorers to compare")
+    parser.add_argument('--queries', type=int, default=200, help="Number of queries replayed per run")
+    parser.add_argument('--limit', type=int, default=3, help="Results per query (k for overlap)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help="Also write the results to this file")
+    args = parser.parse_args()
+    
+    sizes = [int(size) for size in args.sizes.split(',')]
+    scorers = [name.strip() for name in args.scorers.split(',')]
+    # Overlap is measured against the scorer the bot currently uses (SEARCH_SCORER)
+    baseline = get_scorer(None).name
+    if baseline not in scorers:
+        scorers.insert(0, baseline)
+    queries = generate_queries(args.queries, args.seed + 1)
+    
+    rows = []
+    spawn = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(prefix='search-bench-') as work_dir:
+        for pages in sizes:
+            docs_file = os.path.join(work_dir, f"docs_{pages}.json")
+            start = time.perf_counter()
+            write_corpus(docs_file, pages, args.seed)
+            print(f"Generated {pages} pages in {time.perf_counter() - start:.1f}s "
+                  f"({os.path.getsize(docs_file) / 1024 / 1024:.1f} MB)")
+            
+            results = {}
+            for scorer in scorers:
+                with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                    results[scorer] = pool.submit(run_config, docs_file, scorer, queries, args.limit).result()
+            
+            for scorer in scorers:
+                result = results.pop(scorer) if scorer != baseline else results[scorer]
+                result['overlap'] = overlap_at_k(result['top_urls'], results[baseline]['top_urls'], args.limit)
+                result['pages'] = pages
+                rows.append(result)
+            print(f"  {len(scorers)} scorers x {len(queries)} queries done")
+    
+    print()
+    print(f"Overlap@{args.limit} is against '{baseline}'")
+    print(format_table(rows))
+    
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([{k: v for k, v in row.items() if k != 'top_urls'} for row in rows], f, indent=2)
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
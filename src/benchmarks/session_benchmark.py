@@ -0,0 +1,226 @@
+# Offline check of several meeting sessions sharing one event loop
+# Real AsyncMeetBot / EdgeMeetBot plumbing with stand-ins for the browser, the audio devices and Gemini
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+
+src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if src_dir not in sys.path:
+    sys.path.insert(0, src_dir)
+
+from bot import tracing
+from bot.async_bot import AsyncMeetBot
+from bot.meetbot import EdgeMeetBot
+
+
+class FakeMeetController:
+    """Stands in for the WebDriver: records which threads use it and whether two calls ever overlap"""
+    
+    def __init__(self, browser_s):
+        self.browser_s = browser_s
+        self.driver = object()
+        self.threads = set()
+        self.calls = 0
+        self.overlaps = 0
+        self._busy = threading.Lock()
+    
+    def _use_driver(self, seconds=0.0):
+        if not self._busy.acquire(blocking=False):
+            self.overlaps += 1
+            self._busy.acquire()
+        try:
+            self.threads.add(threading.get_ident())
+            self.calls += 1
+            time.sleep(seconds)
+        finally:
+            self._busy.release()
+    
+    def setup_driver(self):
+        self._use_driver(self.browser_s)  # Starting Edge is the slow part of joining
+    
+    def check_login(self):
+        self._use_driver()
+    
+    def set_virtual_microphone(self):
+        self._use_driver()
+    
+    def join_meeting(self, meet_url):
+        self._use_driver(0.05)
+    
+    def inject_virtual_mic_stream(self):
+        self._use_driver()
+    
+    def ensure_mic_on(self):
+        self._use_driver(0.01)
+    
+    def leave_meeting(self):
+        self._use_driver()
+
+
+class FakeChatSender:
+    def __init__(self, controller):
+        self.controller = controller
+        self.posted = 0
+    
+    def send_citations(self, citations):
+        self.controller._use_driver(0.05)
+        tracing.mark('citations_posted')
+        self.posted += 1
+        return True
+
+
+class FakeAudioHandler:
+    """Speaking takes speak_s per clip; records when each session was talking"""
+    
+    def __init__(self, speak_s):
+        self.speak_s = speak_s
+        self.bot_speaking = False
+        self.spoken = []  # (start, end) per clip
+    
+    def prewarm(self, texts):
+        pass
+    
+    def speak(self, text):
+        self.bot_speaking = True
+        start = time.monotonic()
+        tracing.mark('playback_start')
+        time.sleep(self.speak_s)
+        self.spoken.append((start, time.monotonic()))
+        self.bot_speaking = False
+    
+    def speak_stream(self, sentences):
+        for sentence in sentences:
+            self.speak(sentence)
+    
+    def stop_speaking(self):
+        self.bot_speaking = False
+    
+    def close(self):
+        pass
+    
+    def tts_latency(self):
+        return {}
+
+
+class FakeResponder:
+    vector_searcher = True  # Skips loading the search index on join
+    
+    def __init__(self, answer_s):
+        self.answer_s = answer_s
+    
+    def generate_response(self, question):
+        time.sleep(self.answer_s)
+        return f"Here is how {question.lower()}", [{'title': 'Docs', 'url': 'https://docs.fastn.ai/'}]
+
+
+class BenchBot(EdgeMeetBot):
+    """EdgeMeetBot whose meeting asks a fixed list of questions, then hangs up"""
+    
+    def __init__(self, questions, args, profile_dir):
+        super().__init__(ai_responder=FakeResponder(args.answer_ms / 1000), profile_dir=profile_dir)
+        self.meet_controller = FakeMeetController(args.browser_ms / 1000)
+        self.audio_handler = FakeAudioHandler(args.speak_ms / 1000)
+        self.questions = questions
+    
+    def _join_meeting(self, meet_url):
+        super()._join_meeting(meet_url)
+        self.chat_sender = FakeChatSender(self.meet_controller)
+    
+    def _listen_continuously(self):
+        self.pipeline.start()
+        try:
+            for question in self.questions:
+                trace = tracing.Trace()
+                trace.question = question
+                self.pipeline.submit('response', (question, trace))
+            # Greeting plus an answer and the citation note per question
+            expected = 1 + 2 * len(self.questions)
+            while self.listening and len(self.audio_handler.spoken) < expected:
+                time.sleep(0.01)
+        finally:
+            self.pipeline.stop()
+
+
+async def watch_loop(lags, stop):
+    """Largest delay of a 10 ms timer, i.e. how long the loop was ever blocked"""
+    while not stop.is_set():
+        start = time.monotonic()
+        await asyncio.sleep(0.01)
+        lags.append(time.monotonic() - start - 0.01)
+
+
+def overlapping(intervals_a, intervals_b):
+    return any(a0 < b1 and b0 < a1 for a0, a1 in intervals_a for b0, b1 in intervals_b)
+
+
+async def run_sessions(args):
+    profile_root = tempfile.mkdtemp(prefix="meetbot-sessions-")
+    bots = [BenchBot([f"I add connector {i}.{q}" for q in range(args.questions)], args,
+                     os.path.join(profile_root, f"session-{i}"))
+            for i in range(args.sessions)]
+    sessions = [AsyncMeetBot(bot) for bot in bots]
+    
+    lags = []
+    stop = asyncio.Event()
+    watcher = asyncio.create_task(watch_loop(lags, stop))
+    start = time.monotonic()
+    results = await asyncio.gather(*(session.run(f"https://meet.google.com/bench-{i}")
+                                     for i, session in enumerate(sessions)), return_exceptions=True)
+    elapsed = time.monotonic() - start
+    stop.set()
+    await watcher
+    return bots, sessions, results, elapsed, max(lags) * 1000 if lags else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run several fake meeting sessions on one event loop")
+    parser.add_argument('--sessions', type=int, default=3)
+    parser.add_argument('--questions', type=int, default=3, help="Questions asked in each meeting")
+    parser.add_argument('--browser-ms', type=float, default=500, help="Time to start a browser")
+    parser.add_argument('--answer-ms', type=float, default=200, help="Time to answer a question")
+    parser.add_argument('--speak-ms', type=float, default=300, help="Time to speak one clip")
+    args = parser.parse_args()
+    
+    print(f"{args.sessions} sessions, {args.questions} questions each, on one event loop")
+    bots, sessions, results, elapsed, max_lag_ms = asyncio.run(run_sessions(args))
+    
+    print(f"{'session':<10} {'status':<9} {'clips':>6} {'chat':>5} {'driver calls':>13} {'threads':>8} {'overlaps':>9}")
+    for i, (bot, session) in enumerate(zip(bots, sessions)):
+        controller = bot.meet_controller
+        print(f"{i:<10} {session.status:<9} {len(bot.audio_handler.spoken):>6} {bot.chat_sender.posted:>5} "
+              f"{controller.calls:>13} {len(controller.threads):>8} {controller.overlaps:>9}")
+    print(f"Finished in {elapsed:.1f}s, event loop blocked at most {max_lag_ms:.1f} ms")
+    
+    # One meeting's run time: greeting, then each question answered and spoken with its note
+    alone = 5 + args.browser_ms / 1000 + (args.questions * (args.answer_ms + 2 * args.speak_ms) + args.speak_ms) / 1000
+    browser_threads = [bot.meet_controller.threads for bot in bots]
+    checks = [
+        ('every session ran to the end', all(r is None for r in results)
+         and all(session.status == 'stopped' for session in sessions)),
+        ('every question answered in its own meeting',
+         all(len(bot.audio_handler.spoken) == 1 + 2 * args.questions and bot.chat_sender.posted == args.questions
+             for bot in bots)),
+        ('each WebDriver used from one thread, never concurrently',
+         all(len(threads) == 1 for threads in browser_threads)
+         and all(bot.meet_controller.overlaps == 0 for bot in bots)
+         and len(set().union(*browser_threads)) == len(bots)),
+        ('sessions spoke at the same time', args.sessions < 2 or overlapping(bots[0].audio_handler.spoken,
+                                                                             bots[1].audio_handler.spoken)),
+        ('sessions ran side by side', elapsed < alone * 1.5),
+        ('event loop never blocked', max_lag_ms < 50),
+    ]
+    
+    print()
+    for name, ok in checks:
+        print(f"{'✓' if ok else '✗'} {name}")
+    if not all(ok for _, ok in checks):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+# Synthetic GitBook-like documentation corpora in the docs_content.json schema
+
+import html
+import json
+import os
+import random
+import sys
+from itertools import accumulate
+from typing import Dict, List
+
+
+NOUNS = (
+    "connector flow workflow api key token webhook trigger action integration component "
+    "agent tenant user workspace project environment deployment variable mapping schema "
+    "request response endpoint payload header secret credential oauth scope permission role "
+    "template step condition loop branch schedule event queue log error retry timeout limit "
+    "dashboard setting profile account billing plan usage metric report export import file "
+    "database table record field query filter sort page cursor batch stream cache session"
+).split()
+
+VERBS = (
+    "create configure connect deploy install enable disable update delete rotate refresh "
+    "map transform validate trigger schedule retry debug monitor export import invite share"
+).split()
+
+FILLER = (
+    "the a an to of and in for with on is are be can you your this that it by from as or "
+    "when if then use using will should must not all each any new more also only after before"
+).split()
+
+SECTIONS = (
+    "getting-started guides connectors flows api-reference authentication deployment "
+    "troubleshooting administration integrations sdk changelog"
+).split()
+
+# Page lengths in words, roughly the spread of a real docs site
+PAGE_WORDS = (60, 150, 300, 600, 1200, 2500)
+PAGE_WEIGHTS = (10, 25, 30, 20, 10, 5)
+
+
+def _zipf_cum_weights(size: int, exponent: float = 1.1) -> List[float]:
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+class CorpusGenerator:
+    """Deterministic generator of docs pages: same seed and size, same corpus"""
+
+    def __init__(self, seed: int = 0):
+        self.random = random.Random(seed)
+        # Content words follow a Zipf distribution like real prose
+        self.vocabulary = NOUNS + VERBS
+        self.random.shuffle(self.vocabulary)
+        self.cum_weights = _zipf_cum_weights(len(self.vocabulary))
+
+    def _words(self, count: int) -> List[str]:
+        content = self.random.choices(self.vocabulary, cum_weights=self.cum_weights, k=count)
+        filler = self.random.choices(FILLER, k=count)
+        # Roughly 45% content words, the rest function words
+        return [c if self.random.random() < 0.45 else f for c, f in zip(content, filler)]
+
+    def _sentences(self, word_count: int) -> str:
+        words = self._words(word_count)
+        sentences = []
+        i = 0
+        while i < len(words):
+            length = self.random.randint(8, 20)
+            sentence = words[i:i + length]
+            sentences.append(' '.join(sentence).capitalize() + '.')
+            i += length
+        return ' '.join(sentences)
+
+    def _heading(self) -> str:
+        verb = self.random.choice(VERBS).capitalize()
+        nouns = self.random.sample(NOUNS, self.random.randint(1, 2))
+        return f"{verb} {' '.join(nouns)}"
+
+    def page(self, index: int):
+        """(url, page dict) for page number index"""
+        section = self.random.choice(SECTIONS)
+        topic = self.random.sample(NOUNS, 2)
+        slug = '-'.join(topic) + f"-{index}"
+        url = f"https://docs.example.com/{section}/{slug}"
+        title = f"{topic[0].capitalize()} {topic[1]} | Example Docs"
+
+        total_words = self.random.choices(PAGE_WORDS, weights=PAGE_WEIGHTS)[0]
+        heading_count = max(1, total_words // 250)
+        headings = [{'level': 'h1', 'text': f"{topic[0].capitalize()} {topic[1]}"}]
+        parts = []
+        for _ in range(heading_count):
+            heading = self._heading()
+            headings.append({'level': self.random.choice(['h2', 'h2', 'h3']), 'text': heading})
+            parts.append(heading)
+            parts.append(self._sentences(total_words // heading_count))
+
+        code_blocks = []
+        for _ in range(self.random.choice([0, 0, 1, 1, 2, 3])):
+            noun = self.random.choice(NOUNS)
+            code_blocks.append(f"const {noun} = await client.{self.random.choice(VERBS)}({{ id: '{noun}_{index}' }});")
+
+        return url, {
+            'text': ' '.join(parts),
+            'headings': headings,
+            'code_blocks': code_blocks,
+            'title': title
+        }
+
+    def corpus(self, pages: int) -> Dict[str, Dict]:
+        return dict(self.page(i) for i in range(pages))
+
+
+def generate_corpus(pages: int, seed: int = 0) -> Dict[str, Dict]:
+    return CorpusGenerator(seed).corpus(pages)
+
+
+def generate_queries(count: int = 200, seed: int = 1) -> List[str]:
+    """Fixed, spoken-style question set replayed against every corpus"""
+    rng = random.Random(seed)
+    templates = (
+        "how do I {verb} a {noun}",
+        "what is a {noun}",
+        "how to {verb} {noun} for {noun2}",
+        "{noun} {noun2} error",
+        "can I {verb} the {noun} {noun2}",
+        "why does my {noun} {verb} fail",
+        "okay how do I set up {noun} with {noun2}",
+        "{noun}",
+    )
+    queries = []
+    for _ in range(count):
+        noun, noun2 = rng.sample(NOUNS, 2)
+        queries.append(rng.choice(templates).format(verb=rng.choice(VERBS), noun=noun, noun2=noun2))
+    return queries
+
+
+def render_html(url: str, page: Dict, links: List[str], seed: int = 0) -> str:
+    """
+    A GitBook-like HTML page around a generated page: head, header, sidebar,
+    breadcrumbs, table of contents, scripts and footer around the content
+    """
+    rng = random.Random(f"{seed}:{url}")
+    escape = html.escape
+    nav_links = ''.join(f'<li><a href="{link}">{escape(link.rsplit("/", 1)[-1])}</a></li>' for link in links)
+    body = [f'<h1 id="top">{escape(page["headings"][0]["text"])} <a href="#top" class="anchor">#</a></h1>']
+    words = page['text'].split(' ')
+    step = max(1, len(words) // max(1, len(page['headings']) - 1))
+    for i, heading in enumerate(page['headings'][1:]):
+        chunk = words[i * step:(i + 1) * step]
+        half = len(chunk) // 2
+        body.append(f'<{heading["level"]}>\n  {escape(heading["text"])}\n</{heading["level"]}>')
+        body.append(f'<p>{escape(" ".join(chunk[:half]))} <strong>{escape(rng.choice(NOUNS))}</strong>'
+                    f' <!-- edited --> &amp; <code>{escape(rng.choice(VERBS))}()</code></p>')
+        body.append(f'<div class="hint"><p>{escape(" ".join(chunk[half:]))}&nbsp;<em>note</em></p></div>')
+    for code in page['code_blocks']:
+        body.append(f'<pre><code class="lang-js">{escape(code)}\n  // {escape(rng.choice(NOUNS))}</code></pre>')
+    if links:
+        body.append(f'<p>See also <a href="{links[0]}#section">{escape(links[0])}</a>.</p>')
+    
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="utf-8">
+  <title>{escape(page['title'])}</title>
+  <meta name="description" content="{escape(page['headings'][0]['text'])} documentation">
+  <style>body {{ font-family: sans-serif; }}</style>
+  <script>window.__GITBOOK__ = {{"page": "{escape(url)}"}};</script>
+</head>
+<body>
+  <header class="page-header"><a href="/">Example Docs</a><nav><a href="/guides">Guides</a></nav></header>
+  <aside class="sidebar" role="navigation"><ul>{nav_links}</ul></aside>
+  <main>
+    <nav class="breadcrumb"><a href="/">Home</a> / <span>{escape(page['headings'][0]['text'])}</span></nav>
+    <div class="toc"><a href="#top">On this page</a></div>
+    {''.join(body)}
+    <noscript>Enable JavaScript</noscript>
+    <div class="page-footer">Last updated <time>2024-01-01</time></div>
+    <svg class="icon"><title>icon</title><path d="M0 0"/></svg>
+  </main>
+  <footer><p>&copy; Example</p><script>track();</script></footer>
+</body>
+</html>
+"""
+
+
+def generate_site(pages: int, seed: int = 0) -> Dict[str, str]:
+    """URL -> HTML for a synthetic docs site, each page linking to a few others"""
+    corpus = generate_corpus(pages, seed)
+    urls = list(corpus)
+    rng = random.Random(seed)
+    return {
+        url: render_html(url, page, rng.sample(urls, min(len(urls), 8)), seed)
+        for url, page in corpus.items()
+    }
+
+
+def write_corpus(path: str, pages: int, seed: int = 0) -> str:
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(generate_corpus(pages, seed), f, ensure_ascii=False)
+    return path
+
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: python benchmarks/synthetic_corpus.py <pages> <output.json> [seed]")
+        sys.exit(1)
+    pages, output = int(sys.argv[1]), sys.argv[2]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    write_corpus(output, pages, seed)
+    print(f"Wrote {pages} pages to {output} ({os.path.getsize(output) / 1024 / 1024:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
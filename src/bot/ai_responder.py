@@ -3,30 +3,50 @@
 import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from bot import tracing
+from bot.answer_cache import AnswerCache
+from bot.context_assembler import ContextAssembler, TokenCounter, prompt_tokens_from_response
+from bot.gemini_client import (CircuitBreaker, CircuitOpenError, GeminiClientPool, GeminiTimeout,
+                               RestBackend, SdkBackend)
+from bot.fast_local_search import get_searcher, page_citations
+from bot.sentences import SentenceSplitter, split_sentences
 
 load_dotenv()
 
+CONNECTION_FALLBACK = "I'm having trouble with my AI connection. Could you please repeat that?"
+RETRY_FALLBACK = "I'm sorry, I couldn't process that. Could you rephrase your question?"
+
 
 class AIResponder:
     """Handles AI response generation with Gemini"""
     
     def __init__(self, vector_searcher=None):
         self.gemini_model = None
+        self.gemini = None  # GeminiClientPool every call goes through
         self.system_context = """You are a helpful AI assistant in a Google Meet call. 
 You can answer any general questions about various topics."""
         self.vector_searcher = vector_searcher
+        self.answer_cache = AnswerCache(
+            max_size=int(os.getenv('ANSWER_CACHE_SIZE', '128')),
+            ttl=float(os.getenv('ANSWER_CACHE_TTL', '1800')),
+            min_similarity=float(os.getenv('ANSWER_CACHE_SIMILARITY', '0.8')),
+            persist_path=os.getenv('ANSWER_CACHE_FILE') or None
+        )
         self._initialize_gemini()
+        self.token_counter = TokenCounter(
+            self.gemini_model, exact=os.getenv('CONTEXT_TOKEN_COUNTER', 'estimate') == 'gemini'
+        )
+        self.context_assembler = ContextAssembler(
+            self.token_counter,
+            budget_tokens=int(os.getenv('CONTEXT_TOKEN_BUDGET', '400')),
+            max_overlap=float(os.getenv('CONTEXT_MAX_OVERLAP', '0.5'))
+        )
     
     def _initialize_gemini(self):
-        """Initialize Gemini AI model"""
+        """Initialize Gemini AI model and the client pool that calls it"""
         try:
             api_key = os.getenv('GEMINI_API_KEY')
-            if not api_key:
-                print("GEMINI_API_KEY not found in .env file")
-                self.gemini_model = None
-                return
-            
-            genai.configure(api_key=api_key)
+            api_base = os.getenv('GEMINI_API_BASE')
             
             # PERFORMANCE: Use fastest model for quickest responses
             # gemini-2.5-flash-lite: FASTEST (1-2 sec) - Best for real-time chat
@@ -34,56 +54,190 @@ You can answer any general questions about various topics."""
             # gemini-2.5-pro: Slower (4-5 sec) - Highest quality
             model_name = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash-lite')
             
-            self.gemini_model = genai.GenerativeModel(model_name)
+            if api_base:
+                # Plain REST, e.g. against benchmarks/fake_gemini_server.py
+                backend = RestBackend(api_base, model_name, api_key)
+            else:
+                if not api_key:
+                    print("GEMINI_API_KEY not found in .env file")
+                    self.gemini_model = None
+                    return
+                genai.configure(api_key=api_key)
+                self.gemini_model = genai.GenerativeModel(model_name)
+                backend = SdkBackend(self.gemini_model)
+            
+            # Deadlines and the breaker keep a slow or failing API from stalling the listen loop
+            self.gemini = GeminiClientPool(
+                backend,
+                workers=int(os.getenv('GEMINI_WORKERS', '4')),
+                timeout=float(os.getenv('GEMINI_TIMEOUT', '8')),
+                hedge=os.getenv('GEMINI_HEDGE', 'false').lower() in ('1', 'true', 'yes'),
+                hedge_min_delay=float(os.getenv('GEMINI_HEDGE_MIN_DELAY', '0.5')),
+                breaker=CircuitBreaker(
+                    failure_threshold=int(os.getenv('GEMINI_BREAKER_FAILURES', '5')),
+                    reset_timeout=float(os.getenv('GEMINI_BREAKER_RESET', '30'))
+                )
+            )
         except Exception as e:
             print(f"Error initializing Gemini: {str(e)}")
             self.gemini_model = None
+            self.gemini = None
     
     def set_vector_searcher(self, vector_searcher):
         """Set the vector searcher for documentation queries"""
         self.vector_searcher = vector_searcher
     
-    def generate_response(self, user_question):
-        """Generate AI response using Gemini with vector search context"""
-        try:
-            if not self.gemini_model:
-                return "I'm having trouble with my AI connection. Could you please repeat that?", []
-            
-            citations = []
-            context = ""
-            
-            if self.vector_searcher and self.vector_searcher.is_available():
-                # Reduced from 3 to 2 results for faster processing
-                results, citations = self.vector_searcher.search_docs(user_question, limit=2)
-                
-                if results:
-                    context = self.vector_searcher.format_context_for_ai(results)
-                    
-                    # PERFORMANCE: Truncate context to reduce AI processing time
-                    if len(context) > 1500:
-                        context = context[:1500] + "...(truncated for speed)"
+    def _retrieve_context(self, user_question):
+        """Search the docs for the question, returns (context, citations)"""
+        citations = []
+        context = ""
+        
+        if self.vector_searcher and self.vector_searcher.is_available():
+            # Rank passages, then fill the token budget with whole, non-repeating passages
+            # PERFORMANCE: a small focused context keeps generation fast
+            results, citations = self.vector_searcher.search_docs(
+                user_question, limit=int(os.getenv('SEARCH_PASSAGES', '6'))
+            )
+            assembled = self.context_assembler.assemble(results, self.vector_searcher.format_context_for_ai)
+            context = assembled.context
+            citations = page_citations(assembled.passages)
             
-            if context:
-                # Shorter, more focused prompt for faster response
-                prompt = f"""You are an AI assistant for Fastn.ai in a Google Meet call.
+            if results:
+                print(f"Context: {len(assembled.passages)} passages, {assembled.tokens}/"
+                      f"{self.context_assembler.budget_tokens} tokens "
+                      f"({assembled.dropped_duplicates} duplicate, {assembled.dropped_budget} over budget)")
+        
+        return context, citations
+    
+    def _report_prompt_tokens(self, prompt, response, trace):
+        """Record the prompt size on the trace, calibrating the estimate when Gemini reports it"""
+        reported = prompt_tokens_from_response(response)
+        if reported:
+            self.token_counter.calibrate(prompt, reported)
+        tokens = reported or self.token_counter.count(prompt)
+        if trace:
+            trace.prompt_tokens = tokens
+        print(f"Prompt: {tokens} tokens ({'reported' if reported else 'estimated'})")
+    
+    def _build_prompt(self, user_question, context):
+        if context:
+            # Shorter, more focused prompt for faster response
+            return f"""You are an AI assistant for Fastn.ai in a Google Meet call.
 Answer concisely (2-3 sentences) using this documentation:
 
 {context}
 
 Question: {user_question}
 Answer:"""
-            else:
-                prompt = f"""{self.system_context}
+
+        return f"""{self.system_context}
 
 User question: {user_question}
 
 Provide a helpful, concise response (2-3 sentences):"""
+
+    def generate_response(self, user_question):
+        """Generate AI response using Gemini with vector search context"""
+        try:
+            if not self.gemini:
+                return CONNECTION_FALLBACK, []
             
-            response = self.gemini_model.generate_content(prompt)
+            context, citations = self._retrieve_context(user_question)
+            
+            # Same question over the same pages: reuse the earlier answer
+            cached_answer = self.answer_cache.lookup(user_question, citations)
+            if cached_answer:
+                print("Answer served from cache")
+                return cached_answer, citations
+            
+            prompt = self._build_prompt(user_question, context)
+            response = self.gemini.generate(prompt)
             answer = response.text.strip()
+            tracing.mark('gemini_last_token')  # No first token without streaming
+            self._report_prompt_tokens(prompt, response, tracing.current_trace())
             
+            self.answer_cache.store(user_question, citations, answer)
             return answer, citations
+        
+        except (CircuitOpenError, GeminiTimeout) as e:
+            print(f"Gemini unavailable: {str(e)}")
+            return CONNECTION_FALLBACK, []
+        except Exception as e:
+            print(f"Error generating AI response: {str(e)}")
+            return RETRY_FALLBACK, []
+
+    def generate_response_stream(self, user_question):
+        """
+        Streaming variant of generate_response
+        Returns (sentences, citations) right after retrieval; sentences is an
+        iterator yielding each complete sentence as Gemini streams it out
+        """
+        try:
+            if not self.gemini:
+                return iter([CONNECTION_FALLBACK]), []
+            
+            context, citations = self._retrieve_context(user_question)
             
+            cached_answer = self.answer_cache.lookup(user_question, citations)
+            if cached_answer:
+                print("Answer served from cache")
+                return iter(split_sentences(cached_answer)), citations
+            
+            prompt = self._build_prompt(user_question, context)
+            # The generator runs on whichever thread consumes it, so take the trace along
+            trace = tracing.current_trace()
+            return self._stream_sentences(user_question, citations, prompt, trace), citations
+        
         except Exception as e:
             print(f"Error generating AI response: {str(e)}")
-            return "I'm sorry, I couldn't process that. Could you rephrase your question?", []
+            return iter([RETRY_FALLBACK]), []
+    
+    def _stream_sentences(self, user_question, citations, prompt, trace=None):
+        """Yield sentences from a streamed Gemini response, caching the full answer"""
+        splitter = SentenceSplitter()
+        parts = []
+        spoken = False
+        chunk = None
+        stream = self.gemini.stream(prompt)
+        try:
+            for chunk in stream:
+                if trace:
+                    trace.mark('gemini_first_token')
+                text = chunk.text
+                parts.append(text)
+                for sentence in splitter.feed(text):
+                    spoken = True
+                    yield sentence
+            
+            for sentence in splitter.flush():
+                spoken = True
+                yield sentence
+            
+            if trace:
+                trace.mark('gemini_last_token')
+            # Usage metadata arrives with the final chunk
+            self._report_prompt_tokens(prompt, chunk, trace)
+            answer = ''.join(parts).strip()
+            self.answer_cache.store(user_question, citations, answer)
+        
+        except (CircuitOpenError, GeminiTimeout) as e:
+            print(f"Gemini unavailable: {str(e)}")
+            if not spoken:
+                yield CONNECTION_FALLBACK
+        except Exception as e:
+            print(f"Error generating AI response: {str(e)}")
+            if not spoken:
+                yield RETRY_FALLBACK
+        finally:
+            stream.close()  # Interrupted answers end the Gemini stream too
+
+
+# Shared instance: one Gemini client and search index for every meeting
+_responder = None
+
+def get_responder():
+    """Get or create the AIResponder shared by all bot sessions"""
+    global _responder
+    if _responder is None:
+        _responder = AIResponder(get_searcher())
+    return _responder
@@ -0,0 +1,138 @@
+# Answer cache so repeated questions skip the Gemini round-trip
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Tuple
+from bot.search_scorers import STOP_WORDS
+
+
+def question_tokens(question: str) -> FrozenSet[str]:
+    """Content words of a question, used for fuzzy matching"""
+    return frozenset(word for word in re.findall(r'\w+', question.lower()) if word not in STOP_WORDS)
+
+
+def token_set_similarity(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    """Jaccard similarity of two token sets"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class AnswerCache:
+    """
+    Answers keyed on the normalised question plus the citation set it was built from
+    A new question reuses an answer when it cites the same pages and its
+    token set is similar enough; entries expire after a TTL and the oldest
+    are evicted past max_size. Optionally persisted to a JSON file
+    """
+    
+    def __init__(self, max_size: int = 128, ttl: float = 1800.0, min_similarity: float = 0.8,
+                 persist_path: Optional[str] = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.min_similarity = min_similarity
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        # (normalised question, citations) -> (created wall time, answer)
+        self._entries: "OrderedDict[Tuple[str, Tuple[str, ...]], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load()
+    
+    @staticmethod
+    def _normalise(question: str) -> str:
+        return ' '.join(re.findall(r'\w+', question.lower()))
+    
+    @staticmethod
+    def _citation_key(citations: List[str]) -> Tuple[str, ...]:
+        return tuple(sorted(set(citations or [])))
+    
+    def _expired(self, created: float) -> bool:
+        return time.time() - created > self.ttl
+    
+    def lookup(self, question: str, citations: List[str]) -> Optional[str]:
+        """Cached answer for this question and context, or None"""
+        normalised = self._normalise(question)
+        cited = self._citation_key(citations)
+        with self._lock:
+            entry = self._entries.get((normalised, cited))
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end((normalised, cited))
+                self.hits += 1
+                return entry[1]
+            
+            # Fuzzy match among answers built from the same pages
+            tokens = question_tokens(question)
+            best_key, best_similarity = None, self.min_similarity
+            for key, (created, _) in list(self._entries.items()):
+                if self._expired(created):
+                    del self._entries[key]
+                    continue
+                if key[1] != cited:
+                    continue
+                similarity = token_set_similarity(tokens, question_tokens(key[0]))
+                if similarity >= best_similarity:
+                    best_key, best_similarity = key, similarity
+            
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][1]
+    
+    def store(self, question: str, citations: List[str], answer: str) -> None:
+        if self.max_size <= 0 or not answer:
+            return
+        with self._lock:
+            key = (self._normalise(question), self._citation_key(citations))
+            self._entries[key] = (time.time(), answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        self._save()
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+        self._save()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return {'size': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+    
+    def _load(self):
+        """Restore answers from previous meetings"""
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            for record in records:
+                if not self._expired(record['created']):
+                    key = (record['question'], tuple(record['citations']))
+                    self._entries[key] = (record['created'], record['answer'])
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        except Exception as e:
+            print(f"Could not load answer cache: {str(e)}")
+    
+    def _save(self):
+        if not self.persist_path:
+            return
+        try:
+            with self._lock:
+                records = [
+                    {'question': key[0], 'citations': list(key[1]), 'created': created, 'answer': answer}
+                    for key, (created, answer) in self._entries.items()
+                ]
+                tmp_path = self.persist_path + '.tmp'
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(records, f, ensure_ascii=False)
+                os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            print(f"Could not save answer cache: {str(e)}")
@@ -0,0 +1,112 @@
+# Asyncio front end for the bot: meeting sessions driven from one event loop
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bot.ai_responder import get_responder
+from bot.meetbot import EdgeMeetBot, GREETING
+
+
+# Shared bounded pools for blocking work, sized from .env
+_executors = {}
+
+EXECUTOR_SIZES = {
+    'ai': ('AI_WORKERS', '4'),          # Gemini calls and search
+}
+
+
+def get_executor(kind):
+    """Get or create the shared thread pool for one kind of blocking work"""
+    if kind not in _executors:
+        env_name, default = EXECUTOR_SIZES[kind]
+        _executors[kind] = ThreadPoolExecutor(
+            max_workers=int(os.getenv(env_name, default)),
+            thread_name_prefix=f"bot-{kind}"
+        )
+    return _executors[kind]
+
+
+class AsyncMeetBot:
+    """
+    Async lifecycle (join, listen, answer, speak, leave) around an EdgeMeetBot
+    Every session on the loop shares one AIResponder, so one Gemini client
+    and one search index. Selenium calls for a session all run on its bot's
+    browser thread (EdgeMeetBot.on_browser), whichever thread makes them, since
+    a WebDriver must not be used concurrently. Speech plays on the session's
+    own thread, so one meeting never waits for another to finish talking
+    """
+    
+    def __init__(self, bot=None, profile_dir=None, on_status=None, audio_devices=None):
+        self.bot = bot or EdgeMeetBot(ai_responder=get_responder(), profile_dir=profile_dir,
+                                      audio_devices=audio_devices)
+        self._browser = self.bot.browser
+        self._capture = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-capture")
+        self._speech = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-speech")
+        self.on_status = on_status  # Called with this session whenever its status changes
+        self.started_at = time.time()
+        self.status = 'idle'
+    
+    def _set_status(self, status):
+        self.status = status
+        if self.on_status:
+            self.on_status(self)
+    
+    async def _run(self, executor, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    
+    async def join(self, meet_url):
+        """Open the browser and join the meeting"""
+        self._set_status('joining')
+        await self._run(self._browser, self.bot.join, meet_url)
+        # Let Meet settle before the bot talks into it
+        await asyncio.sleep(5)
+        self._set_status('joined')
+    
+    async def listen(self):
+        """Run the capture loop and pipeline until stop() is called"""
+        self._set_status('listening')
+        self.bot.listening = True
+        await self._run(self._capture, self.bot._listen_continuously)
+    
+    async def answer(self, question):
+        """Answer a question and post its citations to the chat, returns (answer, citations)"""
+        answer, citations = await self._run(get_executor('ai'), self.bot.ai_responder.generate_response, question)
+        if citations and self.bot.chat_sender:
+            await self._run(self._browser, self.bot.chat_sender.send_citations, citations)
+        return answer, citations
+    
+    async def speak(self, text):
+        await self._run(self._speech, self.bot.speak, text)
+    
+    def stop(self):
+        """Ask listen() to return; safe to call from any thread"""
+        self.bot.listening = False
+    
+    async def leave(self):
+        if self.status != 'error':
+            self._set_status('leaving')
+        self.stop()
+        try:
+            await self._run(self._browser, self.bot.stop)
+        finally:
+            self._browser.shutdown(wait=False)
+            self._capture.shutdown(wait=False)
+            self._speech.shutdown(wait=False)
+            if self.status != 'error':
+                self._set_status('stopped')
+    
+    async def run(self, meet_url):
+        """Join, greet, listen until stopped, then leave"""
+        try:
+            await self.join(meet_url)
+            await self.speak(GREETING)
+            print("Listening for speech from other participants...\n")
+            await self.listen()
+        except Exception as e:
+            self._set_status('error')
+            print(f"\nError: {str(e)}")
+            raise
+        finally:
+            await self.leave()
+
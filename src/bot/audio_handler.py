@@ -1,26 +1,317 @@
 # Audio handling for virtual devices, speech recognition, and text-to-speech
 
+import io
+import os
+import shutil
+import struct
+import subprocess
+from collections import deque
+from typing import NamedTuple, Optional, Union
 import sounddevice as sd
-import soundfile as sf
 import numpy as np
 from pydub import AudioSegment
 import speech_recognition as sr
 from gtts import gTTS
-from pathlib import Path
-import tempfile
+from bot import tracing
+from bot.sentences import split_sentences
+from bot.speech_stream import get_streaming_recognizer
+from bot.vad import Endpointer, get_vad
+from bot.wake_word import get_wake_word_spotter
+from bot.tts_cache import AudioCache
 import time
 import pygame
+import queue
 import re
+import threading
+
+
+class AudioDevices(NamedTuple):
+    """
+    Sound devices of one meeting session, as sounddevice indices or name substrings
+    output: where the bot's speech is played (None: the first CABLE Input)
+    input: what the bot listens to (None: the default microphone)
+    browser_mic: label of the device Meet uses as microphone (None: CABLE Output)
+    """
+    output: Optional[Union[int, str]] = None
+    input: Optional[Union[int, str]] = None
+    browser_mic: Optional[str] = None
+
+
+def parse_audio_devices(spec):
+    """
+    Device sets from AUDIO_DEVICES: sessions separated by ';', each
+    'output,input,browser_mic' (empty fields use the defaults)
+    With nothing configured there is one default set
+    """
+    device_sets = []
+    for entry in (spec or '').split(';'):
+        if not entry.strip():
+            continue
+        fields = [field.strip() or None for field in entry.split(',')][:3]
+        fields = [int(field) if field and field.isdigit() else field for field in fields]
+        device_sets.append(AudioDevices(*fields))
+    return device_sets or [AudioDevices()]
+
+
+class _PcmReader:
+    """Blocking reads of 16-bit PCM bytes from a raw input stream, like a PyAudio stream"""
+    
+    def __init__(self, stream):
+        self._stream = stream
+    
+    def read(self, frames):
+        data, _overflowed = self._stream.read(frames)
+        return bytes(data)
+
+
+class DeviceMicrophone:
+    """
+    Mono 16-bit microphone on its own sounddevice input stream
+    Exposes what the capture code uses from sr.Microphone (SAMPLE_RATE,
+    SAMPLE_WIDTH, stream.read), so each session can listen on its own device
+    """
+    
+    SAMPLE_WIDTH = 2
+    
+    def __init__(self, device=None):
+        self.device = device
+        self.SAMPLE_RATE = int(sd.query_devices(device, 'input')['default_samplerate'])
+        self._input = None
+        self.stream = None
+    
+    def __enter__(self):
+        self._input = sd.RawInputStream(samplerate=self.SAMPLE_RATE, channels=1, dtype='int16', device=self.device)
+        self._input.start()
+        self.stream = _PcmReader(self._input)
+        return self
+    
+    def __exit__(self, *exc_info):
+        self._input.close()
+        self._input = self.stream = None
+
+
+def resample(data, from_rate, to_rate):
+    """Linear-interpolation resample of a (frames, channels) float32 array"""
+    if from_rate == to_rate or len(data) == 0:
+        return data
+    frames = int(round(len(data) * to_rate / from_rate))
+    src_times = np.arange(len(data)) / from_rate
+    dst_times = np.arange(frames) / to_rate
+    return np.stack(
+        [np.interp(dst_times, src_times, data[:, ch]) for ch in range(data.shape[1])],
+        axis=1
+    ).astype(np.float32)
+
+
+def to_stereo(data):
+    if data.shape[1] == 2:
+        return data
+    return np.repeat(data[:, :1], 2, axis=1)
+
+
+def parse_wav(wav_bytes):
+    """
+    Decode 16-bit PCM WAV bytes into ((frames, channels) float32, samplerate)
+    Tolerates the placeholder chunk sizes TTS engines write when streaming to stdout
+    """
+    if wav_bytes[:4] != b'RIFF' or wav_bytes[8:12] != b'WAVE':
+        raise ValueError("Not a WAV stream")
+    
+    pos = 12
+    channels, samplerate = 1, None
+    while pos + 8 <= len(wav_bytes):
+        chunk_id = wav_bytes[pos:pos + 4]
+        size = struct.unpack('<I', wav_bytes[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            channels, samplerate = struct.unpack('<HI', wav_bytes[body + 2:body + 8])
+        elif chunk_id == b'data':
+            pcm = wav_bytes[body:min(body + size, len(wav_bytes))]
+            pcm = pcm[:len(pcm) - len(pcm) % (2 * channels)]
+            samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0
+            return samples.reshape(-1, channels), samplerate
+        pos = body + size + (size & 1)
+    raise ValueError("WAV stream has no data chunk")
+
+
+class SynthesisStats:
+    """Rolling latency figures for one TTS backend"""
+    
+    def __init__(self, window=100):
+        self.first_chunk = deque(maxlen=window)
+        self.total = deque(maxlen=window)
+    
+    def record(self, first_chunk, total):
+        self.first_chunk.append(first_chunk)
+        self.total.append(total)
+    
+    @staticmethod
+    def _percentile(values, pct):
+        ordered = sorted(values)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))] if ordered else 0.0
+    
+    def summary(self):
+        """Milliseconds to first chunk and to full clip (mean / p95)"""
+        count = len(self.total)
+        return {
+            'count': count,
+            'first_chunk_ms': (sum(self.first_chunk) / count * 1000) if count else 0.0,
+            'first_chunk_p95_ms': self._percentile(self.first_chunk, 0.95) * 1000,
+            'total_ms': (sum(self.total) / count * 1000) if count else 0.0,
+            'total_p95_ms': self._percentile(self.total, 0.95) * 1000
+        }
+
+
+class Synthesizer:
+    """
+    Base class for text-to-speech backends
+    Backends yield audio in chunks so playback can start on the first one
+    """
+    
+    name = ''
+    
+    def __init__(self, lang='en'):
+        self.lang = lang
+        self.stats = SynthesisStats()
+    
+    def is_available(self):
+        return True
+    
+    def _generate(self, text, samplerate):
+        """Yield (frames, 2) float32 chunks at samplerate"""
+        raise NotImplementedError
+    
+    def synthesize_chunks(self, text, samplerate):
+        """Yield audio chunks for text, recording time to first chunk and total time"""
+        start = time.perf_counter()
+        first_chunk = None
+        for chunk in self._generate(text, samplerate):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            yield chunk
+        total = time.perf_counter() - start
+        self.stats.record(total if first_chunk is None else first_chunk, total)
+    
+    def synthesize(self, text, samplerate):
+        """Whole clip in one array"""
+        chunks = list(self.synthesize_chunks(text, samplerate))
+        return np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.float32)
+
+
+class GTTSSynthesizer(Synthesizer):
+    """Google Translate TTS (network); gTTS already splits text into request-sized parts"""
+    
+    name = 'gtts'
+    
+    @staticmethod
+    def _segment_to_float32(audio):
+        """pydub AudioSegment -> float32 array of shape (frames, channels)"""
+        samples = np.array(audio.get_array_of_samples(), dtype=np.float32)
+        samples /= float(1 << (8 * audio.sample_width - 1))
+        return samples.reshape(-1, audio.channels)
+    
+    def _decode_mp3(self, mp3_bytes, samplerate):
+        # Everything stays in memory: gTTS -> BytesIO -> ffmpeg pipe -> NumPy
+        mp3_buffer = io.BytesIO(mp3_bytes)
+        try:
+            # Let ffmpeg resample and upmix while decoding
+            audio = AudioSegment.from_file(
+                mp3_buffer, format='mp3',
+                parameters=['-ar', str(samplerate), '-ac', '2']
+            )
+            if audio.frame_rate != samplerate:
+                audio = audio.set_frame_rate(samplerate)
+            if audio.channels != 2:
+                audio = audio.set_channels(2)
+            return self._segment_to_float32(audio)
+        except Exception as conv_error:
+            mp3_buffer.seek(0)
+            pygame.mixer.init(frequency=samplerate, size=-16, channels=2)
+            sound = pygame.mixer.Sound(file=mp3_buffer)
+            raw_data = pygame.sndarray.array(sound)
+            pygame.mixer.quit()
+            return raw_data.astype(np.float32) / 32768.0
+    
+    def _generate(self, text, samplerate):
+        tts = gTTS(text=text, lang=self.lang, slow=False)
+        for mp3_bytes in tts.stream():
+            yield self._decode_mp3(mp3_bytes, samplerate)
+
+
+class EspeakSynthesizer(Synthesizer):
+    """Local CPU-only TTS through the espeak-ng binary, one call per sentence"""
+    
+    name = 'espeak'
+    
+    def __init__(self, lang='en', words_per_minute=175):
+        super().__init__(lang)
+        self.words_per_minute = words_per_minute
+        self.binary = shutil.which('espeak-ng') or shutil.which('espeak')
+    
+    def is_available(self):
+        return bool(self.binary)
+    
+    def _generate(self, text, samplerate):
+        if not self.binary:
+            raise RuntimeError("espeak-ng is not installed")
+        for sentence in split_sentences(text):
+            result = subprocess.run(
+                [self.binary, '--stdout', '-v', self.lang, '-s', str(self.words_per_minute), sentence],
+                capture_output=True, check=True
+            )
+            data, rate = parse_wav(result.stdout)
+            yield to_stereo(resample(data, rate, samplerate))
+
+
+SYNTHESIZERS = {
+    GTTSSynthesizer.name: GTTSSynthesizer,
+    EspeakSynthesizer.name: EspeakSynthesizer,
+}
+
+
+def get_synthesizer(name=None, lang='en'):
+    """Create a TTS backend by name, defaults to TTS_BACKEND from .env (gtts if unset)"""
+    name = (name or os.getenv('TTS_BACKEND', GTTSSynthesizer.name)).lower()
+    if name not in SYNTHESIZERS:
+        print(f"  Unknown TTS backend '{name}', using {GTTSSynthesizer.name}")
+        name = GTTSSynthesizer.name
+    synthesizer = SYNTHESIZERS[name](lang=lang)
+    if not synthesizer.is_available():
+        print(f"  TTS backend '{name}' not available, using {GTTSSynthesizer.name}")
+        synthesizer = GTTSSynthesizer(lang=lang)
+    return synthesizer
 
 
 class AudioHandler:
-    """Handles audio input/output for the bot"""
+    """
+    Handles audio input/output for the bot
+    Speech is written to this handler's own output stream and the microphone is
+    its own input stream, so handlers on different devices never touch each other
+    """
     
-    def __init__(self):
+    PLAY_BLOCK_MS = 100  # Interrupts take effect between blocks
+    
+    def __init__(self, devices=None):
+        self.devices = devices or AudioDevices()
         self.virtual_speaker = None
+        self._output = None
+        self._output_lock = threading.Lock()
         self.recognizer = sr.Recognizer()
         self.bot_speaking = False
         self.interrupt_speaking = False
+        self.synthesizer = get_synthesizer(lang='en')
+        self.tts_cache = AudioCache(
+            cache_dir=os.getenv('TTS_CACHE_DIR') or None,
+            max_memory_mb=float(os.getenv('TTS_CACHE_MB', '64'))
+        )
+        # Streaming recognition (STT_BACKEND=vosk), created once the microphone is open
+        self.stream_recognizer = None
+        self.stream_frame_ms = int(os.getenv('STT_FRAME_MS', '100'))
+        # Local wake-word spotter gating cloud recognition (phrase mode only)
+        self.wake_spotter = None
+        # Voice activity endpointing, created once the microphone is open
+        self.endpointer = None
+        self.vad_frame_ms = int(os.getenv('VAD_FRAME_MS', '30'))
         self._detect_virtual_devices()
     
     def _clean_text_for_speech(self, text):
@@ -51,7 +342,15 @@ class AudioHandler:
         return text
     
     def _detect_virtual_devices(self):
-        """Detect VB-Audio Virtual Cable devices"""
+        """Use the configured output device, else detect VB-Audio Virtual Cable"""
+        if self.devices.output is not None:
+            try:
+                device = sd.query_devices(self.devices.output, 'output')
+                self.virtual_speaker = self.devices.output
+                print(f"\nSpeaking on: {device['name']}")
+            except Exception as e:
+                print(f"  Output device {self.devices.output!r} not usable: {str(e)}")
+            return
         try:
             devices = sd.query_devices()
             print("\nDetecting audio devices...")
@@ -60,7 +359,7 @@ class AudioHandler:
                 if 'cable input' in device_name and device['max_output_channels'] > 0:
                     self.virtual_speaker = i
                     print(f"  Found Virtual Speaker: {device['name']} (index: {i})")
-            if not self.virtual_speaker:
+            if self.virtual_speaker is None:
                 print("  VB-Cable not detected! Please install VB-Audio Virtual Cable")
                 print("  Download from: https://vb-audio.com/Cable/")
             else:
@@ -68,6 +367,149 @@ class AudioHandler:
         except Exception as e:
             print(f"  Device detection error: {str(e)}")
     
+    @property
+    def _cache_voice(self):
+        """Cache namespace, so clips from different backends never mix"""
+        return f"{self.synthesizer.name}:{self.synthesizer.lang}"
+    
+    def tts_latency(self):
+        """Latency summary of the active TTS backend"""
+        return {self.synthesizer.name: self.synthesizer.stats.summary()}
+    
+    def _synthesize_chunks(self, clean_text, supported_rate):
+        """Yield audio chunks for text, from the cache or the TTS backend"""
+        cached = self.tts_cache.get(clean_text, self._cache_voice, supported_rate)
+        if cached is not None:
+            tracing.mark('tts_done')
+            yield cached
+            return
+        
+        chunks = []
+        for chunk in self.synthesizer.synthesize_chunks(clean_text, supported_rate):
+            chunks.append(chunk)
+            tracing.mark('tts_done')
+            yield chunk
+        if chunks:
+            self.tts_cache.put(clean_text, self._cache_voice, supported_rate, np.concatenate(chunks))
+    
+    def _synthesize(self, clean_text, supported_rate):
+        """Run TTS for one piece of text, returns (data, samplerate) ready for playback"""
+        chunks = list(self._synthesize_chunks(clean_text, supported_rate))
+        data = np.concatenate(chunks) if chunks else np.zeros((0, 2), dtype=np.float32)
+        return data, supported_rate
+    
+    def prewarm(self, texts):
+        """Synthesise stock phrases into the TTS cache in the background"""
+        if self.virtual_speaker is None:
+            return
+        
+        def prewarm_worker():
+            supported_rate = self._device_samplerate()
+            for text in texts:
+                clean_text = self._clean_text_for_speech(text)
+                if self.tts_cache.contains(clean_text, self._cache_voice, supported_rate):
+                    continue
+                try:
+                    self._synthesize(clean_text, supported_rate)
+                except Exception as e:
+                    print(f"  TTS prewarm error: {str(e)}")
+        
+        threading.Thread(target=prewarm_worker, daemon=True).start()
+    
+    def _output_stream(self, samplerate, channels):
+        """This handler's output stream on the virtual speaker, reopened if the format changes"""
+        with self._output_lock:
+            stream = self._output
+            if stream is None or stream.samplerate != samplerate or stream.channels != channels:
+                if stream is not None:
+                    stream.close()
+                stream = self._output = sd.OutputStream(samplerate=samplerate, channels=channels,
+                                                        dtype='float32', device=self.virtual_speaker)
+            if not stream.active:
+                stream.start()
+            return stream
+    
+    def _play(self, data, samplerate):
+        """Play audio on the virtual speaker, returns False if interrupted"""
+        stream = self._output_stream(samplerate, data.shape[1])
+        tracing.mark('playback_start')
+        
+        block = max(1, samplerate * self.PLAY_BLOCK_MS // 1000)
+        for start in range(0, len(data), block):
+            if self.interrupt_speaking:
+                stream.abort()  # Drop what is still buffered
+                return False
+            stream.write(np.ascontiguousarray(data[start:start + block]))
+        return True
+    
+    def microphone(self):
+        """Input source for this handler's listening device (use with `with`)"""
+        return DeviceMicrophone(self.devices.input)
+    
+    def close(self):
+        """Release the output stream"""
+        with self._output_lock:
+            if self._output is not None:
+                self._output.close()
+                self._output = None
+    
+    def _play_chunks(self, items, samplerate):
+        """
+        Play (label, audio) items while a background thread produces the next ones
+        Synthesis of later chunks overlaps playback of earlier ones. An interrupt
+        returns at once; the producer then closes items as soon as it gets control
+        back, which also ends the Gemini stream feeding a streamed answer
+        """
+        audio_queue = queue.Queue(maxsize=3)
+        done = object()
+        abandoned = threading.Event()
+        trace = tracing.current_trace()
+        
+        def offer(item):
+            """Queue item for playback, False once playback has been abandoned"""
+            while not abandoned.is_set():
+                try:
+                    audio_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def synthesize_worker():
+            try:
+                with tracing.activate(trace):
+                    for item in items:
+                        if self.interrupt_speaking or not offer(item):
+                            break
+            except Exception as e:
+                print(f"  Speech error: {str(e)}")
+            finally:
+                if hasattr(items, 'close'):
+                    items.close()
+                offer(done)
+        
+        threading.Thread(target=synthesize_worker, daemon=True).start()
+        
+        try:
+            while not self.interrupt_speaking:
+                try:
+                    item = audio_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is done:
+                    break
+                label, data = item
+                if label:
+                    print(f"Bot speaking: {label}")
+                if not self._play(data, samplerate):
+                    break
+        finally:
+            abandoned.set()
+    
+    def _device_samplerate(self):
+        device_info = sd.query_devices(self.virtual_speaker)
+        return int(device_info['default_samplerate'])
+    
     def speak(self, text):
         """Convert text to speech and play to Virtual Speaker (CABLE Input)"""
         try:
@@ -78,50 +520,58 @@ class AudioHandler:
             clean_text = self._clean_text_for_speech(text)
             print(f"Bot speaking: {clean_text}")
             
-            if not self.virtual_speaker:
+            if self.virtual_speaker is None:
                 print("  Virtual Audio Cable not detected! Audio may not work.")
                 return
             
-            temp_dir = Path(tempfile.gettempdir()) / "meet_bot_audio"
-            temp_dir.mkdir(exist_ok=True)
-            audio_file = temp_dir / f"speech_{int(time.time())}.mp3"
+            supported_rate = self._device_samplerate()
+            chunks = ((None, chunk) for chunk in self._synthesize_chunks(clean_text, supported_rate))
+            self._play_chunks(chunks, supported_rate)
             
-            tts = gTTS(text=clean_text, lang='en', slow=False)
-            tts.save(str(audio_file))
+            time.sleep(1)
             
-            device_info = sd.query_devices(self.virtual_speaker)
-            supported_rate = int(device_info['default_samplerate'])
+        except Exception as e:
+            print(f"  Speech error: {str(e)}")
+        finally:
+            self.bot_speaking = False
             
-            try:
-                audio = AudioSegment.from_mp3(str(audio_file))
-                audio = audio.set_frame_rate(supported_rate)
-                audio = audio.set_channels(2)
-                wav_file = audio_file.with_suffix('.wav')
-                audio.export(str(wav_file), format='wav')
-                data, samplerate = sf.read(str(wav_file))
-            except Exception as conv_error:
-                import pygame
-                pygame.mixer.init(frequency=supported_rate, size=-16, channels=2)
-                sound = pygame.mixer.Sound(str(audio_file))
-                raw_data = pygame.sndarray.array(sound)
-                data = raw_data.astype(np.float32) / 32768.0
-                samplerate = supported_rate
-                pygame.mixer.quit()
+    def speak_stream(self, sentences):
+        """
+        Speak an iterable of sentences as they arrive
+        A background thread synthesises upcoming sentences while earlier ones play,
+        so audio starts after the first sentence instead of the whole answer
+        """
+        try:
+            self.bot_speaking = True
+            self.interrupt_speaking = False
             
-            sd.play(data, samplerate, device=self.virtual_speaker)
+            if self.virtual_speaker is None:
+                print("  Virtual Audio Cable not detected! Audio may not work.")
+                for sentence in sentences:
+                    print(f"Bot speaking: {self._clean_text_for_speech(sentence)}")
+                return
             
-            while sd.get_stream().active:
-                if self.interrupt_speaking:
-                    sd.stop()
-                    break
-                time.sleep(0.1)
+            supported_rate = self._device_samplerate()
             
-            try:
-                audio_file.unlink()
-                if 'wav_file' in locals():
-                    wav_file.unlink()
-            except:
-                pass
+            def sentence_chunks():
+                try:
+                    for sentence in sentences:
+                        clean_text = self._clean_text_for_speech(sentence)
+                        if not clean_text:
+                            continue
+                        label = clean_text
+                        try:
+                            for chunk in self._synthesize_chunks(clean_text, supported_rate):
+                                yield label, chunk
+                                label = None
+                        except Exception as e:
+                            print(f"  Speech error: {str(e)}")
+                finally:
+                    # Interrupted or done: end the answer stream instead of leaving it running
+                    if hasattr(sentences, 'close'):
+                        sentences.close()
+            
+            self._play_chunks(sentence_chunks(), supported_rate)
             
             time.sleep(1)
             
@@ -131,20 +581,85 @@ class AudioHandler:
             self.bot_speaking = False
     
     def setup_recognizer(self, source):
-        """Configure speech recognizer with microphone"""
-        print("Adjusting for ambient noise...")
-        self.recognizer.adjust_for_ambient_noise(source, duration=2)
-        self.recognizer.energy_threshold = 4000
-        self.recognizer.dynamic_energy_threshold = True
-    
-    def listen_for_speech(self, source, timeout=2, phrase_time_limit=15):
-        """Listen for speech and return recognized text"""
+        """Create the voice activity endpointer that ends utterances for this microphone"""
+        self.endpointer = Endpointer(
+            get_vad(sample_rate=source.SAMPLE_RATE),
+            frame_ms=self.vad_frame_ms,
+            end_silence_ms=int(os.getenv('VAD_END_SILENCE_MS', '500')),
+            max_utterance_ms=15000
+        )
+    
+    def setup_stream_recognizer(self, source):
+        """Create the streaming recogniser for this microphone, returns False for phrase mode"""
+        self.stream_recognizer = get_streaming_recognizer(sample_rate=source.SAMPLE_RATE)
+        if self.stream_recognizer:
+            print(f"Streaming speech recognition: {self.stream_recognizer.name}")
+        return self.stream_recognizer is not None
+    
+    def listen_stream(self, source, keep_listening):
+        """
+        Read fixed-size frames from the microphone and yield hypotheses as they form
+        Partial hypotheses are only yielded when their text changes. keep_listening
+        is checked on every frame, so stopping works in silence too
+        """
+        frame_size = int(source.SAMPLE_RATE * self.stream_frame_ms / 1000)
+        last_partial = None
+        while keep_listening():
+            pcm = source.stream.read(frame_size)
+            hypothesis = self.stream_recognizer.accept_frame(pcm)
+            if hypothesis is None:
+                continue
+            if hypothesis.final:
+                last_partial = None
+                yield hypothesis
+            elif hypothesis.text != last_partial:
+                last_partial = hypothesis.text
+                yield hypothesis
+        self.stream_recognizer.reset()  # Drop any half-heard utterance
+    
+    def setup_wake_spotter(self, source, phrases):
+        """Create the wake-word spotter for this microphone, returns False when every utterance is recognised"""
+        self.wake_spotter = get_wake_word_spotter(phrases, sample_rate=source.SAMPLE_RATE)
+        if self.wake_spotter:
+            print(f"Wake-word spotter: {self.wake_spotter.name}")
+        return self.wake_spotter is not None
+    
+    def wait_for_wake_word(self, source, keep_waiting):
+        """Feed microphone frames to the spotter until it fires, returns False if keep_waiting() turns False"""
+        frame_size = int(source.SAMPLE_RATE * self.stream_frame_ms / 1000)
+        while keep_waiting():
+            if self.wake_spotter.process_frame(source.stream.read(frame_size)):
+                return True
+        return False
+    
+    def wake_stats(self):
+        return self.wake_spotter.stats() if self.wake_spotter else {}
+    
+    def capture_utterance(self, source, keep_listening, start_timeout=None):
+        """
+        Record one utterance, ended by the voice activity detector
+        Returns as soon as VAD_END_SILENCE_MS of silence follows the speech;
+        None if keep_listening() turns False or nobody starts talking within start_timeout seconds
+        """
+        frame_size = int(source.SAMPLE_RATE * self.vad_frame_ms / 1000)
+        waited_ms = 0
+        self.endpointer.reset()
+        while keep_listening():
+            pcm = self.endpointer.feed(source.stream.read(frame_size))
+            if pcm:
+                return sr.AudioData(pcm, source.SAMPLE_RATE, source.SAMPLE_WIDTH)
+            if start_timeout and not self.endpointer.in_speech:
+                waited_ms += self.vad_frame_ms
+                if waited_ms >= start_timeout * 1000:
+                    return None
+        return None
+    
+    def recognize(self, audio):
+        """Send recorded audio to Google speech recognition, returns text or None"""
         try:
-            audio = self.recognizer.listen(source, timeout=timeout, phrase_time_limit=phrase_time_limit)
             text = self.recognizer.recognize_google(audio)
+            tracing.mark('recognition_done')
             return text.strip() if text else None
-        except sr.WaitTimeoutError:
-            return None
         except sr.UnknownValueError:
             return None
         except Exception as e:
@@ -153,6 +668,5 @@ class AudioHandler:
     
     def stop_speaking(self):
         """Stop current speech output"""
-        self.interrupt_speaking = True
-        sd.stop()
+        self.interrupt_speaking = True  # _play aborts this handler's stream within a block
         self.bot_speaking = False
@@ -5,6 +5,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 import time
+from bot import tracing
 
 class MeetChatSender:
     def __init__(self, driver):
@@ -112,7 +113,10 @@ class MeetChatSender:
         try:
             citations_text = "Sources:\n" + "\n".join([f"- {url}" for url in citations])
             
-            return self.send_message(citations_text)
+            sent = self.send_message(citations_text)
+            if sent:
+                tracing.mark('citations_posted')
+            return sent
             
         except Exception as e:
             print(f"Error sending citations: {str(e)}")
@@ -0,0 +1,119 @@
+# Token-budgeted prompt context: ranked passages packed under a budget, near-duplicates dropped
+
+import math
+import re
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+
+PIECE_RE = re.compile(r'\w+|[^\w\s]')
+WORD_RE = re.compile(r'\w+')
+
+
+class TokenCounter:
+    """
+    Token cost of text for the Gemini model
+    Counts locally: every word or punctuation mark is a token, long words a
+    few more, which tracks Gemini's SentencePiece tokenizer on English docs.
+    Each answered request reports its real prompt size (usage_metadata), and
+    calibrate() folds that back in so estimates follow the model in use.
+    With exact=True the model's count_tokens API is called instead, which
+    costs a network round trip per count
+    """
+    
+    def __init__(self, model=None, exact: bool = False):
+        self.model = model
+        self.exact = exact
+        self.scale = 1.0  # Real tokens per estimated token, learned from responses
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def estimate(text: str) -> int:
+        """Uncalibrated local estimate"""
+        return sum(1 + len(piece) // 7 for piece in PIECE_RE.findall(text))
+    
+    def count(self, text: str) -> int:
+        if self.exact and self.model is not None:
+            try:
+                return self.model.count_tokens(text).total_tokens
+            except Exception as e:
+                print(f"count_tokens failed, estimating locally: {str(e)}")
+                self.exact = False
+        return math.ceil(self.estimate(text) * self.scale)
+    
+    def calibrate(self, text: str, actual_tokens: int) -> None:
+        """Adjust the estimate with the token count Gemini reported for text"""
+        estimated = self.estimate(text)
+        if not estimated or not actual_tokens:
+            return
+        with self._lock:
+            # Moving average, so one odd prompt does not swing the budget
+            self.scale = 0.8 * self.scale + 0.2 * (actual_tokens / estimated)
+
+
+def shingles(text: str, size: int = 5) -> Set[int]:
+    """Hashed word n-grams of text (the whole text if it is shorter than size words)"""
+    words = WORD_RE.findall(text.lower())
+    if len(words) <= size:
+        return {hash(tuple(words))} if words else set()
+    return {hash(tuple(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+class AssembledContext(NamedTuple):
+    context: str
+    passages: List[Dict]       # Passages that made it into the context, in prompt order
+    tokens: int                # Token cost of the context
+    dropped_duplicates: int
+    dropped_budget: int
+
+
+class ContextAssembler:
+    """
+    Packs search results into the prompt context under a token budget
+    Passages go in greedily by score. A passage that does not fit is skipped
+    (a smaller one further down may still fit), and one whose shingles
+    mostly appear in passages already taken is dropped as a near-duplicate
+    """
+    
+    def __init__(self, counter: TokenCounter, budget_tokens: int = 400,
+                 max_overlap: float = 0.5, shingle_size: int = 5):
+        self.counter = counter
+        self.budget_tokens = budget_tokens
+        self.max_overlap = max_overlap
+        self.shingle_size = shingle_size
+    
+    def assemble(self, results: List[Dict], format_context: Callable[[List[Dict]], str]) -> AssembledContext:
+        """Choose passages from results and format them with format_context(passages)"""
+        ranked = sorted(results, key=lambda doc: doc.get('score', 0.0), reverse=True)
+        chosen = []
+        seen: Set[int] = set()
+        used = 0
+        duplicates = 0
+        over_budget = 0
+        
+        for doc in ranked:
+            doc_shingles = shingles(doc['text'], self.shingle_size)
+            if doc_shingles and len(doc_shingles & seen) / len(doc_shingles) >= self.max_overlap:
+                duplicates += 1
+                continue
+            
+            # Cost includes the "Document n (from ...)" header it is formatted with
+            cost = self.counter.count(format_context([doc]))
+            if used + cost > self.budget_tokens:
+                over_budget += 1
+                continue
+            
+            chosen.append(doc)
+            seen |= doc_shingles
+            used += cost
+        
+        context = format_context(chosen) if chosen else ""
+        tokens = self.counter.count(context) if context else 0
+        return AssembledContext(context, chosen, tokens, duplicates, over_budget)
+
+
+def prompt_tokens_from_response(response) -> Optional[int]:
+    """Prompt token count Gemini reports on a (possibly streamed) response, if any"""
+    usage = getattr(response, 'usage_metadata', None)
+    count = getattr(usage, 'prompt_token_count', None) if usage is not None else None
+    return count or None
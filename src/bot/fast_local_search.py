@@ -1,9 +1,70 @@
 # Fast local documentation search without vector embeddings
 
-import json
 import os
-from typing import List, Dict, Tuple
-import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional, Union
+from bot import tracing
+from bot.search_index import BaseIndex, InvertedIndex, MmapIndex, heading_text, load_docs, write_binary_index
+from bot.search_scorers import Scorer, get_scorer, extract_keywords
+
+
+class QueryCache:
+    """
+    Bounded LRU cache of search results with a TTL
+    Keys are normalised keyword sets, so rephrased repeats of a question hit
+    """
+    
+    def __init__(self, max_size: int = 256, ttl: float = 600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def make_key(query: str, limit: int, scorer_name: str) -> Tuple:
+        """Normalised key: sorted unique keywords (or the bare query if it has none)"""
+        query_lower = query.lower()
+        keywords = tuple(sorted(set(extract_keywords(query_lower))))
+        return (keywords or (' '.join(query_lower.split()),), limit, scorer_name)
+    
+    def get(self, key: Tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+    
+    def put(self, key: Tuple, value) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
 
 
 class FastLocalSearcher:
@@ -12,168 +73,157 @@ class FastLocalSearcher:
     No embeddings, no vector database - just simple text matching
     """
     
-    def __init__(self, docs_file="docs_content.json"):
-        self.docs_data = {}
+    def __init__(self, docs_file="docs_content.json", scorer: Optional[Union[str, Scorer]] = None,
+                 index_file="docs_index.bin"):
         self.docs_file = docs_file
+        self.index_file = index_file
+        self.index: BaseIndex = InvertedIndex()
+        self.scorer = scorer if isinstance(scorer, Scorer) else get_scorer(scorer)
+        self.cache = QueryCache(
+            max_size=int(os.getenv('SEARCH_CACHE_SIZE', '256')),
+            ttl=float(os.getenv('SEARCH_CACHE_TTL', '600'))
+        )
+        self._version = None
+        self._load_lock = threading.Lock()
         self._load_docs()
     
-    def _load_docs(self):
-        """Load documentation from JSON file"""
-        try:
-            docs_path = os.path.join(os.path.dirname(__file__), '..', self.docs_file)
-            with open(docs_path, 'r', encoding='utf-8') as f:
-                self.docs_data = json.load(f)
-        except Exception as e:
-            print(f"Error loading docs: {str(e)}")
-            self.docs_data = {}
+    @staticmethod
+    def _resolve_path(filename: str) -> str:
+        return os.path.join(os.path.dirname(__file__), '..', filename)
     
-    def is_available(self) -> bool:
-        """Check if the searcher is ready to use"""
-        return bool(self.docs_data)
+    @staticmethod
+    def _index_is_current(docs_path: str, index_path: str) -> bool:
+        """Compiled index exists and is not older than the JSON it was built from"""
+        if not os.path.exists(index_path):
+            return False
+        if not os.path.exists(docs_path):
+            return True
+        return os.path.getmtime(index_path) >= os.path.getmtime(docs_path)
     
-    def _calculate_relevance_score(self, query: str, doc_text: str, doc_url: str) -> float:
-        """
-        Calculate relevance score based on keyword matches
-        Higher score = more relevant
-        """
-        query_lower = query.lower()
-        text_lower = doc_text.lower()
-        url_lower = doc_url.lower()
-        
-        score = 0.0
-        
-        # Extract important keywords from query (remove common words)
-        stop_words = {'the', 'is', 'at', 'which', 'on', 'a', 'an', 'and', 'or', 'but', 'in', 'to', 'for', 'of', 'how', 'what', 'when', 'where', 'who', 'why', 'can', 'i', 'you', 'with'}
-        keywords = [word for word in re.findall(r'\w+', query_lower) if word not in stop_words and len(word) > 2]
-        
-        if not keywords:
-            return 0.0
-        
-        # BOOST: Exact phrase match (very important!)
-        if query_lower in text_lower:
-            score += 50.0  # Increased from 10.0
-        
-        # BOOST: Title/heading match (first 200 chars are usually titles)
-        text_start = text_lower[:200]
-        for keyword in keywords:
-            if keyword in text_start:
-                score += 10.0  # Big boost for keywords in title/start
-        
-        # BOOST: URL path matching (very valuable)
-        for keyword in keywords:
-            if keyword in url_lower:
-                score += 8.0  # Increased from 5.0
-        
-        # Score based on keyword frequency in text
-        for keyword in keywords:
-            if keyword in text_lower:
-                count = text_lower.count(keyword)
-                # Diminishing returns for repetition
-                score += min(count, 5) * 1.5
-        
-        # BOOST: Multi-word phrases from query
-        if len(keywords) >= 2:
-            # Check if keywords appear close together (within 50 chars)
-            for i, kw1 in enumerate(keywords[:-1]):
-                kw2 = keywords[i + 1]
-                # Find if both keywords appear near each other
-                idx1 = text_lower.find(kw1)
-                if idx1 != -1:
-                    nearby_text = text_lower[max(0, idx1-25):idx1+75]
-                    if kw2 in nearby_text:
-                        score += 15.0  # Keywords appear together
-        
-        # Normalize by document length to avoid bias toward long documents
-        doc_length = len(doc_text)
-        if doc_length > 0:
-            # Less aggressive normalization to preserve good matches
-            score = score / (doc_length / 2000)  # Changed from 1000 to 2000
-        
-        return score
+    def _corpus_version(self) -> Tuple:
+        """(mtime, size) of the docs file and compiled index, changes on rebuild"""
+        version = []
+        for filename in (self.docs_file, self.index_file):
+            try:
+                stat = os.stat(self._resolve_path(filename))
+                version.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                version.append(None)
+        return tuple(version)
     
-    def _calculate_relevance_score_with_headings(self, query: str, doc_text: str, doc_url: str, doc_headings: list) -> float:
-        """
-        Enhanced scoring that considers headings for better accuracy
-        """
-        # Start with base score
-        score = self._calculate_relevance_score(query, doc_text, doc_url)
+    def _refresh_if_changed(self) -> None:
+        """Reload the index and drop cached results when the docs on disk change"""
+        if self._corpus_version() == self._version:
+            return
+        with self._load_lock:
+            if self._corpus_version() != self._version:
+                print("Documentation changed on disk, reloading search index...")
+                self._load_docs()
+    
+    def _load_docs(self):
+        """Memory-map the compiled index, or index the JSON file and compile it"""
+        self.cache.clear()
+        self._open_index()
+        self._version = self._corpus_version()
+    
+    def _open_index(self):
+        docs_path = self._resolve_path(self.docs_file)
+        index_path = self._resolve_path(self.index_file)
+        self.index.close()
         
-        if not doc_headings:
-            return score
+        if self._index_is_current(docs_path, index_path):
+            try:
+                self.index = MmapIndex(index_path)
+                self.scorer.prepare(self.index)
+                return
+            except Exception as e:
+                print(f"Error opening search index: {str(e)}")
         
-        query_lower = query.lower()
-        keywords = [word for word in re.findall(r'\w+', query_lower) if len(word) > 2]
+        # Build the inverted index once so queries only touch matching docs
+        # (a .jsonl crawl is indexed record by record, never loaded as one dict)
+        try:
+            self.index = InvertedIndex.from_docs(load_docs(docs_path))
+        except Exception as e:
+            print(f"Error loading docs: {str(e)}")
+            self.index = InvertedIndex()
+        self.scorer.prepare(self.index)
         
-        # MAJOR BOOST: Exact query match in any heading
-        for heading in doc_headings:
-            if isinstance(heading, dict):
-                heading_text = heading.get('text', '').lower()
-            else:
-                heading_text = str(heading).lower()
-            
-            # Exact phrase in heading
-            if query_lower in heading_text:
-                score += 100.0  # Massive boost!
-            
-            # All keywords present in one heading
-            elif all(kw in heading_text for kw in keywords):
-                score += 50.0  # Strong boost
+        # Compile it so the next start can memory-map instead of parsing JSON
+        if self.index.doc_count:
+            try:
+                write_binary_index(self.index, index_path)
+            except Exception as e:
+                print(f"Could not write search index: {str(e)}")
+    
+    def apply_delta(self, delta: Dict) -> None:
+        """Update the loaded index from an incremental crawl delta instead of re-indexing every page"""
+        with self._load_lock:
+            index = self.index if isinstance(self.index, InvertedIndex) else InvertedIndex.from_index(self.index)
+            counts = index.apply_delta(delta)
+            if index is not self.index:
+                self.index.close()
+                self.index = index
+            self.scorer.prepare(self.index)
+            self.cache.clear()
             
-            # Individual keyword matches in headings
-            else:
-                for keyword in keywords:
-                    if keyword in heading_text:
-                        score += 10.0  # Good boost per keyword
-        
-        return score
+            try:
+                write_binary_index(self.index, self._resolve_path(self.index_file))
+            except Exception as e:
+                print(f"Could not write search index: {str(e)}")
+            self._version = self._corpus_version()
+            print(f"Search index updated: {counts['added']} added, {counts['changed']} changed, "
+                  f"{counts['removed']} removed")
+    
+    def set_scorer(self, scorer: Union[str, Scorer]) -> None:
+        """Switch ranking function at runtime (e.g. to A/B legacy against bm25)"""
+        self.scorer = scorer if isinstance(scorer, Scorer) else get_scorer(scorer)
+        self.scorer.prepare(self.index)
+        self.cache.clear()
+    
+    def is_available(self) -> bool:
+        """Check if the searcher is ready to use"""
+        return self.index.doc_count > 0
     
     def search_docs(self, query: str, limit: int = 3) -> Tuple[List[Dict], List[str]]:
         """
         Search documentation using keyword matching
-        Returns: (results, citations)
+        Ranks passages (heading-aligned sections of pages), best first
+        Returns: (results, citations) where citations are the pages of the results
         """
-        if not self.docs_data:
+        self._refresh_if_changed()
+        if not self.index.doc_count:
             return [], []
         
         try:
-            # Score all documents
-            scored_docs = []
+            # Repeat questions skip ranking entirely
+            cache_key = self.cache.make_key(query, limit, self.scorer.name)
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                results, citations = cached
+                tracing.mark('search_done')
+                return [dict(doc) for doc in results], list(citations)
             
-            for url, content in self.docs_data.items():
-                if not content or 'text' not in content:
-                    continue
-                
-                doc_text = content['text']
-                doc_headings = content.get('headings', [])
-                
-                # Skip very short documents (likely empty or nav-only)
-                if len(doc_text) < 100:
-                    continue
-                
-                # Calculate score with heading support
-                score = self._calculate_relevance_score_with_headings(query, doc_text, url, doc_headings)
-                
-                # Only include docs with meaningful scores
-                if score > 0.5:  # Threshold to filter noise
-                    scored_docs.append({
-                        'url': url,
-                        'text': doc_text,
-                        'score': score,
-                        'has_code': bool(content.get('code_blocks', []))
-                    })
+            # Scorer only visits documents containing at least one keyword
+            top_results = []
             
-            # Sort by score and get top results
-            scored_docs.sort(key=lambda x: x['score'], reverse=True)
-            top_results = scored_docs[:limit]
+            for doc_id, score in self.scorer.top_k(query, limit):
+                doc = self.index.get_doc(doc_id)
+                top_results.append({
+                    'url': doc.url,
+                    'text': doc.text,
+                    'score': score,
+                    'has_code': doc.has_code,
+                    'passage_id': doc.passage_id,
+                    'heading': heading_text(doc.headings[0], lower=False) if doc.headings else '',
+                    'start': doc.start,
+                    'end': doc.end
+                })
             
             # Extract citations
-            citations = [doc['url'] for doc in top_results]
-            
-            # Truncate text for context (keep it short for faster AI processing)
-            for doc in top_results:
-                if len(doc['text']) > 2000:
-                    doc['text'] = doc['text'][:2000] + "..."
+            citations = page_citations(top_results)
             
+            self.cache.put(cache_key, ([dict(doc) for doc in top_results], list(citations)))
+            tracing.mark('search_done')
             return top_results, citations
             
         except Exception as e:
@@ -187,11 +237,17 @@ class FastLocalSearcher:
         
         context_parts = []
         for i, doc in enumerate(results, 1):
-            context_parts.append(f"Document {i} (from {doc['url']}):\n{doc['text']}")
+            section = f", section \"{doc['heading']}\"" if doc.get('heading') else ""
+            context_parts.append(f"Document {i} (from {doc['url']}{section}):\n{doc['text']}")
         
         return "\n\n".join(context_parts)
 
 
+def page_citations(results: List[Dict]) -> List[str]:
+    """Unique page URLs of ranked passages, best first"""
+    return list(dict.fromkeys(doc['url'] for doc in results))
+
+
 # Singleton instance
 _searcher = None
 
@@ -199,5 +255,5 @@ def get_searcher() -> FastLocalSearcher:
     """Get or create singleton searcher instance"""
     global _searcher
     if _searcher is None:
-        _searcher = FastLocalSearcher()
+        _searcher = FastLocalSearcher(docs_file=os.getenv('DOCS_FILE', 'docs_content.json'))
     return _searcher
@@ -0,0 +1,293 @@
+# Resilient Gemini calls: worker pool, per-call deadlines, hedged requests and a circuit breaker
+
+import json
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from types import SimpleNamespace
+import requests
+from bot.tracing import LatencyHistogram
+
+
+class GeminiTimeout(Exception):
+    """No response from Gemini before the call deadline"""
+
+
+class CircuitOpenError(Exception):
+    """Gemini has been failing; calls are refused until the breaker resets"""
+
+
+class SdkBackend:
+    """Calls through the google-generativeai SDK model"""
+    
+    def __init__(self, model):
+        self.model = model
+    
+    def generate(self, prompt, timeout):
+        return self.model.generate_content(prompt, request_options={'timeout': timeout})
+    
+    def stream(self, prompt, timeout):
+        return iter(self.model.generate_content(prompt, stream=True, request_options={'timeout': timeout}))
+
+
+class RestBackend:
+    """
+    Calls the Gemini REST API directly (generateContent / streamGenerateContent)
+    base_url can be the real API or a local fake server speaking the same protocol
+    Responses expose .text and .usage_metadata.prompt_token_count like the SDK's
+    """
+    
+    def __init__(self, base_url, model_name, api_key=None):
+        self.base_url = base_url.rstrip('/')
+        self.model_name = model_name
+        self.session = requests.Session()
+        if api_key:
+            self.session.headers['x-goog-api-key'] = api_key
+    
+    def _url(self, method):
+        return f"{self.base_url}/v1beta/models/{self.model_name}:{method}"
+    
+    @staticmethod
+    def _body(prompt):
+        return {'contents': [{'role': 'user', 'parts': [{'text': prompt}]}]}
+    
+    @staticmethod
+    def _response(data):
+        candidates = data.get('candidates') or [{}]
+        parts = candidates[0].get('content', {}).get('parts', [])
+        usage = data.get('usageMetadata')
+        return SimpleNamespace(
+            text=''.join(part.get('text', '') for part in parts),
+            usage_metadata=SimpleNamespace(prompt_token_count=usage.get('promptTokenCount')) if usage else None
+        )
+    
+    def generate(self, prompt, timeout):
+        response = self.session.post(self._url('generateContent'), json=self._body(prompt), timeout=timeout)
+        response.raise_for_status()
+        return self._response(response.json())
+    
+    def stream(self, prompt, timeout):
+        response = self.session.post(self._url('streamGenerateContent'), params={'alt': 'sse'},
+                                     json=self._body(prompt), timeout=timeout, stream=True)
+        response.raise_for_status()
+        return self._stream_events(response)
+    
+    def _stream_events(self, response):
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if line and line.startswith('data:'):
+                    yield self._response(json.loads(line[5:]))
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and refuses calls for
+    reset_timeout seconds, then lets a single trial call through (half-open):
+    its success closes the breaker, its failure opens it again
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Raise CircuitOpenError if the call must fail fast"""
+        with self._lock:
+            if self.state == 'open':
+                remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+                if remaining > 0:
+                    raise CircuitOpenError(f"Gemini circuit open, retrying in {remaining:.0f}s")
+                self.state = 'half_open'
+                self._trial_running = False
+            if self.state == 'half_open':
+                if self._trial_running:
+                    raise CircuitOpenError("Gemini circuit half-open, trial call in flight")
+                self._trial_running = True
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != 'closed':
+                print("✓ Gemini circuit closed")
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_running = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                print(f"✗ Gemini circuit open after {self.failures} failures, failing fast for {self.reset_timeout:.0f}s")
+
+
+_END = object()
+
+
+def _close_stream(chunks, future):
+    """Done-callback closing a stream (dropping its HTTP response) once no worker is using it"""
+    if chunks is None and not future.cancelled() and future.exception() is None:
+        chunks = future.result()  # Opened after the caller stopped waiting
+    if hasattr(chunks, 'close'):
+        chunks.close()
+
+# Extra seconds the HTTP call may run past its deadline, so the pool's own deadline fires first
+TRANSPORT_GRACE = 1.0
+
+
+class GeminiClientPool:
+    """
+    Runs Gemini calls on a bounded worker pool so callers can stop waiting
+    Every call has a deadline. With hedging on, a call still unanswered at
+    the p95 of recent call latencies gets a second identical request, and
+    whichever answers first wins. Calls that time out are abandoned (the
+    worker finishes them in the background, bounded by the HTTP timeout)
+    """
+    
+    HEDGE_MIN_SAMPLES = 20  # Calls to see before trusting the p95
+    
+    def __init__(self, backend, workers=4, timeout=8.0, hedge=False, hedge_min_delay=0.5, breaker=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.hedge = hedge
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyHistogram()
+        self.counts = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'timeouts': 0, 'errors': 0, 'fast_failures': 0}
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini")
+        self._lock = threading.Lock()
+    
+    def _count(self, name):
+        with self._lock:
+            self.counts[name] += 1
+    
+    def hedge_delay(self):
+        """Seconds to wait before hedging, None while hedging is off or unwarmed"""
+        with self._lock:
+            if not self.hedge or len(self.latency.recent) < self.HEDGE_MIN_SAMPLES:
+                return None
+            return max(self.hedge_min_delay, self.latency.percentile(0.95) / 1000)
+    
+    def _begin(self):
+        try:
+            self.breaker.before_call()
+        except CircuitOpenError:
+            self._count('fast_failures')
+            raise
+        self._count('calls')
+        return time.monotonic() + self.timeout
+    
+    def _fail(self, error):
+        self._count('timeouts' if isinstance(error, GeminiTimeout) else 'errors')
+        self.breaker.record_failure()
+    
+    def _timed_generate(self, prompt, deadline):
+        start = time.monotonic()
+        try:
+            return self.backend.generate(prompt, timeout=max(deadline - start, 0) + TRANSPORT_GRACE)
+        finally:
+            # Failed and abandoned calls count too, or the p95 would only see the fast ones
+            with self._lock:
+                self.latency.add((time.monotonic() - start) * 1000)
+    
+    def generate(self, prompt):
+        """Response for prompt, or GeminiTimeout / CircuitOpenError / the backend's error"""
+        deadline = self._begin()
+        try:
+            response = self._first_response(prompt, deadline)
+        except Exception as e:
+            self._fail(e)
+            raise
+        self.breaker.record_success()
+        return response
+    
+    def _first_response(self, prompt, deadline):
+        primary = self._executor.submit(self._timed_generate, prompt, deadline)
+        pending = {primary}
+        delay = self.hedge_delay()
+        hedge_at = time.monotonic() + delay if delay is not None else None
+        error = None
+        
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                break
+            wake_at = min(deadline, hedge_at) if hedge_at is not None else deadline
+            done, pending = wait(pending, timeout=wake_at - now, return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is not primary:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+            
+            if hedge_at is not None and time.monotonic() >= hedge_at and pending:
+                # Slow tail: race a second request against the first
+                hedge_at = None
+                self._count('hedged')
+                pending.add(self._executor.submit(self._timed_generate, prompt, deadline))
+        
+        for future in pending:
+            future.cancel()
+        if error is not None and not pending:
+            raise error
+        raise GeminiTimeout(f"no response from Gemini within {self.timeout:.1f}s")
+    
+    def stream(self, prompt):
+        """
+        Chunks of a streamed response, each awaited on the pool
+        The whole stream shares one deadline; streams are not hedged, since
+        chunks already spoken cannot be taken back. Closing the stream early
+        (barge-in) counts as a success, since every chunk so far came in time
+        """
+        deadline = self._begin()
+        chunks = step = None
+        try:
+            step = self._executor.submit(self.backend.stream, prompt, self.timeout + TRANSPORT_GRACE)
+            chunks = self._await(step, deadline)
+            while True:
+                step = self._executor.submit(next, chunks, _END)
+                chunk = self._await(step, deadline)
+                if chunk is _END:
+                    break
+                yield chunk
+        except GeneratorExit:
+            # Not an Exception: without this a half-open trial would never be released
+            self.breaker.record_success()
+            raise
+        except Exception as e:
+            self._fail(e)
+            raise
+        finally:
+            if step is not None:
+                # After a timeout a worker may still be opening or reading the stream
+                step.add_done_callback(partial(_close_stream, chunks))
+        self.breaker.record_success()
+    
+    def _await(self, future, deadline):
+        done, _ = wait([future], timeout=max(deadline - time.monotonic(), 0))
+        if not done:
+            future.cancel()
+            raise GeminiTimeout(f"no response from Gemini within {self.timeout:.1f}s")
+        return future.result()
+    
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            counts['p50_ms'] = self.latency.percentile(0.50)
+            counts['p95_ms'] = self.latency.percentile(0.95)
+        counts['breaker'] = self.breaker.state
+        return counts
+    
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -7,25 +7,41 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 import os
+import shutil
 from bot.script_loader import get_script_loader
 
 
 class MeetController:
     """Controls Google Meet browser interactions"""
     
-    def __init__(self, profile_dir):
+    def __init__(self, profile_dir, mic_label=None):
         self.driver = None
         self.profile_dir = profile_dir
+        self.mic_label = mic_label  # Device Meet should use as microphone, None for VB-Cable Output
         self.script_loader = get_script_loader()
     
     @staticmethod
-    def get_profile_dir():
-        """Get or create persistent profile directory"""
+    def get_profile_dir(session_id=None):
+        """
+        Get or create persistent profile directory
+        With a session_id each meeting gets its own profile (Edge locks a profile
+        to one browser), seeded from the main one so the Google login carries over
+        """
         if os.name == 'nt':
             profile_dir = os.path.join(os.environ['LOCALAPPDATA'], 'MeetBot', 'EdgeProfile')
         else:
             profile_dir = os.path.expanduser('~/.meetbot/edge_profile')
         
+        if session_id:
+            base_dir = profile_dir
+            profile_dir = os.path.join(os.path.dirname(base_dir), 'sessions', session_id)
+            if not os.path.exists(profile_dir) and os.path.exists(base_dir):
+                try:
+                    shutil.copytree(base_dir, profile_dir, ignore=shutil.ignore_patterns(
+                        'Singleton*', 'lockfile', 'Cache', 'Code Cache', 'GPUCache'))
+                except shutil.Error as e:
+                    print(f"  Some profile files were not copied: {len(e.args[0])}")
+        
         if not os.path.exists(profile_dir):
             os.makedirs(profile_dir)
         
@@ -196,7 +212,7 @@ class MeetController:
             print("Configuring virtual audio devices...")
             
             # Load and execute the setup script
-            result = self.script_loader.execute(self.driver, 'setup_virtual_microphone')
+            result = self.script_loader.execute(self.driver, 'setup_virtual_microphone', self.mic_label)
             
             if 'success' in str(result):
                 print(f"  Virtual Microphone activated: {result.split(': ')[1]}")
@@ -227,9 +243,13 @@ class MeetController:
                     print("  Opened microphone settings")
                     time.sleep(1)
                     
-                    cable_option = self.driver.find_element(By.XPATH, "//*[contains(text(), 'CABLE Output') or contains(text(), 'VB-Audio')]")
+                    if self.mic_label:
+                        option_xpath = f"//*[contains(text(), '{self.mic_label}')]"
+                    else:
+                        option_xpath = "//*[contains(text(), 'CABLE Output') or contains(text(), 'VB-Audio')]"
+                    cable_option = self.driver.find_element(By.XPATH, option_xpath)
                     cable_option.click()
-                    print("  Selected CABLE Output from dropdown")
+                    print(f"  Selected {self.mic_label or 'CABLE Output'} from dropdown")
                     time.sleep(1)
                     return
                 except:
@@ -1,27 +1,93 @@
 # Google Meet bot with AI voice responses and vector search integration
 
+import itertools
+import os
 import time
 import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
 import speech_recognition as sr
-from bot.audio_handler import AudioHandler
+from bot.audio_handler import AudioDevices, AudioHandler
 from bot.meet_controller import MeetController
 from bot.ai_responder import AIResponder
 from bot.fast_local_search import get_searcher  
 
 from bot.chat_sender import MeetChatSender
+from bot.pipeline import Pipeline
+from bot import tracing
+
+
+GREETING = "Hello, I'm your assistant for today. You can ask me questions by mentioning me, Okay assistant, at the start of your sentence."
+CITATION_NOTE = "I've added some reference links in the chat for you."
+
+
+def with_citation_note(sentences):
+    """Streamed sentences, then the citation note; closing it also closes the answer stream"""
+    yield from sentences
+    yield CITATION_NOTE
+
+
+class Utterance(NamedTuple):
+    """Captured speech on its way to recognition"""
+    audio: Optional[sr.AudioData]
+    text: Optional[str]
+    wake_heard: bool
+    trace: tracing.Trace
+    seq: int  # Capture order; recognition workers may finish out of order
 
 
 class EdgeMeetBot:
     """Main bot orchestrator integrating audio, AI, and meeting control"""
     
-    def __init__(self):
-        self.profile_dir = MeetController.get_profile_dir()
-        self.meet_controller = MeetController(self.profile_dir)
-        self.audio_handler = AudioHandler()
-        self.ai_responder = AIResponder()
+    def __init__(self, ai_responder=None, profile_dir=None, audio_devices=None):
+        self.profile_dir = profile_dir or MeetController.get_profile_dir()
+        # Sound devices are per session: two bots on the same ones would talk over each other
+        self.audio_devices = audio_devices or AudioDevices()
+        self.meet_controller = MeetController(self.profile_dir, mic_label=self.audio_devices.browser_mic)
+        self.audio_handler = AudioHandler(self.audio_devices)
+        # Sessions may share one responder (Gemini client + search index)
+        self.ai_responder = ai_responder or AIResponder()
         self.chat_sender = None
+        # A WebDriver must not be used from two threads at once, so every Selenium
+        # call (joining, unmuting before speech, chat, leaving) runs on this thread
+        self._browser_thread = None
+        self.browser = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot-browser",
+                                          initializer=self._claim_browser_thread)
         self.listening = False
         self.wake_word = "okay assistant"  # Bot only responds when hearing this
+        # Support multiple wake word variations for better recognition
+        self.wake_words = [
+            self.wake_word,           # Primary: "okay assistant"
+            "ok assistant",           # Variation of okay
+            "okay system",            # Alternative
+            "ok system"               # Short version
+        ]
+        # Stream Gemini output sentence by sentence into TTS (lower time-to-first-audio)
+        self.stream_responses = os.getenv('STREAM_RESPONSES', 'false').lower() in ('1', 'true', 'yes')
+        # Only a wake word cuts an answer off. The old capture loop stopped speaking on
+        # any recognised speech; BARGE_IN_ANY_SPEECH=true brings that back
+        self.barge_in_any_speech = os.getenv('BARGE_IN_ANY_SPEECH', 'false').lower() in ('1', 'true', 'yes')
+        self._utterance_seq = itertools.count(1)
+        self._barged_seq = 0  # Newest utterance that has cut in
+        self._barge_lock = threading.Lock()
+        
+        # Capture (listen thread) -> recognition pool -> response -> playback
+        queue_size = int(os.getenv('PIPELINE_QUEUE_SIZE', '4'))
+        self.pipeline = Pipeline()
+        self.pipeline.add_stage('recognition', self._recognize,
+                                workers=int(os.getenv('RECOGNITION_WORKERS', '2')),
+                                max_queue=queue_size, cancellable=False)
+        self.pipeline.add_stage('response', self._respond, max_queue=queue_size)
+        self.pipeline.add_stage('playback', self._playback, max_queue=queue_size)
+    
+    def _claim_browser_thread(self):
+        self._browser_thread = threading.get_ident()
+    
+    def on_browser(self, func, *args):
+        """Run a WebDriver call on this bot's browser thread and return its result"""
+        if threading.get_ident() == self._browser_thread:
+            return func(*args)
+        return self.browser.submit(func, *args).result()
     
     @property
     def driver(self):
@@ -37,15 +103,7 @@ class EdgeMeetBot:
         """Check if text starts with wake word and extract the question"""
         text_lower = text.lower().strip()
         
-        # Support multiple wake word variations for better recognition
-        wake_words = [
-            self.wake_word,           # Primary: "okay assistant"
-            "ok assistant",           # Variation of okay
-            "okay system",            # Alternative
-            "ok system"               # Short version
-        ]
-        
-        for wake in wake_words:
+        for wake in self.wake_words:
             if text_lower.startswith(wake):
                 # Remove wake word and return the actual question
                 question = text[len(wake):].strip()
@@ -56,21 +114,11 @@ class EdgeMeetBot:
     def start(self, meet_url):
         """Start the bot and join meeting"""
         try:
-            self.meet_controller.setup_driver()
-            self.meet_controller.check_login()
-            self.meet_controller.set_virtual_microphone()
-            self.meet_controller.join_meeting(meet_url)
-            
-            vector_searcher = get_searcher()
-            self.ai_responder.set_vector_searcher(vector_searcher)
-            
-            self.chat_sender = MeetChatSender(self.driver)
-            
-            self.meet_controller.inject_virtual_mic_stream()
+            self.join(meet_url)
             time.sleep(2)
             
             time.sleep(3)
-            self.speak("Hello, I'm your assistant for today. You can ask me questions by mentioning me, Okay assistant, at the start of your sentence.")
+            self.speak(GREETING)
             
             print("Bot is running. Press Ctrl+C to exit...")
             print("Listening for speech from other participants...\n")
@@ -92,82 +140,253 @@ class EdgeMeetBot:
             self.stop()
             raise
     
+    def join(self, meet_url):
+        """Open the browser, join the meeting and route the virtual mic into it (blocking)"""
+        # Fixed phrases get synthesised while the browser starts up
+        self.audio_handler.prewarm([GREETING, CITATION_NOTE])
+        self.on_browser(self._join_meeting, meet_url)
+    
+    def _join_meeting(self, meet_url):
+        self.meet_controller.setup_driver()
+        self.meet_controller.check_login()
+        self.meet_controller.set_virtual_microphone()
+        self.meet_controller.join_meeting(meet_url)
+        
+        if not self.ai_responder.vector_searcher:
+            self.ai_responder.set_vector_searcher(get_searcher())
+        
+        self.chat_sender = MeetChatSender(self.driver)
+        
+        self.meet_controller.inject_virtual_mic_stream()
+    
     def _listen_continuously(self):
-        """Listen for audio from meeting and convert to text"""
-        with sr.Microphone() as source:
-            self.audio_handler.setup_recognizer(source)
+        """
+        Capture thread: record audio from the meeting and feed the pipeline
+        Recognition, answering and playback run on their own workers, so the
+        microphone keeps being read while Gemini thinks or the bot speaks
+        """
+        self.pipeline.start()
+        try:
+            with self.audio_handler.microphone() as source:
+                self.audio_handler.setup_recognizer(source)
+            
+                if self.audio_handler.setup_stream_recognizer(source):
+                    self._capture_streaming(source)
+                elif self.audio_handler.setup_wake_spotter(source, self.wake_words):
+                    self._capture_gated(source)
+                else:
+                    self._capture_phrases(source)
+        finally:
+            self.pipeline.stop()
             
-            consecutive_silence = 0
-            max_consecutive_silence = 1
-            last_user_text = None
+    def _submit_utterance(self, audio=None, text=None, wake_heard=False):
+        trace = tracing.Trace()  # Marks listen_end
+        if text:
+            trace.mark('recognition_done')  # Streaming recognition already has the words
+        self.pipeline.submit('recognition', Utterance(audio, text, wake_heard, trace, next(self._utterance_seq)))
             
-            while self.listening:
-                try:
-                    text = self.audio_handler.listen_for_speech(source)
+    def _capture_phrases(self, source):
+        """
+        Record every utterance; the voice activity detector ends each one
+        shortly after the speaker stops, so the question is complete right away
+        """
+        while self.listening:
+            try:
+                audio = self.audio_handler.capture_utterance(source, lambda: self.listening)
+            
+                if audio:
+                    self._submit_utterance(audio=audio)
                     
-                    if text:
-                        if self.audio_handler.bot_speaking:
-                            self.audio_handler.stop_speaking()
-                            time.sleep(0.5)
+            except Exception as e:
+                if self.listening:
+                    print(f"Listening error: {str(e)}")
+                time.sleep(1)
                         
-                        # Check for wake word
-                        has_wake_word, question = self._check_wake_word(text)
+    def _capture_gated(self, source):
+        """
+        Capture behind the local wake-word spotter
+        Raw frames go to the spotter; only the speech after a detected wake
+        phrase is sent to cloud recognition
+        """
+        while self.listening:
+            try:
+                if not self.audio_handler.wait_for_wake_word(source, lambda: self.listening):
+                    break
                         
-                        if has_wake_word:
-                            print(f"User asked: {question}")
-                            last_user_text = question
-                            consecutive_silence = 0
-                        else:
-                            last_user_text = None
-                            consecutive_silence = 0
-                    else:
-                        consecutive_silence += 1
+                self._barge_in()
+                print("Wake word heard, listening for the question...")
                         
-                        if consecutive_silence >= max_consecutive_silence:
-                            if last_user_text:
-                                ai_response, citations = self.ai_responder.generate_response(last_user_text)
-                                
-                                # Add mention of links if there are citations
-                                if citations:
-                                    ai_response += " I've added some reference links in the chat for you."
+                audio = self.audio_handler.capture_utterance(source, lambda: self.listening, start_timeout=5)
+                stats = self.audio_handler.wake_stats()
+                print(f"Wake spotter: {stats['frames_processed']} frames, "
+                      f"{stats['recognitions_avoided']} cloud recognitions avoided")
+                if audio:
+                    self._submit_utterance(audio=audio, wake_heard=True)
+                self.audio_handler.wake_spotter.reset()
                                 
-                                # Send citations to chat WHILE speaking (parallel processing)
-                                if citations and self.chat_sender:
-                                    # Start citation sending in background thread
-                                    citation_thread = threading.Thread(
-                                        target=self._send_citations_async,
-                                        args=(citations,)
-                                    )
-                                    citation_thread.daemon = True
-                                    citation_thread.start()
-                                
-                                # Speak the answer (citations are being sent in parallel)
-                                self.speak(ai_response)
-                                
-                                last_user_text = None
-                            consecutive_silence = 0
+            except Exception as e:
+                if self.listening:
+                    print(f"Listening error: {str(e)}")
+                time.sleep(1)
                     
-                except Exception as e:
-                    if self.listening:
-                        print(f"Listening error: {str(e)}")
-                    time.sleep(1)
+    def _capture_streaming(self, source):
+        """
+        Capture with streaming recognition
+        The wake word is spotted in partial hypotheses while the person is still
+        talking; the question is handed on as soon as the final hypothesis arrives
+        """
+        wake_heard = False
+        
+        while self.listening:
+            try:
+                for hypothesis in self.audio_handler.listen_stream(source, lambda: self.listening):
+                    has_wake_word, question = self._check_wake_word(hypothesis.text)
+                    
+                    if not hypothesis.final:
+                        if has_wake_word and not wake_heard:
+                            wake_heard = True
+                            print("Wake word heard, listening for the question...")
+                            self._barge_in()
+                        continue
+                    
+                    wake_heard = False
+                    if has_wake_word and question:
+                        self._submit_utterance(text=hypothesis.text, wake_heard=True)
+                    elif not has_wake_word:
+                        self._speech_heard()
+            
+            except Exception as e:
+                if self.listening:
+                    print(f"Listening error: {str(e)}")
+                time.sleep(1)
+    
+    def _barge_in(self, seq=None):
+        """
+        A new question cuts off whatever answer is being prepared or spoken
+        seq is the utterance's capture number when recognition found the wake
+        word: an utterance older than one that already cut in must not cancel
+        the newer question, so it is refused (returns False)
+        """
+        with self._barge_lock:
+            if seq is not None:
+                if seq < self._barged_seq:
+                    return False
+                self._barged_seq = seq
+            self.pipeline.cancel()
+        if self.audio_handler.bot_speaking:
+            self.audio_handler.stop_speaking()
+        return True
+    
+    def _speech_heard(self):
+        """Speech without the wake word: stop talking only with BARGE_IN_ANY_SPEECH"""
+        if self.barge_in_any_speech and self.audio_handler.bot_speaking:
+            self.audio_handler.stop_speaking()
+                
+    def _recognize(self, utterance):
+        """Recognition worker: turn captured audio into a question"""
+        with tracing.activate(utterance.trace):
+            self._recognize_traced(utterance)
+    
+    def _recognize_traced(self, utterance):
+        text = utterance.text or self.audio_handler.recognize(utterance.audio)
+        if not text:
+            return
+                
+        has_wake_word, question = self._check_wake_word(text)
+                
+        if utterance.wake_heard:
+            # The wake phrase was already spotted; its tail may still be in the recording
+            question = question if has_wake_word else text
+        elif has_wake_word:
+            if not self._barge_in(utterance.seq):
+                return  # A newer question has already cut in
+        else:
+            self._speech_heard()
+            return
+            
+        if question:
+            print(f"User asked: {question}")
+            tracing.mark('wake_matched')
+            utterance.trace.question = question
+            self.pipeline.submit('response', (question, utterance.trace))
+    
+    def _respond(self, item):
+        """Response worker: generate an answer, post citations and queue it for playback"""
+        question, trace = item
+        with tracing.activate(trace):
+            self._respond_traced(question, trace)
+    
+    def _respond_traced(self, question, trace):
+        if self.stream_responses:
+            sentences, citations = self.ai_responder.generate_response_stream(question)
+        else:
+            ai_response, citations = self.ai_responder.generate_response(question)
+        
+        if not self.pipeline.is_current():
+            return  # Someone asked something new while we were thinking
+        
+        # Send citations to chat WHILE speaking (parallel processing)
+        if citations and self.chat_sender:
+            citation_thread = threading.Thread(
+                target=self._send_citations_async,
+                args=(citations, trace)
+            )
+            citation_thread.daemon = True
+            citation_thread.start()
+        
+        if self.stream_responses:
+            if citations:
+                sentences = with_citation_note(sentences)
+            self.pipeline.submit('playback', (sentences, trace))
+        elif citations:
+            # Note is its own clip so it plays straight from the TTS cache
+            self.pipeline.submit('playback', ([ai_response, CITATION_NOTE], trace))
+        else:
+            self.pipeline.submit('playback', (ai_response, trace))
     
-    def _send_citations_async(self, citations):
+    def _playback(self, item):
+        """Playback worker: speak a queued answer, then report where the time went"""
+        speech, trace = item
+        with tracing.activate(trace):
+            if isinstance(speech, str):
+                self.speak(speech)
+            else:
+                self.speak_stream(speech)
+        print(tracing.format_trace(tracing.get_tracer().finish(trace)))
+    
+    def pipeline_stats(self):
+        """Queue depth, worker use and wait/service times per stage"""
+        return self.pipeline.stats()
+    
+    def _send_citations_async(self, citations, trace=None):
         """Send citations to chat in background (async)"""
         try:
-            self.chat_sender.send_citations(citations)
+            self.on_browser(self._post_citations, citations, trace)
         except Exception as e:
             print(f"Error sending citations: {e}")
     
+    def _post_citations(self, citations, trace):
+        with tracing.activate(trace):
+            self.chat_sender.send_citations(citations)
+    
     def speak(self, text):
         """Convert text to speech and play to meeting"""
-        self.meet_controller.ensure_mic_on()
+        self.on_browser(self.meet_controller.ensure_mic_on)
         time.sleep(0.3)
         self.audio_handler.speak(text)
     
+    def speak_stream(self, sentences):
+        """Speak sentences as they are generated"""
+        self.on_browser(self.meet_controller.ensure_mic_on)
+        time.sleep(0.3)
+        self.audio_handler.speak_stream(sentences)
+    
     def stop(self):
         """Stop the bot and clean up"""
-        self.meet_controller.leave_meeting()
+        self.listening = False
+        self.pipeline.stop()
+        self.audio_handler.close()
+        self.on_browser(self.meet_controller.leave_meeting)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+# Bounded-queue worker stages so capture, recognition, response and playback run concurrently
+
+import queue
+import threading
+import time
+from collections import deque
+
+
+def _summary_ms(values):
+    """Mean and p95 of a window of durations, in milliseconds"""
+    if not values:
+        return 0.0, 0.0
+    ordered = sorted(values)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return sum(ordered) / len(ordered) * 1000, p95 * 1000
+
+
+class Stage:
+    """
+    One pipeline stage: a bounded queue served by a pool of worker threads
+    When the queue is full the oldest item is dropped, so a stalled stage
+    never blocks the one feeding it. Items in a cancellable stage are
+    skipped once the pipeline has been cancelled after they were submitted
+    """
+    
+    def __init__(self, pipeline, name, handler, workers=1, max_queue=4, cancellable=True):
+        self.pipeline = pipeline
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.cancellable = cancellable
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.processed = 0
+        self.dropped = 0
+        self.cancelled = 0
+        self.busy = 0
+        self.wait_times = deque(maxlen=100)
+        self.service_times = deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._threads = []
+    
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f"{self.name}-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self):
+        self.drain()
+        for _ in self._threads:
+            self.queue.put(None)
+        self._threads = []
+    
+    def submit(self, item, generation):
+        entry = (time.perf_counter(), generation, item)
+        while True:
+            try:
+                self.queue.put_nowait(entry)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    with self._lock:
+                        self.dropped += 1
+                except queue.Empty:
+                    pass
+    
+    def drain(self):
+        """Throw away everything still queued"""
+        while True:
+            try:
+                entry = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if entry is not None:
+                with self._lock:
+                    self.cancelled += 1
+    
+    def _worker(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                return
+            
+            enqueued_at, generation, item = entry
+            if self.cancellable and generation != self.pipeline.generation:
+                with self._lock:
+                    self.cancelled += 1
+                continue
+            
+            started = time.perf_counter()
+            with self._lock:
+                self.busy += 1
+            self.pipeline._local.generation = generation
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"{self.name.capitalize()} error: {str(e)}")
+            finally:
+                self.pipeline._local.generation = None
+                finished = time.perf_counter()
+                with self._lock:
+                    self.busy -= 1
+                    self.processed += 1
+                    self.wait_times.append(started - enqueued_at)
+                    self.service_times.append(finished - started)
+    
+    def stats(self):
+        with self._lock:
+            wait_ms, wait_p95_ms = _summary_ms(self.wait_times)
+            service_ms, service_p95_ms = _summary_ms(self.service_times)
+            return {
+                'depth': self.queue.qsize(),
+                'busy': self.busy,
+                'workers': self.workers,
+                'processed': self.processed,
+                'dropped': self.dropped,
+                'cancelled': self.cancelled,
+                'wait_ms': wait_ms,
+                'wait_p95_ms': wait_p95_ms,
+                'service_ms': service_ms,
+                'service_p95_ms': service_p95_ms
+            }
+
+
+class Pipeline:
+    """
+    Ordered set of stages sharing a cancellation generation
+    cancel() bumps the generation: queued work is dropped and anything a
+    worker submits on behalf of an older generation is ignored downstream
+    """
+    
+    def __init__(self):
+        self.stages = {}
+        self.generation = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._running = False
+    
+    def add_stage(self, name, handler, workers=1, max_queue=4, cancellable=True):
+        self.stages[name] = Stage(self, name, handler, workers, max_queue, cancellable)
+        return self.stages[name]
+    
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for stage in self.stages.values():
+            stage.start()
+    
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        for stage in self.stages.values():
+            stage.stop()
+    
+    def _current_generation(self):
+        """Generation of the item this thread is working on, else the latest one"""
+        generation = getattr(self._local, 'generation', None)
+        return self.generation if generation is None else generation
+    
+    def submit(self, name, item):
+        self.stages[name].submit(item, self._current_generation())
+    
+    def is_current(self):
+        """False once the work this thread is doing has been cancelled"""
+        return self._current_generation() == self.generation
+    
+    def cancel(self):
+        """Cancel queued and in-flight work in every cancellable stage"""
+        with self._lock:
+            self.generation += 1
+            if getattr(self._local, 'generation', None) is not None:
+                # The cancelling worker carries on under the new generation
+                self._local.generation = self.generation
+        for stage in self.stages.values():
+            if stage.cancellable:
+                stage.drain()
+    
+    def stats(self):
+        return {name: stage.stats() for name, stage in self.stages.items()}
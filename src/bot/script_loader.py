@@ -41,19 +41,20 @@ class ScriptLoader:
         
         return script_content
     
-    def execute(self, driver, script_name):
+    def execute(self, driver, script_name, *args):
         """
         Load and execute a JavaScript file
         
         Args:
             driver: Selenium WebDriver instance
             script_name: Name of the .js file (without extension)
+            *args: Passed to the script as arguments[0], arguments[1], ...
             
         Returns:
             Any: Result from JavaScript execution
         """
         script = self.load(script_name)
-        return driver.execute_script(script)
+        return driver.execute_script(script, *args)
 
 
 # Singleton instance
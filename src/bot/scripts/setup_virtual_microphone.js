@@ -1,11 +1,12 @@
-// Setup virtual microphone (VB-Audio Cable Output) for Google Meet
-(async function() {
+// Setup virtual microphone (VB-Audio Cable Output, or the label passed as arguments[0]) for Google Meet
+(async function(micLabel) {
     try {
         const devices = await navigator.mediaDevices.enumerateDevices();
         const audioInputs = devices.filter(d => d.kind === 'audioinput');
         console.log('Available audio inputs:', audioInputs.map(d => d.label));
         
-        const virtualMic = audioInputs.find(d => 
+        const virtualMic = audioInputs.find(d => micLabel ?
+            d.label.toLowerCase().includes(micLabel.toLowerCase()) :
             d.label.toLowerCase().includes('cable output') ||
             d.label.toLowerCase().includes('vb-audio virtual cable')
         );
@@ -29,4 +30,4 @@
     } catch(e) {
         return 'error: ' + e.message;
     }
-})();
+})(arguments[0]);
@@ -0,0 +1,764 @@
+# Inverted index over the crawled documentation, built once at load time
+# Pages are split into heading-aligned passages, and each passage is one indexed document
+# Can be compiled to a compact binary file and memory-mapped at startup
+
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Upper bound on cached keyword -> vocabulary expansions
+MAX_EXPANSION_CACHE = 4096
+
+# Decoded posting lists kept per memory-mapped index (least recently used are dropped)
+MAX_POSTINGS_CACHE = 2048
+# Decoded per-passage metadata (URL, headings, title), small enough to keep for large corpora
+MAX_META_CACHE = 65536
+
+# Passage size in characters: long sections are split, tiny ones merged into the next
+MAX_PASSAGE_CHARS = 800
+MIN_PASSAGE_CHARS = 200
+
+SLUG_RE = re.compile(r'[^a-z0-9]+')
+
+
+class Posting(NamedTuple):
+    """Occurrences of one term in one document, split per field"""
+    doc_id: int
+    positions: Tuple[int, ...]  # Char offsets of the term in the lowercased text
+    headings: int               # Hits in headings
+    url: int                    # Hits in the URL
+    title: int                  # Hits in the page title
+
+
+class IndexedDoc(NamedTuple):
+    """Stored fields of an indexed document (one passage of a page)"""
+    url: str
+    text: str
+    headings: list              # Section heading(s) the passage falls under
+    title: str
+    has_code: bool              # The page has code blocks
+    passage_id: str = ''        # Stable id: page URL + section slug
+    start: int = 0              # Char offsets of the passage in the page text
+    end: int = 0
+
+
+class Passage(NamedTuple):
+    """A heading-aligned span of a page's text"""
+    passage_id: str
+    start: int
+    end: int
+    headings: list
+
+
+def tokenize(text: str) -> List[str]:
+    """Split already-lowercased text into word tokens"""
+    return TOKEN_RE.findall(text)
+
+
+def _chunk_end(text: str, start: int, end: int, max_chars: int) -> int:
+    """
+    End of the next chunk of text[start:end], at a sentence or word break if possible
+    Chunks of one section are kept about equal, so no tiny tail is left over
+    """
+    length = end - start
+    if length <= max_chars:
+        return end
+    target = length // -(-length // max_chars)
+    limit = start + min(max_chars, target + target // 4)
+    floor = start + target * 3 // 4
+    sentence = text.rfind('. ', floor, limit)
+    if sentence != -1:
+        return sentence + 1
+    space = text.rfind(' ', floor, limit)
+    return space if space != -1 else start + target
+
+
+def split_passages(url: str, text: str, headings: list,
+                   max_chars: int = MAX_PASSAGE_CHARS, min_chars: int = MIN_PASSAGE_CHARS) -> List[Passage]:
+    """
+    Split a page into passages at its headings
+    Headings are located in the page text in order; each section runs to the
+    next heading. Sections shorter than min_chars are merged into the next one
+    (the last into the one before) and sections longer than max_chars are cut
+    at sentence breaks. Ids are built from the section heading, so they
+    survive re-crawls of the page
+    """
+    # (offset, heading) where each section starts
+    cuts = [(0, None)]
+    cursor = 0
+    for heading in headings:
+        heading_str = heading.get('text', '') if isinstance(heading, dict) else str(heading)
+        pos = text.find(heading_str, cursor) if heading_str else -1
+        if pos == -1:
+            continue
+        if pos == cuts[-1][0]:
+            cuts[-1] = (pos, heading)
+        else:
+            cuts.append((pos, heading))
+        cursor = pos + len(heading_str)
+    
+    sections = []  # [start, end, headings]
+    for i, (start, heading) in enumerate(cuts):
+        end = cuts[i + 1][0] if i + 1 < len(cuts) else len(text)
+        if not text[start:end].strip():
+            continue
+        section_headings = [heading] if heading is not None else []
+        if sections and sections[-1][1] - sections[-1][0] < min_chars:
+            # Too short to stand alone (e.g. a title followed by a heading)
+            sections[-1][1] = end
+            sections[-1][2].extend(section_headings)
+        else:
+            sections.append([start, end, section_headings])
+    if len(sections) > 1 and sections[-1][1] - sections[-1][0] < min_chars:
+        # A short last section joins the one before it
+        last = sections.pop()
+        sections[-1][1] = last[1]
+        sections[-1][2].extend(last[2])
+    
+    passages = []
+    seen_ids = {}
+    for start, end, section_headings in sections:
+        first = section_headings[0] if section_headings else None
+        slug = SLUG_RE.sub('-', heading_text(first)).strip('-') if first is not None else ''
+        slug = slug or 'intro'
+        chunk_start = start
+        while chunk_start < end:
+            chunk_end = _chunk_end(text, chunk_start, end, max_chars)
+            while chunk_start < chunk_end and text[chunk_start] == ' ':
+                chunk_start += 1
+            if chunk_start < chunk_end:
+                count = seen_ids.get(slug, 0)
+                seen_ids[slug] = count + 1
+                passage_id = f"{url}#{slug}" + (f"-{count + 1}" if count else '')
+                passages.append(Passage(passage_id, chunk_start, chunk_end, section_headings))
+            chunk_start = chunk_end
+    return passages
+
+
+def iter_jsonl_docs(path: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    (url, content) pairs streamed from a crawler .jsonl file, one record per line
+    Records without content (visited pages with no text) and a torn last line are skipped
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('content'):
+                yield record['url'], record['content']
+
+
+def load_docs(path: str) -> Iterable[Tuple[str, Dict]]:
+    """Pages from docs_content.json, or streamed from a .jsonl crawl"""
+    if path.endswith('.jsonl'):
+        return iter_jsonl_docs(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f).items()
+
+
+def heading_text(heading, lower: bool = True) -> str:
+    """Text of a heading entry (dict from the crawler or plain string), lowercased unless lower=False"""
+    text = heading.get('text', '') if isinstance(heading, dict) else str(heading)
+    return text.lower() if lower else text
+
+
+class BaseIndex:
+    """Read interface shared by the in-memory and memory-mapped indexes"""
+    
+    FIELDS = ('text', 'headings', 'url', 'title')
+    
+    def __init__(self):
+        self.field_lengths = []  # Token counts per FIELDS, one entry per doc
+        self.heading_docs: List[int] = []  # Docs with at least one heading
+        self._expansions: Dict[str, List[str]] = {}
+    
+    @property
+    def doc_count(self) -> int:
+        raise NotImplementedError
+    
+    def get_doc(self, doc_id: int) -> IndexedDoc:
+        raise NotImplementedError
+    
+    def get_postings(self, term: str) -> Dict[int, Posting]:
+        raise NotImplementedError
+    
+    def doc_summary(self, doc_id: int) -> Tuple[str, list, int]:
+        """(url, headings, text length in characters) of a doc, without needing its text"""
+        doc = self.get_doc(doc_id)
+        return doc.url, doc.headings, len(doc.text)
+    
+    def term_major_arrays(self) -> Tuple[List[str], bytes, bytes, bytes, bytes]:
+        """
+        Postings as term-major sparse arrays, all little-endian buffers:
+        (terms, indptr Q[terms + 1], doc ids I[postings],
+         per-field hits I[postings * 4], field lengths I[docs * 4])
+        Built from the postings here; the compiled index stores them ready to map
+        """
+        terms = list(self.vocabulary())
+        indptr = array('Q', [0])
+        docs = array('I')
+        fields = array('I')
+        for term in terms:
+            for doc_id, posting in sorted(self.get_postings(term).items()):
+                docs.append(doc_id)
+                fields.extend((len(posting.positions), posting.headings, posting.url, posting.title))
+            indptr.append(len(docs))
+        lengths = array('I', [length for doc_lengths in self.field_lengths for length in doc_lengths])
+        return terms, _le_bytes(indptr), _le_bytes(docs), _le_bytes(fields), _le_bytes(lengths)
+    
+    def vocabulary(self) -> Iterable[str]:
+        raise NotImplementedError
+    
+    def document_frequencies(self) -> Iterator[Tuple[str, int]]:
+        """(term, number of docs containing it) for every term"""
+        raise NotImplementedError
+    
+    def expand(self, keyword: str) -> List[str]:
+        """
+        Vocabulary terms containing keyword as a substring
+        A \\w+ keyword can never span two tokens, so this reproduces `keyword in text`
+        """
+        terms = self._expansions.get(keyword)
+        if terms is None:
+            terms = [term for term in self.vocabulary() if keyword in term]
+            if len(self._expansions) >= MAX_EXPANSION_CACHE:
+                self._expansions.clear()
+            self._expansions[keyword] = terms
+        return terms
+    
+    def close(self) -> None:
+        """Release any resources held by the index"""
+
+
+class InvertedIndex(BaseIndex):
+    """
+    Term -> posting list index over docs_content.json
+    Each posting keeps text positions plus hit counts for headings, URL and title
+    """
+    
+    def __init__(self):
+        super().__init__()
+        self.docs: List[IndexedDoc] = []
+        self.postings: Dict[str, Dict[int, Posting]] = {}
+        self.url_to_ids: Dict[str, List[int]] = {}  # Page URL -> its passage doc ids
+    
+    @classmethod
+    def from_docs(cls, docs: Iterable[Tuple[str, Dict]]) -> 'InvertedIndex':
+        """Build an index from (url, content) pairs in crawler format"""
+        index = cls()
+        for url, content in docs:
+            index.add_doc(url, content)
+        return index
+    
+    @staticmethod
+    def is_indexable(content: Dict) -> bool:
+        """Same filter search_docs has always applied (skip empty or nav-only pages)"""
+        return bool(content) and 'text' in content and len(content['text']) >= 100
+    
+    @classmethod
+    def from_index(cls, source: BaseIndex) -> 'InvertedIndex':
+        """Editable copy of another index (e.g. a memory-mapped one) without re-tokenizing"""
+        index = cls()
+        index.docs = [source.get_doc(doc_id) for doc_id in range(source.doc_count)]
+        for doc_id, doc in enumerate(index.docs):
+            index.url_to_ids.setdefault(doc.url, []).append(doc_id)
+        index.field_lengths = [tuple(lengths) for lengths in source.field_lengths]
+        index.heading_docs = list(source.heading_docs)
+        index.postings = {term: dict(source.get_postings(term)) for term in source.vocabulary()}
+        return index
+    
+    @staticmethod
+    def _analyse(doc: IndexedDoc) -> Tuple[Tuple[int, int, int, int], Dict[str, Tuple]]:
+        """Field lengths and per-term (positions, heading, url, title hits) of one page"""
+        positions: Dict[str, List[int]] = {}
+        text_length = 0
+        for match in TOKEN_RE.finditer(doc.text.lower()):
+            positions.setdefault(match.group(), []).append(match.start())
+            text_length += 1
+        
+        field_hits: Dict[str, List[int]] = {}
+        fields = (
+            [tok for heading in doc.headings for tok in tokenize(heading_text(heading))],
+            tokenize(doc.url.lower()),
+            tokenize(doc.title.lower()),
+        )
+        for field_no, tokens in enumerate(fields):
+            for token in tokens:
+                field_hits.setdefault(token, [0, 0, 0])[field_no] += 1
+        
+        terms = {}
+        for term in positions.keys() | field_hits.keys():
+            hits = field_hits.get(term, (0, 0, 0))
+            terms[term] = (tuple(positions.get(term, ())), hits[0], hits[1], hits[2])
+        return (text_length, len(fields[0]), len(fields[1]), len(fields[2])), terms
+    
+    def add_doc(self, url: str, content: Dict) -> List[int]:
+        """Index a single page as passages, returns their doc ids (empty if it was skipped)"""
+        if not self.is_indexable(content):
+            return []
+        
+        text = content['text']
+        title = content.get('title', '') or ''
+        has_code = bool(content.get('code_blocks', []))
+        doc_ids = []
+        for passage in split_passages(url, text, content.get('headings', []) or []):
+            doc = IndexedDoc(url, text[passage.start:passage.end], passage.headings, title, has_code,
+                             passage.passage_id, passage.start, passage.end)
+            doc_ids.append(self._add_passage(doc))
+        return doc_ids
+    
+    def _add_passage(self, doc: IndexedDoc) -> int:
+        doc_id = len(self.docs)
+        self.docs.append(doc)
+        self.url_to_ids.setdefault(doc.url, []).append(doc_id)
+        if doc.headings:
+            self.heading_docs.append(doc_id)
+        
+        lengths, terms = self._analyse(doc)
+        self.field_lengths.append(lengths)
+        for term, (positions, headings_hits, url_hits, title_hits) in terms.items():
+            posting = Posting(doc_id, positions, headings_hits, url_hits, title_hits)
+            self.postings.setdefault(term, {})[doc_id] = posting
+        
+        self._expansions.clear()
+        return doc_id
+    
+    def replace_doc(self, url: str, content: Dict) -> List[int]:
+        """Re-index a page (added if new, removed if no longer indexable)"""
+        self.remove_doc(url)
+        return self.add_doc(url, content)
+    
+    def remove_doc(self, url: str) -> bool:
+        """
+        Remove all passages of a page, returns False if it was not indexed
+        The last doc moves into each freed id so ids stay dense; only its own
+        postings are renumbered, but equal scores can then tie-break in a
+        different order than after a fresh build
+        """
+        doc_ids = self.url_to_ids.pop(url, None)
+        if not doc_ids:
+            return False
+        
+        # Highest first, so the doc moved into a freed id is never one still to remove
+        for doc_id in sorted(doc_ids, reverse=True):
+            doc = self.docs[doc_id]
+            for term in self._analyse(doc)[1]:
+                postings = self.postings[term]
+                del postings[doc_id]
+                if not postings:
+                    del self.postings[term]
+            if doc.headings:
+                self.heading_docs.remove(doc_id)
+            
+            last_id = len(self.docs) - 1
+            if doc_id != last_id:
+                moved = self.docs[last_id]
+                for term in self._analyse(moved)[1]:
+                    postings = self.postings[term]
+                    postings[doc_id] = postings.pop(last_id)._replace(doc_id=doc_id)
+                self.docs[doc_id] = moved
+                self.field_lengths[doc_id] = self.field_lengths[last_id]
+                moved_ids = self.url_to_ids[moved.url]
+                moved_ids[moved_ids.index(last_id)] = doc_id
+                if moved.headings:
+                    self.heading_docs[self.heading_docs.index(last_id)] = doc_id
+            
+            self.docs.pop()
+            self.field_lengths.pop()
+        
+        self._expansions.clear()
+        return True
+    
+    def apply_delta(self, delta: Dict) -> Dict[str, int]:
+        """
+        Apply a crawler delta: {'added': {url: content}, 'changed': {url: content}, 'removed': [url]}
+        Only the pages in the delta are tokenized; returns how many pages of each kind were applied
+        """
+        counts = {'added': 0, 'changed': 0, 'removed': 0}
+        for url in delta.get('removed', []):
+            if self.remove_doc(url):
+                counts['removed'] += 1
+        for kind in ('changed', 'added'):
+            for url, content in delta.get(kind, {}).items():
+                self.replace_doc(url, content)
+                counts[kind] += 1
+        return counts
+    
+    @property
+    def doc_count(self) -> int:
+        return len(self.docs)
+    
+    def get_doc(self, doc_id: int) -> IndexedDoc:
+        return self.docs[doc_id]
+    
+    def get_postings(self, term: str) -> Dict[int, Posting]:
+        return self.postings.get(term, {})
+    
+    def vocabulary(self) -> Iterable[str]:
+        return self.postings.keys()
+
+    def document_frequencies(self) -> Iterator[Tuple[str, int]]:
+        for term, postings in self.postings.items():
+            yield term, len(postings)
+
+
+# ---------------------------------------------------------------------------
+# Binary on-disk format
+#
+#   header   MAGIC, version, doc_count, term_count, then (offset, length)
+#            for each section below, all little-endian
+#   sections terms        '\n'-joined sorted vocabulary (utf-8)
+#            term_offsets Q[term_count + 1] into postings
+#            term_dfs     I[term_count]
+#            postings     per term: varint doc-id delta, position count,
+#                         delta-encoded positions, heading/url/title hits
+#            text_offsets Q[doc_count + 1] into texts
+#            meta_offsets Q[doc_count + 1] into metas
+#            field_lengths I[doc_count * 4]
+#            heading_docs I[] ids of docs that have headings
+#            csr_indptr   Q[term_count + 1] into csr_docs / csr_fields
+#            csr_docs     I[] doc id of every posting, term-major
+#            csr_fields   I[] text/heading/url/title hits of every posting
+#                         (four per posting), mapped as-is by bm25-numpy
+#            texts        concatenated page text (utf-8)
+#            metas        per doc JSON: url, title, headings, has_code,
+#                         passage id and offsets in the page text
+#            urls         '\n'-joined doc URLs
+# ---------------------------------------------------------------------------
+
+MAGIC = b'FLSIDX\x00\x01'
+FORMAT_VERSION = 4
+SECTIONS = ('terms', 'term_offsets', 'term_dfs', 'postings', 'text_offsets',
+            'meta_offsets', 'field_lengths', 'heading_docs', 'texts', 'metas', 'urls',
+            'csr_indptr', 'csr_docs', 'csr_fields')
+HEADER = struct.Struct('<8sIII' + 'QQ' * len(SECTIONS))
+
+
+def _encode_varint(value: int, out: bytearray) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _le_bytes(values: array) -> bytes:
+    """Array contents as little-endian bytes"""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _le_array(typecode: str, data) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def write_binary_index(index: InvertedIndex, path: str) -> None:
+    """Serialise an in-memory index to the binary format (atomic replace)"""
+    terms = sorted(index.postings)
+    term_offsets = array('Q', [0])
+    term_dfs = array('I')
+    postings = bytearray()
+    csr_indptr = array('Q', [0])
+    csr_docs = array('I')
+    csr_fields = array('I')
+    for term in terms:
+        last_doc = 0
+        doc_postings = index.postings[term]
+        for doc_id in sorted(doc_postings):
+            posting = doc_postings[doc_id]
+            csr_docs.append(doc_id)
+            csr_fields.extend((len(posting.positions), posting.headings, posting.url, posting.title))
+            _encode_varint(doc_id - last_doc, postings)
+            last_doc = doc_id
+            _encode_varint(len(posting.positions), postings)
+            last_pos = 0
+            for pos in posting.positions:
+                _encode_varint(pos - last_pos, postings)
+                last_pos = pos
+            _encode_varint(posting.headings, postings)
+            _encode_varint(posting.url, postings)
+            _encode_varint(posting.title, postings)
+        term_offsets.append(len(postings))
+        term_dfs.append(len(doc_postings))
+        csr_indptr.append(len(csr_docs))
+    
+    text_offsets = array('Q', [0])
+    meta_offsets = array('Q', [0])
+    texts = bytearray()
+    metas = bytearray()
+    for doc in index.docs:
+        texts += doc.text.encode('utf-8')
+        text_offsets.append(len(texts))
+        metas += json.dumps({
+            'url': doc.url,
+            'title': doc.title,
+            'headings': doc.headings,
+            'has_code': doc.has_code,
+            'id': doc.passage_id,
+            'start': doc.start,
+            'end': doc.end,
+            'chars': len(doc.text)
+        }, ensure_ascii=False).encode('utf-8')
+        meta_offsets.append(len(metas))
+    
+    field_lengths = array('I', [length for lengths in index.field_lengths for length in lengths])
+    sections = {
+        'terms': '\n'.join(terms).encode('utf-8'),
+        'term_offsets': _le_bytes(term_offsets),
+        'term_dfs': _le_bytes(term_dfs),
+        'postings': bytes(postings),
+        'text_offsets': _le_bytes(text_offsets),
+        'meta_offsets': _le_bytes(meta_offsets),
+        'field_lengths': _le_bytes(field_lengths),
+        'heading_docs': _le_bytes(array('I', index.heading_docs)),
+        'texts': bytes(texts),
+        'metas': bytes(metas),
+        'urls': '\n'.join(doc.url for doc in index.docs).encode('utf-8'),
+        'csr_indptr': _le_bytes(csr_indptr),
+        'csr_docs': _le_bytes(csr_docs),
+        'csr_fields': _le_bytes(csr_fields),
+    }
+    
+    table = []
+    offset = HEADER.size
+    for name in SECTIONS:
+        table += [offset, len(sections[name])]
+        offset += len(sections[name])
+    
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, index.doc_count, len(terms), *table))
+        for name in SECTIONS:
+            f.write(sections[name])
+    os.replace(tmp_path, path)
+
+
+def build_binary_index(docs: Iterable[Tuple[str, Dict]], path: str) -> InvertedIndex:
+    """Index crawler output and write it to path, returns the in-memory index"""
+    index = InvertedIndex.from_docs(docs)
+    write_binary_index(index, path)
+    return index
+
+
+class MmapIndex(BaseIndex):
+    """
+    Read-only index backed by a memory-mapped binary file
+    Only the term dictionary and per-doc offsets are read at open; postings,
+    page text and metadata are decoded on demand, so untouched pages never
+    leave the page cache. Decoded posting lists (LRU) and passage metadata are
+    cached within fixed bounds, since queries keep expanding to the same
+    frequent terms and scoring the same candidates
+    """
+    
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            header = HEADER.unpack_from(self._mm, 0)
+            if header[0] != MAGIC or header[1] != FORMAT_VERSION:
+                raise ValueError(f"Not a search index (or unsupported version): {path}")
+        except Exception:
+            self.close()
+            raise
+        
+        self._doc_count, term_count = header[2], header[3]
+        self._sections = {
+            name: (header[4 + 2 * i], header[5 + 2 * i]) for i, name in enumerate(SECTIONS)
+        }
+        
+        terms = self._section('terms').decode('utf-8')
+        self.terms: List[str] = terms.split('\n') if term_count else []
+        self.term_ids: Dict[str, int] = {term: i for i, term in enumerate(self.terms)}
+        self.term_offsets = _le_array('Q', self._section('term_offsets'))
+        self.term_dfs = _le_array('I', self._section('term_dfs'))
+        self.text_offsets = _le_array('Q', self._section('text_offsets'))
+        self.meta_offsets = _le_array('Q', self._section('meta_offsets'))
+        
+        lengths = _le_array('I', self._section('field_lengths'))
+        self.field_lengths = [tuple(lengths[i:i + 4]) for i in range(0, len(lengths), 4)]
+        self.heading_docs = list(_le_array('I', self._section('heading_docs')))
+        
+        urls = self._section('urls').decode('utf-8')
+        self.urls: List[str] = urls.split('\n') if self._doc_count else []
+        self.url_to_ids: Dict[str, List[int]] = {}
+        for doc_id, url in enumerate(self.urls):
+            self.url_to_ids.setdefault(url, []).append(doc_id)
+        
+        self._postings_start = self._sections['postings'][0]
+        self._postings_cache: OrderedDict = OrderedDict()
+        self._meta_cache: Dict[int, Dict] = {}
+        self._cache_lock = threading.Lock()
+        self._texts_start = self._sections['texts'][0]
+        self._metas_start = self._sections['metas'][0]
+    
+    def _section(self, name: str) -> bytes:
+        offset, length = self._sections[name]
+        return self._mm[offset:offset + length]
+    
+    def _get_meta(self, doc_id: int) -> Dict:
+        # Read on every scored candidate, so a plain dict that is emptied when full
+        meta = self._meta_cache.get(doc_id)
+        if meta is None:
+            start = self._metas_start + self.meta_offsets[doc_id]
+            end = self._metas_start + self.meta_offsets[doc_id + 1]
+            meta = json.loads(self._mm[start:end].decode('utf-8'))
+            if len(self._meta_cache) >= MAX_META_CACHE:
+                self._meta_cache.clear()
+            self._meta_cache[doc_id] = meta
+        return meta
+    
+    @property
+    def doc_count(self) -> int:
+        return self._doc_count
+    
+    def get_doc(self, doc_id: int) -> IndexedDoc:
+        meta = self._get_meta(doc_id)
+        start = self._texts_start + self.text_offsets[doc_id]
+        end = self._texts_start + self.text_offsets[doc_id + 1]
+        text = self._mm[start:end].decode('utf-8')
+        return IndexedDoc(meta['url'], text, meta['headings'], meta['title'], meta['has_code'],
+                          meta['id'], meta['start'], meta['end'])
+    
+    def _section_view(self, name: str) -> memoryview:
+        """Zero-copy view of a section (keeps the mapping alive while in use)"""
+        offset, length = self._sections[name]
+        return memoryview(self._mm)[offset:offset + length]
+    
+    def term_major_arrays(self) -> Tuple[List[str], memoryview, memoryview, memoryview, memoryview]:
+        return (self.terms, self._section_view('csr_indptr'), self._section_view('csr_docs'),
+                self._section_view('csr_fields'), self._section_view('field_lengths'))
+    
+    def doc_summary(self, doc_id: int) -> Tuple[str, list, int]:
+        meta = self._get_meta(doc_id)
+        return meta['url'], meta['headings'], meta['chars']
+    
+    def get_postings(self, term: str) -> Dict[int, Posting]:
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return {}
+        
+        with self._cache_lock:
+            postings = self._postings_cache.get(term_id)
+            if postings is not None:
+                self._postings_cache.move_to_end(term_id)
+                return postings
+        
+        postings = self._decode_postings(term_id)
+        with self._cache_lock:
+            self._postings_cache[term_id] = postings
+            while len(self._postings_cache) > MAX_POSTINGS_CACHE:
+                self._postings_cache.popitem(last=False)
+        return postings
+    
+    def _decode_postings(self, term_id: int) -> Dict[int, Posting]:
+        data = self._mm[self._postings_start + self.term_offsets[term_id]:
+                        self._postings_start + self.term_offsets[term_id + 1]]
+        
+        # Unpack every varint of the list in one pass, then walk the values
+        values = []
+        value = 0
+        shift = 0
+        for byte in data:
+            if byte < 0x80:
+                values.append(value | (byte << shift))
+                value = 0
+                shift = 0
+            else:
+                value |= (byte & 0x7F) << shift
+                shift += 7
+        
+        postings = {}
+        pos = 0
+        doc_id = 0
+        for _ in range(self.term_dfs[term_id]):
+            doc_id += values[pos]
+            count = values[pos + 1]
+            pos += 2
+            positions = []
+            last = 0
+            for delta in values[pos:pos + count]:
+                last += delta
+                positions.append(last)
+            pos += count
+            postings[doc_id] = Posting(doc_id, tuple(positions), values[pos], values[pos + 1], values[pos + 2])
+            pos += 3
+        return postings
+    
+    def vocabulary(self) -> Iterable[str]:
+        return self.terms
+    
+    def document_frequencies(self) -> Iterator[Tuple[str, int]]:
+        return zip(self.terms, self.term_dfs)
+    
+    def close(self) -> None:
+        if hasattr(self, '_postings_cache'):
+            self._postings_cache.clear()
+            self._meta_cache.clear()
+        mm = getattr(self, '_mm', None)
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                pass  # A scorer still maps sections; the mapping goes when it drops them
+            self._mm = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def apply_delta_file(delta_file: str, index_file: str) -> InvertedIndex:
+    """Apply a crawler delta file to a compiled index on disk"""
+    with open(delta_file, 'r', encoding='utf-8') as f:
+        delta = json.load(f)
+    
+    source = MmapIndex(index_file)
+    try:
+        index = InvertedIndex.from_index(source)
+    finally:
+        source.close()
+    counts = index.apply_delta(delta)
+    write_binary_index(index, index_file)
+    print(f"Applied delta: {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+    return index
+
+
+def main():
+    """Compile docs_content.json into the binary index used by FastLocalSearcher"""
+    src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    if len(sys.argv) > 2 and sys.argv[1] == '--apply-delta':
+        index_file = sys.argv[3] if len(sys.argv) > 3 else os.path.join(src_dir, 'docs_index.bin')
+        index = apply_delta_file(sys.argv[2], index_file)
+        print(f"  {len(index.url_to_ids)} pages ({index.doc_count} passages) in {index_file} "
+              f"({os.path.getsize(index_file) / 1024 / 1024:.2f} MB)")
+        return
+    
+    docs_file = sys.argv[1] if len(sys.argv) > 1 else os.path.join(src_dir, 'docs_content.json')
+    index_file = sys.argv[2] if len(sys.argv) > 2 else os.path.join(src_dir, 'docs_index.bin')
+    
+    index = build_binary_index(load_docs(docs_file), index_file)
+    print(f"Indexed {len(index.url_to_ids)} pages as {index.doc_count} passages, {len(index.postings)} terms")
+    print(f"  Wrote {index_file} ({os.path.getsize(index_file) / 1024 / 1024:.2f} MB)")
+
+
+if __name__ == "__main__":
+    main()
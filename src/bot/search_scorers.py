@@ -0,0 +1,390 @@
+# Pluggable ranking functions for FastLocalSearcher
+
+import math
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from bot.search_index import BaseIndex, heading_text
+
+try:
+    import numpy as np
+except ImportError:  # Vectorised scorer is optional
+    np = None
+
+
+STOP_WORDS = {'the', 'is', 'at', 'which', 'on', 'a', 'an', 'and', 'or', 'but', 'in', 'to', 'for', 'of', 'how', 'what', 'when', 'where', 'who', 'why', 'can', 'i', 'you', 'with'}
+
+
+def extract_keywords(query_lower: str) -> List[str]:
+    """Important keywords from a lowercased query (common words removed)"""
+    return [word for word in re.findall(r'\w+', query_lower) if word not in STOP_WORDS and len(word) > 2]
+
+
+def extract_heading_keywords(query_lower: str) -> List[str]:
+    """Heading matching keeps stop words, only drops very short words"""
+    return [word for word in re.findall(r'\w+', query_lower) if len(word) > 2]
+
+
+def add_heading_score(score: float, query_lower: str, doc_headings: list) -> float:
+    """Add heading boosts on top of an existing score"""
+    if not doc_headings:
+        return score
+    
+    keywords = extract_heading_keywords(query_lower)
+    
+    # MAJOR BOOST: Exact query match in any heading
+    for heading in doc_headings:
+        text = heading_text(heading)
+        
+        # Exact phrase in heading
+        if query_lower in text:
+            score += 100.0  # Massive boost!
+        
+        # All keywords present in one heading
+        elif all(kw in text for kw in keywords):
+            score += 50.0  # Strong boost
+        
+        # Individual keyword matches in headings
+        else:
+            for keyword in keywords:
+                if keyword in text:
+                    score += 10.0  # Good boost per keyword
+    
+    return score
+
+
+class Scorer:
+    """
+    Base class for ranking functions
+    prepare() runs once per index load, score() once per query
+    """
+    
+    name = ''
+    
+    def __init__(self):
+        self.index: Optional[BaseIndex] = None
+    
+    def prepare(self, index: BaseIndex) -> None:
+        """Precompute whatever statistics the scorer needs"""
+        self.index = index
+    
+    def score(self, query: str) -> List[Tuple[int, float]]:
+        """Return (doc_id, score) pairs worth showing, in doc id order"""
+        raise NotImplementedError
+    
+    def top_k(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        """Best `limit` (doc_id, score) pairs, highest first, ties in doc id order"""
+        scored = self.score(query)
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+
+class _KeywordHit:
+    """Where a query keyword occurs in one document (derived from postings)"""
+    __slots__ = ('count', 'first', 'occurrences')
+    
+    def __init__(self):
+        self.count = 0
+        self.first = None
+        self.occurrences = []  # (term, positions) pairs
+
+
+class LegacyScorer(Scorer):
+    """
+    The original heuristic (phrase/title/URL boosts, capped frequency, proximity,
+    length normalisation, heading boosts) evaluated from postings
+    """
+    
+    name = 'legacy'
+    threshold = 0.5  # Filters noise, same cut-off as the old full scan
+    
+    def _collect_keyword_hits(self, keywords: List[str]) -> Dict[str, Dict[int, _KeywordHit]]:
+        """
+        Gather per-document counts and first offsets of each keyword from the index
+        Mirrors text_lower.count(keyword) / text_lower.find(keyword) without touching text
+        """
+        keyword_hits = {}
+        for keyword in set(keywords):
+            hits = {}
+            for term in self.index.expand(keyword):
+                occurrences = term.count(keyword)
+                offset = term.find(keyword)
+                for doc_id, posting in self.index.get_postings(term).items():
+                    if not posting.positions:
+                        continue
+                    hit = hits.get(doc_id)
+                    if hit is None:
+                        hit = hits[doc_id] = _KeywordHit()
+                    hit.count += len(posting.positions) * occurrences
+                    first = posting.positions[0] + offset
+                    if hit.first is None or first < hit.first:
+                        hit.first = first
+                    hit.occurrences.append((term, posting.positions))
+            keyword_hits[keyword] = hits
+        return keyword_hits
+    
+    def _candidate_docs(self, keywords: List[str], heading_keywords: List[str]) -> List[int]:
+        """Doc ids that can score above zero: any keyword in text/URL, or in a heading"""
+        candidates = set()
+        for keyword in set(keywords):
+            for term in self.index.expand(keyword):
+                for doc_id, posting in self.index.get_postings(term).items():
+                    if posting.positions or posting.url:
+                        candidates.add(doc_id)
+        
+        if heading_keywords:
+            for keyword in set(heading_keywords):
+                for term in self.index.expand(keyword):
+                    for doc_id, posting in self.index.get_postings(term).items():
+                        if posting.headings:
+                            candidates.add(doc_id)
+        else:
+            # No usable keywords: every heading counts as an "all keywords" match
+            candidates.update(self.index.heading_docs)
+        
+        # Keep load order so ties resolve exactly like the full scan
+        return sorted(candidates)
+    
+    @staticmethod
+    def _keyword_near(hit: _KeywordHit, keyword: str, start: int, end: int) -> bool:
+        """True if keyword occurs entirely inside text_lower[start:end]"""
+        for term, positions in hit.occurrences:
+            for pos in positions:
+                if pos >= end:
+                    break
+                if pos + len(term) > start and keyword in term[max(0, start - pos):end - pos]:
+                    return True
+        return False
+    
+    def _score_doc(self, doc_id: int, query_lower: str, keywords: List[str],
+                   keyword_hits: Dict[str, Dict[int, _KeywordHit]]) -> float:
+        """
+        Same score as the original keyword heuristic over whole texts, computed from postings
+        Only the exact-phrase check reads the document text
+        """
+        url, headings, doc_length = self.index.doc_summary(doc_id)
+        score = 0.0
+        
+        if keywords:
+            hits = [keyword_hits[keyword].get(doc_id) for keyword in keywords]
+            
+            # BOOST: Exact phrase match (only possible if every keyword is present)
+            if all(hits) and query_lower in self.index.get_doc(doc_id).text.lower():
+                score += 50.0
+            
+            # BOOST: Keyword within the first 200 chars
+            for keyword, hit in zip(keywords, hits):
+                if hit and hit.first + len(keyword) <= 200:
+                    score += 10.0
+            
+            # BOOST: URL path matching
+            url_lower = url.lower()
+            for keyword in keywords:
+                if keyword in url_lower:
+                    score += 8.0
+            
+            # Score based on keyword frequency in text
+            for hit in hits:
+                if hit:
+                    score += min(hit.count, 5) * 1.5
+            
+            # BOOST: Consecutive keywords appearing close together
+            if len(keywords) >= 2:
+                for i, hit in enumerate(hits[:-1]):
+                    if hit:
+                        next_hit = hits[i + 1]
+                        start = max(0, hit.first - 25)
+                        if next_hit and self._keyword_near(next_hit, keywords[i + 1], start, hit.first + 75):
+                            score += 15.0
+            
+            if doc_length > 0:
+                score = score / (doc_length / 2000)
+        
+        return add_heading_score(score, query_lower, headings)
+    
+    def score(self, query: str) -> List[Tuple[int, float]]:
+        query_lower = query.lower()
+        keywords = extract_keywords(query_lower)
+        keyword_hits = self._collect_keyword_hits(keywords)
+        
+        scored = []
+        for doc_id in self._candidate_docs(keywords, extract_heading_keywords(query_lower)):
+            score = self._score_doc(doc_id, query_lower, keywords, keyword_hits)
+            if score > self.threshold:
+                scored.append((doc_id, score))
+        return scored
+
+
+class BM25FScorer(Scorer):
+    """
+    BM25F over text, headings, URL and title
+    Field lengths, length norms and IDF are precomputed in prepare(), so a query
+    only does arithmetic over the postings of its keywords
+    """
+    
+    name = 'bm25'
+    
+    # Per-field (weight, length normalisation b)
+    DEFAULT_FIELDS = {
+        'text': (1.0, 0.75),
+        'headings': (3.0, 0.5),
+        'url': (2.0, 0.3),
+        'title': (2.5, 0.3),
+    }
+    
+    def __init__(self, k1: float = 1.2, fields: Optional[Dict[str, Tuple[float, float]]] = None):
+        super().__init__()
+        self.k1 = k1
+        self.fields = dict(self.DEFAULT_FIELDS)
+        if fields:
+            self.fields.update(fields)
+        self.weights: Tuple[float, ...] = ()
+        self.doc_norms: List[Tuple[float, ...]] = []
+        self.idf: Dict[str, float] = {}
+    
+    def prepare(self, index: BaseIndex) -> None:
+        super().prepare(index)
+        count = index.doc_count
+        self.weights = tuple(self.fields[field][0] for field in BaseIndex.FIELDS)
+        
+        # Average field lengths, then per-doc normaliser 1 - b + b * len / avg
+        sums = [0] * len(BaseIndex.FIELDS)
+        for lengths in index.field_lengths:
+            for i, length in enumerate(lengths):
+                sums[i] += length
+        averages = [(total / count) if count else 0.0 for total in sums]
+        b_values = [self.fields[field][1] for field in BaseIndex.FIELDS]
+        
+        self.doc_norms = []
+        for lengths in index.field_lengths:
+            self.doc_norms.append(tuple(
+                (1 - b + b * length / avg) if avg else 1.0
+                for length, avg, b in zip(lengths, averages, b_values)
+            ))
+        
+        self.idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in index.document_frequencies()
+        }
+    
+    def score(self, query: str) -> List[Tuple[int, float]]:
+        k1 = self.k1
+        w_text, w_headings, w_url, w_title = self.weights
+        scores: Dict[int, float] = {}
+        
+        for term in set(extract_keywords(query.lower())):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, posting in self.index.get_postings(term).items():
+                n_text, n_headings, n_url, n_title = self.doc_norms[doc_id]
+                tf = (w_text * len(posting.positions) / n_text
+                      + w_headings * posting.headings / n_headings
+                      + w_url * posting.url / n_url
+                      + w_title * posting.title / n_title)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (k1 + tf)
+        
+        return sorted(scores.items())
+
+
+class VectorBM25FScorer(BM25FScorer):
+    """
+    BM25F evaluated with NumPy over term-major sparse arrays
+    prepare() maps the index's (doc id, per-field hits) arrays in place, so
+    startup only computes per-doc length norms and per-term IDF; a query is a
+    gather, one bincount and an argpartition
+    """
+    
+    name = 'bm25-numpy'
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.term_ids: Dict[str, int] = {}
+        self.term_ptr = None        # Slice bounds per term into posting arrays
+        self.posting_docs = None    # Doc id of every posting
+        self.posting_fields = None  # Text/heading/url/title hits of every posting
+        self.term_idf = None
+    
+    def prepare(self, index: BaseIndex) -> None:
+        # Skips BM25FScorer.prepare: its per-doc and per-term Python tables are not needed here
+        Scorer.prepare(self, index)
+        terms, indptr, docs, fields, lengths = index.term_major_arrays()
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.term_ptr = np.frombuffer(indptr, dtype='<u8').astype(np.int64)
+        self.posting_docs = np.frombuffer(docs, dtype='<u4')
+        self.posting_fields = np.frombuffer(fields, dtype='<u4').reshape(-1, len(BaseIndex.FIELDS))
+        self.weights = np.asarray([self.fields[field][0] for field in BaseIndex.FIELDS])
+        
+        # Per-doc normaliser 1 - b + b * len / avg for each field
+        field_lengths = np.frombuffer(lengths, dtype='<u4').reshape(-1, len(BaseIndex.FIELDS))
+        b_values = np.asarray([self.fields[field][1] for field in BaseIndex.FIELDS])
+        averages = field_lengths.mean(axis=0) if len(field_lengths) else np.zeros(len(BaseIndex.FIELDS))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            norms = 1 - b_values + b_values * field_lengths / averages
+        self.doc_norms = np.where(averages > 0, norms, 1.0)
+        
+        count = index.doc_count
+        dfs = np.diff(self.term_ptr)
+        self.term_idf = np.log(1 + (count - dfs + 0.5) / (dfs + 0.5))
+    
+    def _score_array(self, query: str):
+        """Dense per-doc score vector for the query (None if no keyword is indexed)"""
+        term_ids = [self.term_ids[term] for term in set(extract_keywords(query.lower())) if term in self.term_ids]
+        if not term_ids:
+            return None
+        
+        starts = self.term_ptr[term_ids]
+        ends = self.term_ptr[np.asarray(term_ids) + 1]
+        counts = ends - starts
+        # Flat posting indices for all query terms, plus the idf each one carries
+        offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        postings = np.arange(counts.sum()) + offsets
+        idf = np.repeat(self.term_idf[term_ids], counts)
+        
+        # BM25F pseudo term frequency, summed over fields in the same order as bm25
+        docs = self.posting_docs[postings]
+        weighted = self.posting_fields[postings] * self.weights / self.doc_norms[docs]
+        tf = weighted[:, 0] + weighted[:, 1] + weighted[:, 2] + weighted[:, 3]
+        k1 = self.k1
+        contributions = idf * tf * (k1 + 1) / (k1 + tf)
+        return np.bincount(docs, weights=contributions, minlength=self.index.doc_count)
+    
+    def score(self, query: str) -> List[Tuple[int, float]]:
+        scores = self._score_array(query)
+        if scores is None:
+            return []
+        doc_ids = np.flatnonzero(scores > 0)
+        return list(zip(doc_ids.tolist(), scores[doc_ids].tolist()))
+    
+    def top_k(self, query: str, limit: int) -> List[Tuple[int, float]]:
+        scores = self._score_array(query)
+        if scores is None or limit <= 0:
+            return []
+        
+        doc_ids = np.flatnonzero(scores > 0)
+        if len(doc_ids) > limit:
+            # Keep everything tied with the k-th best so tie order stays deterministic
+            kth = -np.partition(-scores[doc_ids], limit - 1)[limit - 1]
+            doc_ids = doc_ids[scores[doc_ids] >= kth]
+        order = np.lexsort((doc_ids, -scores[doc_ids]))[:limit]
+        doc_ids = doc_ids[order]
+        return list(zip(doc_ids.tolist(), scores[doc_ids].tolist()))
+
+
+SCORERS = {
+    LegacyScorer.name: LegacyScorer,
+    BM25FScorer.name: BM25FScorer,
+    VectorBM25FScorer.name: VectorBM25FScorer,
+}
+
+
+def get_scorer(name: Optional[str] = None) -> Scorer:
+    """Create a scorer by name, defaults to SEARCH_SCORER from .env (legacy if unset)"""
+    name = (name or os.getenv('SEARCH_SCORER', LegacyScorer.name)).lower()
+    if name not in SCORERS:
+        print(f"Unknown search scorer '{name}', using {LegacyScorer.name}")
+        name = LegacyScorer.name
+    if name == VectorBM25FScorer.name and np is None:
+        print("NumPy not installed, using the pure Python bm25 scorer")
+        name = BM25FScorer.name
+    return SCORERS[name]()
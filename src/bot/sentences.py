@@ -0,0 +1,32 @@
+# Sentence splitting shared by streamed answers and chunked speech synthesis
+
+import re
+
+
+# Sentence end: terminal punctuation (optionally closing quotes/brackets) then whitespace
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+|(?<=[.!?]["\')\]])\s+')
+
+
+def split_sentences(text):
+    """Split finished text into sentences"""
+    return [part.strip() for part in SENTENCE_END.split(text) if part.strip()]
+
+
+class SentenceSplitter:
+    """Incrementally cut streamed text into complete sentences"""
+    
+    def __init__(self):
+        self.buffer = ""
+    
+    def feed(self, text):
+        """Add streamed text, returns sentences completed by it"""
+        self.buffer += text
+        parts = SENTENCE_END.split(self.buffer)
+        # The last part has no terminator yet, keep it for the next chunk
+        self.buffer = parts.pop()
+        return [part.strip() for part in parts if part.strip()]
+    
+    def flush(self):
+        """Whatever is left once the stream ends"""
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
@@ -0,0 +1,127 @@
+# Runs several meeting sessions side by side on one event loop
+
+import asyncio
+import os
+import re
+from bot.async_bot import AsyncMeetBot
+from bot.audio_handler import parse_audio_devices
+from bot.meet_controller import MeetController
+
+
+class SessionManager:
+    """
+    Launches, tracks and stops AsyncMeetBot sessions keyed by meeting URL
+    Sessions share the AI responder (Gemini client + search index) through
+    AsyncMeetBot; each one gets its own browser profile and its own set of
+    sound devices (AUDIO_DEVICES), since sessions on the same devices would
+    hear and talk over each other. At most max_sessions run at once, and no
+    more than there are device sets
+    """
+    
+    def __init__(self, max_sessions=None, bot_factory=None, on_change=None, audio_devices=None):
+        self.max_sessions = max_sessions or int(os.getenv('MAX_SESSIONS', '3'))
+        self.audio_devices = audio_devices or parse_audio_devices(os.getenv('AUDIO_DEVICES'))
+        # bot_factory(profile_dir, audio_devices) -> EdgeMeetBot, lets callers instrument each bot
+        self.bot_factory = bot_factory
+        self.on_change = on_change  # Called whenever a session starts, changes status or ends
+        self.sessions = {}
+        self._tasks = {}
+        self._starting = set()
+        self._device_slots = {}  # Meeting key -> index into audio_devices
+    
+    @staticmethod
+    def meeting_key(meet_url):
+        """Normalise a Meet link so the same meeting always maps to one session"""
+        return meet_url.strip().split('?')[0].split('#')[0].rstrip('/').lower()
+    
+    @staticmethod
+    def session_id(meeting_key):
+        """Filesystem-safe id from the meeting code"""
+        code = meeting_key.rsplit('/', 1)[-1] or 'meeting'
+        return re.sub(r'[^a-z0-9_-]', '_', code)
+    
+    def _notify(self, session=None):
+        if self.on_change:
+            self.on_change()
+    
+    async def launch(self, meet_url):
+        """Start a session for this meeting; raises RuntimeError if it is already staffed or the cap is reached"""
+        key = self.meeting_key(meet_url)
+        if key in self.sessions or key in self._starting:
+            raise RuntimeError(f"Already in {key}")
+        if len(self.sessions) + len(self._starting) >= self.max_sessions:
+            raise RuntimeError(f"Session limit reached ({self.max_sessions})")
+        free = [slot for slot in range(len(self.audio_devices)) if slot not in self._device_slots.values()]
+        if not free:
+            raise RuntimeError(f"No free audio devices: all {len(self.audio_devices)} sets in AUDIO_DEVICES are in use")
+        
+        self._starting.add(key)
+        self._device_slots[key] = free[0]
+        devices = self.audio_devices[free[0]]
+        try:
+            # Profile copy and bot set-up (audio devices, model) stay off the loop
+            loop = asyncio.get_running_loop()
+            profile_dir = await loop.run_in_executor(None, MeetController.get_profile_dir, self.session_id(key))
+            if self.bot_factory:
+                bot = await loop.run_in_executor(None, self.bot_factory, profile_dir, devices)
+                session = AsyncMeetBot(bot, on_status=self._notify)
+            else:
+                session = await loop.run_in_executor(
+                    None, lambda: AsyncMeetBot(profile_dir=profile_dir, on_status=self._notify,
+                                               audio_devices=devices))
+        except BaseException:
+            self._device_slots.pop(key, None)
+            raise
+        finally:
+            self._starting.discard(key)
+        
+        self.sessions[key] = session
+        task = self._tasks[key] = asyncio.create_task(self._run(key, session, meet_url))
+        # Also runs for a task cancelled before it started, which never enters _run
+        task.add_done_callback(lambda _: self._forget(key))
+        self._notify()
+        return session
+    
+    async def _run(self, key, session, meet_url):
+        try:
+            await session.run(meet_url)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Session {key} failed: {str(e)}")
+    
+    def _forget(self, key):
+        """Drop an ended session and free its audio devices"""
+        self.sessions.pop(key, None)
+        self._tasks.pop(key, None)
+        self._device_slots.pop(key, None)
+        self._notify()
+    
+    async def stop(self, meet_url):
+        """Leave one meeting, returns False if no session was running for it"""
+        task = self._tasks.get(self.meeting_key(meet_url))
+        if not task:
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return True
+    
+    async def stop_all(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def status(self):
+        """Per-session status for the dashboard"""
+        sessions = []
+        for key, session in list(self.sessions.items()):
+            sessions.append({
+                'url': key,
+                'id': self.session_id(key),
+                'status': session.status,
+                'started_at': session.started_at,
+                'queues': {name: stage['depth'] for name, stage in session.bot.pipeline_stats().items()},
+                'tts': session.bot.audio_handler.tts_latency()
+            })
+        return sessions
@@ -0,0 +1,98 @@
+# Streaming speech recognition: fixed-size frames in, partial and final hypotheses out
+
+import json
+import os
+from typing import NamedTuple, Optional
+
+try:
+    import vosk
+except ImportError:  # Optional: streaming mode needs the Vosk package and a model
+    vosk = None
+
+
+_vosk_models = {}
+
+
+def load_vosk_model(model_path=None):
+    """Load a Vosk model once per path (shared by recognition and wake-word spotting), None if unavailable"""
+    model_path = model_path or os.getenv('VOSK_MODEL_PATH', 'models/vosk-model-small-en-us')
+    if not vosk or not os.path.isdir(model_path):
+        return None
+    if model_path not in _vosk_models:
+        vosk.SetLogLevel(-1)
+        _vosk_models[model_path] = vosk.Model(model_path)
+    return _vosk_models[model_path]
+
+
+class Hypothesis(NamedTuple):
+    text: str
+    final: bool
+
+
+class StreamingRecognizer:
+    """
+    Base class for streaming recognisers
+    Audio is 16-bit mono PCM fed in fixed-size frames; every frame may
+    produce a partial hypothesis (text so far) or a final one (utterance ended)
+    """
+    
+    name = ''
+    
+    def __init__(self, sample_rate=16000):
+        self.sample_rate = sample_rate
+    
+    def is_available(self):
+        return True
+    
+    def accept_frame(self, pcm) -> Optional[Hypothesis]:
+        raise NotImplementedError
+    
+    def reset(self):
+        """Drop any half-heard utterance"""
+
+
+class VoskStreamingRecognizer(StreamingRecognizer):
+    """Local CPU recognition with a Kaldi model through Vosk"""
+    
+    name = 'vosk'
+    
+    def __init__(self, sample_rate=16000, model_path=None):
+        super().__init__(sample_rate)
+        self.model = load_vosk_model(model_path)
+        self.recognizer = None
+        if self.model:
+            self.reset()
+    
+    def is_available(self):
+        return self.recognizer is not None
+    
+    def reset(self):
+        self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate)
+    
+    def accept_frame(self, pcm):
+        if self.recognizer.AcceptWaveform(pcm):
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            return Hypothesis(text, True) if text else None
+        text = json.loads(self.recognizer.PartialResult()).get('partial', '')
+        return Hypothesis(text, False) if text else None
+
+
+STREAMING_RECOGNIZERS = {
+    VoskStreamingRecognizer.name: VoskStreamingRecognizer,
+}
+
+
+def get_streaming_recognizer(name=None, sample_rate=16000):
+    """
+    Create a streaming recogniser by name, defaults to STT_BACKEND from .env
+    Returns None for the phrase-then-recognise mode (google) or when the
+    backend cannot load, so callers fall back to AudioHandler.capture_utterance
+    """
+    name = (name or os.getenv('STT_BACKEND', 'google')).lower()
+    if name not in STREAMING_RECOGNIZERS:
+        return None
+    recognizer = STREAMING_RECOGNIZERS[name](sample_rate=sample_rate)
+    if not recognizer.is_available():
+        print(f"  Speech backend '{name}' not available (install it and its model), using google")
+        return None
+    return recognizer
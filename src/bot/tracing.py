@@ -0,0 +1,168 @@
+# Per-question latency tracing: monotonic timestamps for each stage from end of speech to answer
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+# Stages in pipeline order; times are reported relative to listen_end
+STAGES = (
+    'listen_end',          # Speaker stopped, utterance captured
+    'recognition_done',    # Speech-to-text returned
+    'wake_matched',        # Wake word found, question extracted
+    'search_done',         # Documentation search finished
+    'gemini_first_token',  # First chunk of the answer arrived
+    'gemini_last_token',   # Answer complete
+    'tts_done',            # First clip of the answer synthesised
+    'playback_start',      # Audio started playing into the meeting
+    'citations_posted',    # Sources sent to the meeting chat
+)
+
+_local = threading.local()
+_ids = itertools.count(1)
+
+
+class Trace:
+    """Timestamps of one question; the first mark of a stage wins"""
+    
+    def __init__(self, start_stage='listen_end'):
+        self.id = next(_ids)
+        self.question = None
+        self.marks = {}
+        self.prompt_tokens = None  # Size of the Gemini prompt, set by the responder
+        self._lock = threading.Lock()
+        self.mark(start_stage)
+    
+    def mark(self, stage):
+        with self._lock:
+            if stage in self.marks:
+                return
+            self.marks[stage] = time.monotonic()
+        get_tracer().record(self, stage)
+    
+    def elapsed_ms(self, stage):
+        """Milliseconds from listen_end to stage, None if not reached"""
+        if stage not in self.marks:
+            return None
+        start = self.marks.get('listen_end', min(self.marks.values()))
+        return (self.marks[stage] - start) * 1000
+    
+    def summary(self):
+        return {
+            'id': self.id,
+            'question': self.question,
+            'prompt_tokens': self.prompt_tokens,
+            'stages': {stage: self.elapsed_ms(stage) for stage in STAGES if stage in self.marks}
+        }
+
+
+@contextmanager
+def activate(trace):
+    """Make a trace current for this thread: `with activate(trace): ...`"""
+    previous = getattr(_local, 'trace', None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+def mark(stage):
+    """Mark a stage on this thread's current trace; no-op outside a traced question"""
+    trace = current_trace()
+    if trace:
+        trace.mark(stage)
+
+
+class LatencyHistogram:
+    """Fixed buckets for the overall shape plus a rolling window for percentiles"""
+    
+    BOUNDS_MS = (100, 250, 500, 1000, 2000, 3000, 5000, 10000)
+    
+    def __init__(self, window=500):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.recent = deque(maxlen=window)
+    
+    def add(self, value_ms):
+        bucket = 0
+        while bucket < len(self.BOUNDS_MS) and value_ms > self.BOUNDS_MS[bucket]:
+            bucket += 1
+        self.counts[bucket] += 1
+        self.recent.append(value_ms)
+    
+    def percentile(self, pct):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+    
+    def summary(self):
+        return {
+            'count': sum(self.counts),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'buckets': self.counts
+        }
+
+
+class Tracer:
+    """Collects stage latencies from every trace and notifies listeners of finished ones"""
+    
+    def __init__(self, keep=50):
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES[1:]}
+        self.recent = deque(maxlen=keep)
+        self.listeners = []
+        self._lock = threading.Lock()
+    
+    def record(self, trace, stage):
+        value = trace.elapsed_ms(stage)
+        if stage in self.histograms and value is not None:
+            with self._lock:
+                self.histograms[stage].add(value)
+    
+    def add_listener(self, listener):
+        """listener(trace_summary, histograms) is called for every finished question"""
+        self.listeners.append(listener)
+    
+    def finish(self, trace):
+        summary = trace.summary()
+        with self._lock:
+            self.recent.append(summary)
+        histograms = self.summary()
+        for listener in list(self.listeners):
+            try:
+                listener(summary, histograms)
+            except Exception as e:
+                print(f"Trace listener error: {str(e)}")
+        return summary
+    
+    def summary(self):
+        """p50/p95 per stage, relative to listen_end"""
+        with self._lock:
+            return {stage: histogram.summary() for stage, histogram in self.histograms.items()}
+
+
+def format_trace(summary):
+    """One-line breakdown for the console"""
+    parts = [f"{stage.replace('_', ' ')} {ms / 1000:.2f}s" for stage, ms in summary['stages'].items()
+             if stage != 'listen_end']
+    if summary.get('prompt_tokens'):
+        parts.append(f"prompt {summary['prompt_tokens']} tokens")
+    return "Latency: " + " · ".join(parts)
+
+
+# Singleton instance
+_tracer = None
+
+def get_tracer():
+    """Get the process-wide Tracer"""
+    global _tracer
+    if _tracer is None:
+        _tracer = Tracer()
+    return _tracer
@@ -0,0 +1,132 @@
+# Content-addressed cache of synthesised speech so stock phrases play instantly
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+
+
+class AudioCache:
+    """
+    Decoded PCM keyed on (cleaned text, language, sample rate)
+    Recent clips stay in memory (LRU, bounded in bytes), every clip is also
+    written to disk as .npy so it survives restarts
+    """
+    
+    def __init__(self, cache_dir=None, max_memory_mb=64, max_disk_mb=200):
+        self.cache_dir = Path(cache_dir or self.default_dir())
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._prune_disk()
+        except Exception as e:
+            print(f"  TTS cache dir unavailable: {str(e)}")
+            self.cache_dir = None
+    
+    @staticmethod
+    def default_dir():
+        """Cache directory next to the browser profile"""
+        if os.name == 'nt':
+            return os.path.join(os.environ['LOCALAPPDATA'], 'MeetBot', 'TTSCache')
+        return os.path.expanduser('~/.meetbot/tts_cache')
+    
+    @staticmethod
+    def make_key(clean_text, lang, samplerate):
+        return hashlib.sha256(f"{lang}|{samplerate}|{clean_text}".encode('utf-8')).hexdigest()
+    
+    def get(self, clean_text, lang, samplerate):
+        """Cached samples or None"""
+        key = self.make_key(clean_text, lang, samplerate)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+        
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._remember(key, data)
+        return data
+    
+    def put(self, clean_text, lang, samplerate, data):
+        key = self.make_key(clean_text, lang, samplerate)
+        data = np.ascontiguousarray(data, dtype=np.float32)
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+    
+    def contains(self, clean_text, lang, samplerate):
+        key = self.make_key(clean_text, lang, samplerate)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return bool(self.cache_dir) and (self.cache_dir / f"{key}.npy").exists()
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'clips_in_memory': len(self._memory),
+                'memory_mb': self._memory_bytes / 1024 / 1024,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+    
+    def _remember(self, key, data):
+        """Insert into the memory LRU (caller holds the lock)"""
+        if data.nbytes > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old.nbytes
+        self._memory[key] = data
+        self._memory_bytes += data.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+    
+    def _read_disk(self, key):
+        if not self.cache_dir:
+            return None
+        path = self.cache_dir / f"{key}.npy"
+        try:
+            if path.exists():
+                os.utime(path)  # Mark as recently used for pruning
+                return np.load(path)
+        except Exception as e:
+            print(f"  TTS cache read error: {str(e)}")
+        return None
+    
+    def _write_disk(self, key, data):
+        if not self.cache_dir:
+            return
+        try:
+            tmp_path = self.cache_dir / f"{key}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp_path, self.cache_dir / f"{key}.npy")
+        except Exception as e:
+            print(f"  TTS cache write error: {str(e)}")
+    
+    def _prune_disk(self):
+        """Drop least recently used clips once the directory exceeds its budget"""
+        files = sorted(self.cache_dir.glob('*.npy'), key=lambda path: path.stat().st_mtime)
+        total = sum(path.stat().st_size for path in files)
+        for path in files:
+            if total <= self.max_disk_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink()
@@ -0,0 +1,113 @@
+# Frame-level voice activity detection and endpointing for captured speech
+
+import os
+from collections import deque
+import numpy as np
+
+try:
+    import webrtcvad
+except ImportError:  # Optional: the energy detector works without it
+    webrtcvad = None
+
+
+class EnergyVAD:
+    """
+    Speech when a frame's RMS rises well above the tracked noise floor
+    The floor follows non-speech frames, so it adapts to the meeting's background
+    """
+    
+    name = 'energy'
+    
+    def __init__(self, sample_rate=16000, ratio=3.0, min_rms=300.0):
+        self.sample_rate = sample_rate
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.noise_floor = None
+    
+    def is_speech(self, pcm):
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32)
+        if not len(samples):
+            return False
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        if self.noise_floor is None:
+            self.noise_floor = rms
+        speech = rms > max(self.min_rms, self.noise_floor * self.ratio)
+        if not speech:
+            self.noise_floor = 0.95 * self.noise_floor + 0.05 * rms
+        return speech
+
+
+class WebRtcVAD:
+    """WebRTC's GMM voice detector (10/20/30 ms frames at 8/16/32/48 kHz)"""
+    
+    name = 'webrtc'
+    SAMPLE_RATES = (8000, 16000, 32000, 48000)
+    
+    def __init__(self, sample_rate=16000, aggressiveness=2):
+        self.sample_rate = sample_rate
+        self.vad = webrtcvad.Vad(aggressiveness) if webrtcvad else None
+    
+    def is_available(self):
+        return self.vad is not None and self.sample_rate in self.SAMPLE_RATES
+    
+    def is_speech(self, pcm):
+        return self.vad.is_speech(pcm, self.sample_rate)
+
+
+def get_vad(name=None, sample_rate=16000):
+    """Voice detector by name, defaults to VAD_BACKEND from .env (energy)"""
+    name = (name or os.getenv('VAD_BACKEND', EnergyVAD.name)).lower()
+    if name == WebRtcVAD.name:
+        vad = WebRtcVAD(sample_rate, int(os.getenv('VAD_AGGRESSIVENESS', '2')))
+        if vad.is_available():
+            return vad
+        print(f"  WebRTC VAD not available at {sample_rate} Hz, using energy detection")
+    return EnergyVAD(sample_rate)
+
+
+class Endpointer:
+    """
+    Cuts a stream of fixed-size frames into utterances
+    An utterance starts after start_speech_ms of speech (keeping pre_roll_ms
+    of audio before it) and ends end_silence_ms after the speech stops
+    """
+    
+    def __init__(self, vad, frame_ms=30, end_silence_ms=500, start_speech_ms=90,
+                 pre_roll_ms=300, max_utterance_ms=15000):
+        self.vad = vad
+        self.frame_ms = frame_ms
+        self.end_silence_frames = max(1, end_silence_ms // frame_ms)
+        self.start_speech_frames = max(1, start_speech_ms // frame_ms)
+        self.max_frames = max(1, max_utterance_ms // frame_ms)
+        self.pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self.reset()
+    
+    def reset(self):
+        self.pre_roll.clear()
+        self.frames = []
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+    
+    def feed(self, pcm):
+        """Add one frame, returns the utterance's PCM bytes once it has ended"""
+        speech = self.vad.is_speech(pcm)
+        
+        if not self.in_speech:
+            self.pre_roll.append(pcm)
+            self.speech_run = self.speech_run + 1 if speech else 0
+            if self.speech_run >= self.start_speech_frames:
+                self.in_speech = True
+                self.frames = list(self.pre_roll)
+                self.silence_run = 0
+            return None
+        
+        self.frames.append(pcm)
+        self.silence_run = 0 if speech else self.silence_run + 1
+        if self.silence_run >= self.end_silence_frames or len(self.frames) >= self.max_frames:
+            # Drop the trailing silence, keep a little so the last word is not clipped
+            keep = len(self.frames) - self.silence_run + min(self.silence_run, 3)
+            utterance = b''.join(self.frames[:keep])
+            self.reset()
+            return utterance
+        return None
@@ -0,0 +1,108 @@
+# Local wake-word spotting on raw microphone frames, so only addressed speech goes to the cloud
+
+import json
+import os
+from bot.speech_stream import load_vosk_model, vosk
+
+
+class WakeWordSpotter:
+    """
+    Base class for keyword spotters
+    process_frame returns True once a wake phrase has been heard. Every other
+    utterance the spotter rejects is a cloud recognition that did not happen
+    """
+    
+    name = ''
+    
+    def __init__(self, phrases, sample_rate=16000):
+        self.phrases = [phrase.lower() for phrase in phrases]
+        self.sample_rate = sample_rate
+        self.frames_processed = 0
+        self.detections = 0
+        self.recognitions_avoided = 0
+    
+    def is_available(self):
+        return True
+    
+    def _detect(self, pcm):
+        raise NotImplementedError
+    
+    def process_frame(self, pcm):
+        self.frames_processed += 1
+        detected = self._detect(pcm)
+        if detected:
+            self.detections += 1
+        return detected
+    
+    def reset(self):
+        pass
+    
+    def _matches(self, text):
+        return any(phrase in text for phrase in self.phrases)
+    
+    def stats(self):
+        return {
+            'frames_processed': self.frames_processed,
+            'detections': self.detections,
+            'recognitions_avoided': self.recognitions_avoided
+        }
+
+
+class VoskWakeWordSpotter(WakeWordSpotter):
+    """
+    Vosk decoding restricted to a grammar of the wake phrases plus [unk]
+    The tiny search space keeps it cheap enough to run on every frame
+    """
+    
+    name = 'vosk'
+    
+    def __init__(self, phrases, sample_rate=16000, model_path=None):
+        super().__init__(phrases, sample_rate)
+        self.model = load_vosk_model(model_path)
+        self.grammar = json.dumps(self.phrases + ['[unk]'])
+        self.recognizer = None
+        if self.model:
+            self.reset()
+    
+    def is_available(self):
+        return self.recognizer is not None
+    
+    def reset(self):
+        self.recognizer = vosk.KaldiRecognizer(self.model, self.sample_rate, self.grammar)
+    
+    def _detect(self, pcm):
+        if self.recognizer.AcceptWaveform(pcm):
+            text = json.loads(self.recognizer.Result()).get('text', '')
+            if self._matches(text):
+                self.reset()
+                return True
+            if text:
+                # A whole utterance that was not addressed to the bot
+                self.recognitions_avoided += 1
+            return False
+        
+        if self._matches(json.loads(self.recognizer.PartialResult()).get('partial', '')):
+            # Fire on the partial so the question that follows is not missed
+            self.reset()
+            return True
+        return False
+
+
+WAKE_WORD_SPOTTERS = {
+    VoskWakeWordSpotter.name: VoskWakeWordSpotter,
+}
+
+
+def get_wake_word_spotter(phrases, name=None, sample_rate=16000):
+    """
+    Create a spotter by name, defaults to WAKE_WORD_SPOTTER from .env (vosk)
+    Returns None when disabled (none) or unavailable; every utterance is then recognised
+    """
+    name = (name or os.getenv('WAKE_WORD_SPOTTER', 'vosk')).lower()
+    if name not in WAKE_WORD_SPOTTERS:
+        return None
+    spotter = WAKE_WORD_SPOTTERS[name](phrases, sample_rate=sample_rate)
+    if not spotter.is_available():
+        print(f"  Wake-word spotter '{name}' not available, recognising every utterance")
+        return None
+    return spotter
@@ -4,10 +4,207 @@
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse, urldefrag
+import argparse
+import asyncio
+import hashlib
 import json
 import os
 import time
-from typing import Set, Dict, Any
+from concurrent.futures import ProcessPoolExecutor
+from typing import Set, Dict, Any, Iterable, Iterator, Optional, Tuple
+
+try:
+    import aiohttp
+except ImportError:  # Concurrent crawl mode is optional
+    aiohttp = None
+
+try:
+    import lxml.etree
+    import lxml.html
+except ImportError:  # Fast extraction is optional, BeautifulSoup is the fallback
+    lxml = None
+
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Priority order for content extraction
+CONTENT_SELECTORS = [
+    'main',  # Most GitBook sites use <main>
+    'article',
+    '.markdown-section',  # Common GitBook class
+    '[role="main"]',
+    '.page-content',
+    '#content'
+]
+
+# Navigation, sidebar, footer and other noise removed from the content
+UNWANTED_SELECTORS = [
+    'nav',
+    'header',
+    'footer',
+    '.sidebar',
+    '.navigation',
+    '.breadcrumb',
+    '.page-header',
+    '.page-footer',
+    '[role="navigation"]',
+    '.toc',
+    '.table-of-contents',
+    'script',
+    'style',
+    'noscript',
+    '.ad',
+    '.advertisement'
+]
+
+HEADING_TAGS = ('h1', 'h2', 'h3', 'h4', 'h5', 'h6')
+CODE_TAGS = ('code', 'pre')
+
+
+def _selector_xpath(selector: str) -> str:
+    """XPath step for the simple CSS selectors above: tag, .class, #id or [attr="value"]"""
+    if selector.startswith('.'):
+        return f"*[contains(concat(' ', normalize-space(@class), ' '), ' {selector[1:]} ')]"
+    if selector.startswith('#'):
+        return f"*[@id='{selector[1:]}']"
+    if selector.startswith('['):
+        name, value = selector[1:-1].split('=')
+        return f"*[@{name}={value}]"
+    return selector
+
+
+if lxml is not None:
+    CONTENT_XPATHS = [(selector, lxml.etree.XPath('//' + _selector_xpath(selector)))
+                      for selector in CONTENT_SELECTORS]
+    # One combined pass instead of a select() per selector
+    UNWANTED_XPATH = lxml.etree.XPath(' | '.join('.//' + _selector_xpath(s) for s in UNWANTED_SELECTORS))
+
+
+def _walk_content(root) -> Tuple[str, list, list]:
+    """
+    Text, headings and code blocks of root in a single traversal
+    Matches get_text(separator=' ', strip=True) for the text and get_text(strip=True)
+    for each heading and code block, as the BeautifulSoup path uses
+    """
+    strings = []
+    headings = []     # (tag, parts) in document order
+    code_blocks = []  # parts in document order
+    open_parts = []   # Parts of the headings / code blocks we are inside
+    
+    def add(value):
+        if value:
+            value = value.strip()
+            if value:
+                strings.append(value)
+                for parts in open_parts:
+                    parts.append(value)
+    
+    # Comments and processing instructions only come as their own events; their text
+    # is skipped like BeautifulSoup does, but the text after them still counts
+    for event, element in lxml.etree.iterwalk(root, events=('start', 'end', 'comment', 'pi')):
+        tag = element.tag
+        if event == 'start':
+            if tag in HEADING_TAGS:
+                headings.append((tag, []))
+                open_parts.append(headings[-1][1])
+            elif tag in CODE_TAGS:
+                code_blocks.append([])
+                open_parts.append(code_blocks[-1])
+            add(element.text)
+        elif event == 'end':
+            if tag in HEADING_TAGS or tag in CODE_TAGS:
+                open_parts.pop()
+            if element is not root:
+                add(element.tail)
+        else:
+            add(element.tail)
+    
+    text = ' '.join(' '.join(strings).split())
+    heading_list = []
+    for tag, parts in headings:
+        heading_text = ''.join(parts)
+        if heading_text:
+            heading_list.append({'level': tag, 'text': heading_text})
+    code_list = [code for code in (''.join(parts) for parts in code_blocks) if len(code) > 10]
+    return text, heading_list, code_list
+
+
+class TokenBucket:
+    """
+    Async rate limiter: on average `rate` requests per second, with bursts of up to `burst`
+    Replaces the fixed sleep between requests, so concurrent fetches share one politeness budget
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+    
+    async def acquire(self) -> None:
+        """Wait until a request may be sent"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class JsonlCorpusWriter:
+    """
+    Streaming crawl output: one JSON record per line, appended as each page is crawled
+    Record: {"url": ..., "content": {text, headings, code_blocks, title} or null, "links": [...]}
+    Visited pages without content are recorded too, so an interrupted crawl can
+    resume with the same visited set and the links it still had to follow
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        self.records = 0
+        self._file = None
+    
+    @staticmethod
+    def read(path: str) -> Iterator[Dict[str, Any]]:
+        """Records in crawl order; a torn last line from an interrupted crawl is skipped"""
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.endswith('\n'):
+                    break
+                if line.strip():
+                    yield json.loads(line)
+    
+    def open(self, resume: bool = False) -> None:
+        """Start a new file, or append after the last complete record of an existing one"""
+        if resume and os.path.exists(self.path):
+            with open(self.path, 'rb+') as f:
+                end = 0
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    end += len(line)
+                f.truncate(end)
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+    
+    def write(self, url: str, content: Optional[Dict[str, Any]], links: Iterable[str] = ()) -> None:
+        record = {'url': url, 'content': content, 'links': sorted(links)}
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        # Flush per page so a crash loses at most the page being written
+        self._file.flush()
+        self.records += 1
+    
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
 
 
 class ImprovedGitBookCrawler:
@@ -18,13 +215,25 @@ class ImprovedGitBookCrawler:
     - Cleans up formatting for better AI understanding
     """
     
-    def __init__(self, base_url: str = "https://docs.fastn.ai"):
+    def __init__(self, base_url: str = "https://docs.fastn.ai", fast_extract: bool = True):
         self.base_url = base_url
+        self.fast_extract = fast_extract  # Parse with lxml when it is installed
         self.visited_urls: Set[str] = set()
         self.docs_content: Dict[str, Dict[str, Any]] = {}
+        # Incremental re-crawl: validators, body hash and links per URL, and the last crawl's output
+        self.page_state: Dict[str, Dict[str, Any]] = {}
+        self.previous_content: Dict[str, Dict[str, Any]] = {}
+        self.incremental = False
+        self.delta: Dict[str, Dict[str, Dict[str, Any]]] = {'added': {}, 'changed': {}}
+        self.unchanged_pages = 0
+        # Set to stream pages to a JSONL file instead of keeping them in docs_content
+        self.writer: Optional[JsonlCorpusWriter] = None
+        self.resume_frontier: Set[str] = set()
+        self.content_urls: Set[str] = set()
+        self.totals = {'text_chars': 0, 'headings': 0, 'code_blocks': 0}
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': USER_AGENT
         })
     
     def is_valid_url(self, url: str) -> bool:
@@ -55,17 +264,7 @@ class ImprovedGitBookCrawler:
         # Try different selectors for GitBook content
         main_content = None
         
-        # Priority order for content extraction
-        selectors = [
-            'main',  # Most GitBook sites use <main>
-            'article',
-            '.markdown-section',  # Common GitBook class
-            '[role="main"]',
-            '.page-content',
-            '#content'
-        ]
-        
-        for selector in selectors:
+        for selector in CONTENT_SELECTORS:
             main_content = soup.select_one(selector)
             if main_content:
                 print(f"  Found content using selector: {selector}")
@@ -80,26 +279,7 @@ class ImprovedGitBookCrawler:
             return None
         
         # Remove unwanted elements (navigation, sidebar, footer, etc.)
-        unwanted_selectors = [
-            'nav',
-            'header',
-            'footer',
-            '.sidebar',
-            '.navigation',
-            '.breadcrumb',
-            '.page-header',
-            '.page-footer',
-            '[role="navigation"]',
-            '.toc',
-            '.table-of-contents',
-            'script',
-            'style',
-            'noscript',
-            '.ad',
-            '.advertisement'
-        ]
-        
-        for selector in unwanted_selectors:
+        for selector in UNWANTED_SELECTORS:
             for element in main_content.select(selector):
                 element.decompose()
         
@@ -144,18 +324,201 @@ class ImprovedGitBookCrawler:
         return content
     
     def get_links(self, soup: BeautifulSoup, current_url: str) -> Set[str]:
-        """Extract all valid documentation links"""
+        """
+        Extract all valid documentation links, visited or not
+        The full set is what gets stored for an unchanged page, so replaying it
+        must not depend on crawl order; visited pages are skipped when queueing
+        """
+        return self._filter_links((a['href'] for a in soup.find_all('a', href=True)), current_url)
+    
+    def _filter_links(self, hrefs: Iterable[str], current_url: str) -> Set[str]:
         links = set()
         
-        for a in soup.find_all('a', href=True):
-            url = urljoin(current_url, a['href'])
+        for href in hrefs:
+            url = urljoin(current_url, href)
             url, _ = urldefrag(url)  # Remove anchors
             
-            if self.is_valid_url(url) and url not in self.visited_urls:
+            if self.is_valid_url(url):
                 links.add(url)
         
         return links
     
+    def extract_page_fast(self, html: str, current_url: str) -> Tuple[Optional[Dict[str, Any]], Set[str]]:
+        """
+        Same content and links as extract_main_content + get_links, using lxml's C parser
+        Unwanted nodes are removed in one combined XPath pass and text, headings
+        and code blocks are collected in one traversal
+        """
+        doc = lxml.html.document_fromstring(html)
+        
+        main_content = None
+        for selector, xpath in CONTENT_XPATHS:
+            matches = xpath(doc)
+            if matches:
+                main_content = matches[0]
+                print(f"  Found content using selector: {selector}")
+                break
+        
+        if main_content is None:
+            # Fallback to body
+            main_content = next(doc.iter('body'), None)
+            print("  Using fallback: body tag")
+        
+        content = None
+        if main_content is not None:
+            for element in UNWANTED_XPATH(main_content):
+                element.drop_tree()  # Keeps the text that follows the element
+            
+            text, headings, code_blocks = _walk_content(main_content)
+            content = {
+                'text': text,
+                'headings': headings,
+                'code_blocks': code_blocks
+            }
+            
+            title_tag = next(doc.iter('title'), None)
+            if title_tag is not None:
+                content['title'] = ''.join(part.strip() for part in title_tag.itertext())
+            
+            meta_desc = next((meta for meta in doc.iter('meta') if meta.get('name') == 'description'), None)
+            if meta_desc is not None and meta_desc.get('content'):
+                content['description'] = meta_desc.get('content')
+        
+        hrefs = (a.get('href') for a in doc.iter('a') if a.get('href') is not None)
+        return content, self._filter_links(hrefs, current_url)
+    
+    def parse_html(self, html: str, current_url: str) -> Tuple[Optional[Dict[str, Any]], Set[str]]:
+        """Content and links of one page, through lxml when available"""
+        if self.fast_extract and lxml is not None:
+            try:
+                return self.extract_page_fast(html, current_url)
+            except (ValueError, lxml.etree.ParserError):
+                pass  # e.g. an empty document, BeautifulSoup copes with it
+        
+        soup = BeautifulSoup(html, 'html.parser')
+        content = self.extract_main_content(soup)
+        return content, self.get_links(soup, current_url)
+    
+    def store_page(self, url: str, content: Optional[Dict[str, Any]], links: Iterable[str] = ()) -> None:
+        """Keep a parsed page if it has any text"""
+        if content and content['text']:
+            print(f"  ✓ Extracted {len(content['text'])} chars, "
+                  f"{len(content['headings'])} headings, "
+                  f"{len(content['code_blocks'])} code blocks")
+        else:
+            print(f"  ✗ No content extracted")
+        self.keep_page(url, content, links)
+    
+    def _count_page(self, url: str, content: Dict[str, Any]) -> None:
+        self.content_urls.add(url)
+        self.totals['text_chars'] += len(content['text'])
+        self.totals['headings'] += len(content['headings'])
+        self.totals['code_blocks'] += len(content['code_blocks'])
+    
+    def keep_page(self, url: str, content: Optional[Dict[str, Any]], links: Iterable[str] = ()) -> None:
+        """Add a visited page to the output: streamed to the JSONL writer, or kept for save_to_json"""
+        has_text = bool(content and content['text'])
+        if has_text:
+            self._count_page(url, content)
+            if self.incremental:
+                previous = self.previous_content.get(url)
+                if previous is None:
+                    self.delta['added'][url] = content
+                elif previous != content:
+                    self.delta['changed'][url] = content
+        
+        if self.writer:
+            self.writer.write(url, content if has_text else None, links)
+        elif has_text:
+            self.docs_content[url] = content
+    
+    def resume_from(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Restore visited pages and the links still to follow from an interrupted JSONL crawl"""
+        linked = set()
+        for record in records:
+            self.visited_urls.add(record['url'])
+            linked.update(record.get('links') or [])
+            if record.get('content'):
+                self._count_page(record['url'], record['content'])
+        self.resume_frontier = linked - self.visited_urls
+        print(f"Resuming: {len(self.visited_urls)} pages already crawled, "
+              f"{len(self.resume_frontier)} links left to follow")
+    
+    def load_previous(self, output_file: str, state_file: str) -> None:
+        """Load the last crawl's output and page state so unchanged pages can be skipped"""
+        self.incremental = True
+        for filename, attr in ((output_file, 'previous_content'), (state_file, 'page_state')):
+            if not os.path.exists(filename):
+                continue
+            try:
+                if filename.endswith('.jsonl'):
+                    value = {record['url']: record['content'] for record in JsonlCorpusWriter.read(filename)
+                             if record.get('content')}
+                else:
+                    with open(filename, 'r', encoding='utf-8') as f:
+                        value = json.load(f)
+                setattr(self, attr, value)
+            except Exception as e:
+                print(f"✗ Could not load {filename}: {str(e)}")
+        print(f"Incremental crawl: {len(self.previous_content)} pages from the last run, "
+              f"{len(self.page_state)} with stored validators")
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since for pages seen in the last crawl"""
+        state = self.page_state.get(url)
+        headers = {}
+        # Without stored links a 304 would leave nothing to follow
+        if not state or state.get('links') is None:
+            return headers
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+    
+    def check_unchanged(self, url: str, status: int, headers, body: bytes) -> Optional[Set[str]]:
+        """
+        Record validators and body hash of a fetched page
+        Returns the page's links from the last crawl if it has not changed (no parsing needed), else None
+        """
+        previous = self.page_state.get(url, {})
+        digest = previous.get('hash') if status == 304 else hashlib.sha256(body).hexdigest()
+        self.page_state[url] = {
+            'etag': headers.get('ETag') or previous.get('etag'),
+            'last_modified': headers.get('Last-Modified') or previous.get('last_modified'),
+            'hash': digest,
+            'links': previous.get('links')
+        }
+        
+        if (status == 304 or digest == previous.get('hash')) and previous.get('links') is not None:
+            self.keep_page(url, self.previous_content.get(url), previous['links'])
+            self.unchanged_pages += 1
+            print(f"  = Unchanged ({'304' if status == 304 else 'same hash'}), skipped parsing")
+            return set(previous['links'])
+        return None
+    
+    def remember_links(self, url: str, links: Set[str]) -> None:
+        """Store a parsed page's links so an unchanged page can be followed without parsing"""
+        if url in self.page_state:
+            self.page_state[url]['links'] = sorted(links)
+    
+    def handle_fetch_error(self, url: str, status: Optional[int] = None) -> None:
+        """A page that failed for a transient reason keeps its content from the last crawl"""
+        self.visited_urls.add(url)
+        if status in (404, 410):
+            self.page_state.pop(url, None)
+        elif url in self.previous_content:
+            links = self.page_state.get(url, {}).get('links') or []
+            self.keep_page(url, self.previous_content[url], links)
+    
+    def build_delta(self) -> Dict[str, Any]:
+        """Pages added, changed and removed since the last crawl"""
+        return {
+            'added': self.delta['added'],
+            'changed': self.delta['changed'],
+            'removed': [url for url in self.previous_content if url not in self.content_urls]
+        }
+    
     def crawl(self, url: str, max_pages: int = 1000) -> None:
         """
         Crawl documentation starting from given URL
@@ -164,7 +527,7 @@ class ImprovedGitBookCrawler:
             url: Starting URL
             max_pages: Maximum pages to crawl (safety limit)
         """
-        to_visit = {url}
+        to_visit = set(self.resume_frontier) or {url}
         
         while to_visit and len(self.visited_urls) < max_pages:
             current_url = to_visit.pop()
@@ -175,35 +538,113 @@ class ImprovedGitBookCrawler:
             try:
                 print(f"\n[{len(self.visited_urls) + 1}] Crawling: {current_url}")
                 
-                response = self.session.get(current_url, timeout=10)
+                response = self.session.get(current_url, timeout=10,
+                                            headers=self.conditional_headers(current_url))
                 response.raise_for_status()
                 
                 self.visited_urls.add(current_url)
                 
-                soup = BeautifulSoup(response.text, 'html.parser')
-                content = self.extract_main_content(soup)
-                
-                if content and content['text']:
-                    self.docs_content[current_url] = content
-                    print(f"  ✓ Extracted {len(content['text'])} chars, "
-                          f"{len(content['headings'])} headings, "
-                          f"{len(content['code_blocks'])} code blocks")
-                else:
-                    print(f"  ✗ No content extracted")
-                
-                # Get new links
-                new_links = self.get_links(soup, current_url)
-                to_visit.update(new_links)
+                new_links = self.check_unchanged(current_url, response.status_code,
+                                                 response.headers, response.content)
+                if new_links is None:
+                    content, new_links = self.parse_html(response.text, current_url)
+                    self.store_page(current_url, content, new_links)
+                    self.remember_links(current_url, new_links)
+                to_visit.update(link for link in new_links if link not in self.visited_urls)
                 
                 # Be polite - small delay
                 time.sleep(0.5)
                 
             except requests.exceptions.RequestException as e:
                 print(f"  ✗ Error: {str(e)}")
-                self.visited_urls.add(current_url)
+                response = getattr(e, 'response', None)
+                self.handle_fetch_error(current_url, response.status_code if response is not None else None)
             except Exception as e:
                 print(f"  ✗ Unexpected error: {str(e)}")
-                self.visited_urls.add(current_url)
+                self.handle_fetch_error(current_url)
+    
+    def crawl_concurrent(self, url: str, max_pages: int = 1000, concurrency: int = 16,
+                         per_host: int = 8, rate: float = 10.0, parse_workers: Optional[int] = None) -> None:
+        """
+        Crawl with many requests in flight instead of one page at a time
+        
+        Args:
+            url: Starting URL
+            max_pages: Maximum pages to crawl (safety limit)
+            concurrency: Fetch workers, also the size of the connection pool
+            per_host: Most open connections to one host
+            rate: Requests per second per host (token bucket, 0 for unlimited)
+            parse_workers: Processes for HTML parsing (defaults to CPU count)
+        """
+        if aiohttp is None:
+            print("aiohttp not installed, crawling one page at a time")
+            self.crawl(url, max_pages)
+            return
+        
+        with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+            asyncio.run(self._crawl_async(url, max_pages, concurrency, per_host, rate, parse_pool))
+    
+    async def _crawl_async(self, url: str, max_pages: int, concurrency: int, per_host: int,
+                           rate: float, parse_pool: ProcessPoolExecutor) -> None:
+        loop = asyncio.get_running_loop()
+        to_visit: asyncio.Queue = asyncio.Queue()
+        start = (set(self.resume_frontier) or {url}) - self.visited_urls
+        scheduled = self.visited_urls | start  # Queued or visited, capped at max_pages
+        buckets: Dict[str, TokenBucket] = {}
+        for start_url in start:
+            to_visit.put_nowait(start_url)
+        
+        async def fetch(session, current_url):
+            host = urlparse(current_url).netloc
+            if host not in buckets:
+                buckets[host] = TokenBucket(rate)
+            await buckets[host].acquire()
+            async with session.get(current_url, headers=self.conditional_headers(current_url)) as response:
+                response.raise_for_status()
+                body = await response.read()
+                html = await response.text() if response.status != 304 else ''
+                return response.status, response.headers, body, html
+        
+        async def worker(session):
+            while True:
+                current_url = await to_visit.get()
+                try:
+                    status, headers, body, html = await fetch(session, current_url)
+                    self.visited_urls.add(current_url)
+                    print(f"\n[{len(self.visited_urls)}] Crawled: {current_url}")
+                    
+                    links = self.check_unchanged(current_url, status, headers, body)
+                    if links is None:
+                        # BeautifulSoup is CPU bound, parse in another process so fetching continues
+                        content, links = await loop.run_in_executor(
+                            parse_pool, parse_page, html, current_url, self.base_url, self.fast_extract
+                        )
+                        self.store_page(current_url, content, links)
+                        self.remember_links(current_url, links)
+                    
+                    for link in links:
+                        if link not in scheduled and len(scheduled) < max_pages:
+                            scheduled.add(link)
+                            to_visit.put_nowait(link)
+                
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    print(f"  ✗ Error: {current_url}: {str(e) or type(e).__name__}")
+                    self.handle_fetch_error(current_url, getattr(e, 'status', None))
+                except Exception as e:
+                    print(f"  ✗ Unexpected error: {current_url}: {str(e)}")
+                    self.handle_fetch_error(current_url)
+                finally:
+                    to_visit.task_done()
+        
+        connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host)
+        timeout = aiohttp.ClientTimeout(total=10)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers={'User-Agent': USER_AGENT}) as session:
+            workers = [asyncio.create_task(worker(session)) for _ in range(concurrency)]
+            await to_visit.join()
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
     
     def save_to_json(self, filename: str = "docs_content.json") -> None:
         """Save crawled content to JSON file"""
@@ -215,34 +656,110 @@ class ImprovedGitBookCrawler:
         except Exception as e:
             print(f"✗ Error saving file: {str(e)}")
     
+    def save_state(self, filename: str) -> None:
+        """Save validators, hashes and links of this crawl's pages for the next incremental run"""
+        state = {url: self.page_state[url] for url in self.visited_urls if url in self.page_state}
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(state, f, ensure_ascii=False)
+            print(f"✓ Saved crawl state for {len(state)} pages to {filename}")
+        except Exception as e:
+            print(f"✗ Error saving crawl state: {str(e)}")
+    
+    def save_delta(self, filename: str) -> Dict[str, Any]:
+        """Save the changes since the last crawl, for bot/search_index.py --apply-delta"""
+        delta = self.build_delta()
+        try:
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(delta, f, ensure_ascii=False)
+            print(f"✓ Saved delta to {filename}: {len(delta['added'])} added, "
+                  f"{len(delta['changed'])} changed, {len(delta['removed'])} removed")
+        except Exception as e:
+            print(f"✗ Error saving delta: {str(e)}")
+        return delta
+    
     def get_stats(self) -> Dict[str, Any]:
         """Get crawling statistics"""
-        total_text_length = sum(len(doc['text']) for doc in self.docs_content.values())
-        total_headings = sum(len(doc['headings']) for doc in self.docs_content.values())
-        total_code_blocks = sum(len(doc['code_blocks']) for doc in self.docs_content.values())
-        
+        total_pages = len(self.content_urls)
         return {
-            'total_pages': len(self.docs_content),
-            'total_text_chars': total_text_length,
-            'total_headings': total_headings,
-            'total_code_blocks': total_code_blocks,
-            'avg_text_per_page': total_text_length // len(self.docs_content) if self.docs_content else 0
+            'total_pages': total_pages,
+            'total_text_chars': self.totals['text_chars'],
+            'total_headings': self.totals['headings'],
+            'total_code_blocks': self.totals['code_blocks'],
+            'avg_text_per_page': self.totals['text_chars'] // total_pages if total_pages else 0
         }
 
 
+_page_parsers: Dict[Tuple[str, bool], ImprovedGitBookCrawler] = {}
+
+
+def parse_page(html: str, url: str, base_url: str,
+               fast_extract: bool = True) -> Tuple[Optional[Dict[str, Any]], Set[str]]:
+    """Extract content and links from one page, runs in a parse worker process"""
+    key = (base_url, fast_extract)
+    parser = _page_parsers.get(key)
+    if parser is None:
+        parser = _page_parsers[key] = ImprovedGitBookCrawler(base_url, fast_extract)
+    return parser.parse_html(html, url)
+
+
 def main():
     """Main crawler function"""
+    parser = argparse.ArgumentParser(description="Crawl GitBook documentation into docs_content.json")
+    parser.add_argument('--url', default="https://docs.fastn.ai", help="Docs site to crawl")
+    parser.add_argument('--max-pages', type=int, default=1000)
+    parser.add_argument('--output', default=os.path.join(os.path.dirname(__file__), 'docs_content.json'),
+                        help="A .jsonl output is written page by page as the crawl goes")
+    parser.add_argument('--concurrent', action='store_true', help="Fetch many pages at once (needs aiohttp)")
+    parser.add_argument('--concurrency', type=int, default=16, help="Requests in flight")
+    parser.add_argument('--per-host', type=int, default=8, help="Most connections to one host")
+    parser.add_argument('--rate', type=float, default=10.0, help="Requests per second per host (0 = no limit)")
+    parser.add_argument('--parse-workers', type=int, default=None, help="HTML parsing processes")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only re-parse pages changed since the last crawl and write a delta")
+    parser.add_argument('--resume', action='store_true', help="Continue an interrupted .jsonl crawl")
+    parser.add_argument('--html-parser', action='store_true',
+                        help="Extract with BeautifulSoup's html.parser even if lxml is installed")
+    args = parser.parse_args()
+    
+    streaming = args.output.endswith('.jsonl')
+    if args.resume and not streaming:
+        parser.error("--resume needs a .jsonl --output")
+    if args.resume and args.incremental:
+        parser.error("--resume and --incremental cannot be combined")
+    
+    # Page state and delta live next to the output file
+    output_base = os.path.splitext(args.output)[0]
+    state_file = output_base + '.crawl_state.json'
+    delta_file = output_base + '.delta.json'
+    
     print("="*70)
     print("IMPROVED FASTN.AI DOCUMENTATION CRAWLER")
     print("="*70)
     
-    crawler = ImprovedGitBookCrawler("https://docs.fastn.ai")
+    crawler = ImprovedGitBookCrawler(args.url, fast_extract=not args.html_parser)
+    if args.incremental:
+        crawler.load_previous(args.output, state_file)
+    if streaming:
+        crawler.writer = JsonlCorpusWriter(args.output)
+        if args.resume and os.path.exists(args.output):
+            crawler.resume_from(JsonlCorpusWriter.read(args.output))
+        crawler.writer.open(resume=args.resume)
     
-    print("\nStarting crawl from: https://docs.fastn.ai")
+    print(f"\nStarting crawl from: {args.url}")
     print("This may take several minutes...")
     
     start_time = time.time()
-    crawler.crawl("https://docs.fastn.ai", max_pages=1000)
+    try:
+        if args.concurrent:
+            crawler.crawl_concurrent(args.url, max_pages=args.max_pages, concurrency=args.concurrency,
+                                     per_host=args.per_host, rate=args.rate, parse_workers=args.parse_workers)
+        else:
+            crawler.crawl(args.url, max_pages=args.max_pages)
+    finally:
+        # Every page streamed so far stays on disk, even if the crawl dies
+        if crawler.writer:
+            crawler.writer.close()
     elapsed = time.time() - start_time
     
     print("\n" + "="*70)
@@ -258,13 +775,22 @@ def main():
     print(f"  Average text per page: {stats['avg_text_per_page']:,} characters")
     print(f"  Time taken: {elapsed:.1f} seconds")
     print(f"  Pages per second: {stats['total_pages'] / elapsed:.2f}")
+    if args.incremental:
+        print(f"  Unchanged pages skipped: {crawler.unchanged_pages}")
     
     # Save to file
-    output_file = os.path.join(os.path.dirname(__file__), 'docs_content.json')
-    crawler.save_to_json(output_file)
+    if streaming:
+        print(f"\n✓ Streamed {crawler.writer.records} records to {args.output}")
+        print(f"  File size: {os.path.getsize(args.output) / 1024 / 1024:.2f} MB")
+    else:
+        crawler.save_to_json(args.output)
+    crawler.save_state(state_file)
+    if args.incremental:
+        crawler.save_delta(delta_file)
+        print(f"  Apply it to the search index with: python bot/search_index.py --apply-delta {delta_file}")
     
     print("\n" + "="*70)
-    print("DONE! You can now use the updated docs_content.json")
+    print(f"DONE! You can now use the updated {os.path.basename(args.output)}")
     print("="*70)
 
 
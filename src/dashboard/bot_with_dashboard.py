@@ -29,6 +29,16 @@ class DashboardBot(EdgeMeetBot):
         self.dashboard.message_sent()
         super().speak(text)
         
+    def speak_stream(self, sentences):
+        self.dashboard.message_sent()
+        
+        def logged(sentences):
+            for sentence in sentences:
+                self.log(f" Bot speaking: {sentence}", 'speaking')
+                yield sentence
+                
+        super().speak_stream(logged(sentences))
+        
     def _listen_continuously(self):
         self.log(" Listening for speech...", 'info')
         
@@ -2,7 +2,6 @@
 import asyncio
 import websockets
 import json
-import threading
 import queue
 from datetime import datetime
 
@@ -10,7 +9,7 @@ class DashboardServer:
     def __init__(self):
         self.clients = set()
         self.log_queue = queue.Queue()
-        self.bot_instance = None
+        self.session_manager = None
         self.running = False
         
     async def register(self, websocket):
@@ -67,6 +66,7 @@ class DashboardServer:
                 
     async def handle_client(self, websocket):
         await self.register(websocket)
+        self.update_sessions()
         try:
             async for message in websocket:
                 try:
@@ -76,24 +76,19 @@ class DashboardServer:
                     if action == 'start':
                         meet_url = data.get('url')
                         self.log(f"Starting bot for: {meet_url}", 'info')
-                        
-                        if not self.bot_instance or not hasattr(self.bot_instance, 'driver'):
-                            bot_thread = threading.Thread(
-                                target=self.run_bot_wrapper,
-                                args=(meet_url,),
-                                daemon=True
-                            )
-                            bot_thread.start()
-                        else:
-                            self.log("Bot is already running!", 'warning')
+                        # Sessions run on this event loop; blocking work goes to executors
+                        asyncio.create_task(self.launch_session(meet_url))
                             
                     elif action == 'stop':
-                        self.log("Stopping bot...", 'warning')
-                        if self.bot_instance:
-                            self.bot_instance.stop()
-                            self.bot_instance = None
-                            self.update_status('idle')
-                            self.log("Bot stopped", 'success')
+                        meet_url = data.get('url')
+                        if meet_url:
+                            self.log(f"Stopping bot for: {meet_url}", 'warning')
+                            if await self.session_manager.stop(meet_url):
+                                self.log("Bot stopped", 'success')
+                        else:
+                            self.log("Stopping all bots...", 'warning')
+                            await self.session_manager.stop_all()
+                            self.log("All bots stopped", 'success')
                         
                 except json.JSONDecodeError:
                     self.log("Invalid message format", 'error')
@@ -105,96 +100,129 @@ class DashboardServer:
         finally:
             await self.unregister(websocket)
             
-    def run_bot_wrapper(self, meet_url):
-        import sys
-        import os
-        import builtins
-        original_print = builtins.print
+    def trace_recorded(self, trace, latency):
+        """Push a finished question's stage timings and the running p50/p95 per stage"""
+        self.log_queue.put({
+            'type': 'trace',
+            'trace': trace,
+            'latency': latency
+        })
+    
+    def update_sessions(self):
+        """Push per-session status to the dashboard"""
+        if not self.session_manager:
+            return
+        sessions = self.session_manager.status()
+        self.log_queue.put({
+            'type': 'sessions',
+            'sessions': sessions
+        })
+        self.update_status('running' if sessions else 'idle')
+    
+    def create_bot(self, profile_dir, audio_devices):
+        """Build the bot for one meeting, counting its messages for the dashboard"""
+        from bot.ai_responder import get_responder
+        from bot.meetbot import EdgeMeetBot
         
+        bot = EdgeMeetBot(ai_responder=get_responder(), profile_dir=profile_dir, audio_devices=audio_devices)
+        
+        original_speak = bot.speak
+        def speak_with_counting(text):
+            self.message_sent()
+            return original_speak(text)
+        bot.speak = speak_with_counting
+        
+        original_speak_stream = bot.speak_stream
+        def speak_stream_with_counting(sentences):
+            self.message_sent()
+            return original_speak_stream(sentences)
+        bot.speak_stream = speak_stream_with_counting
+        
+        original_recognize = bot.recognizer.recognize_google
+        def recognize_with_counting(audio, *args, **kwargs):
+            result = original_recognize(audio, *args, **kwargs)
+            if result and result.strip():
+                self.user_message()
+            return result
+        bot.recognizer.recognize_google = recognize_with_counting
+        
+        return bot
+    
+    async def launch_session(self, meet_url):
         try:
-            
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            src_dir = os.path.dirname(current_dir)
-            sys.path.insert(0, src_dir)
-            
-            from bot.meetbot import EdgeMeetBot
-            
-            def dashboard_print(*args, **kwargs):
-                message = ' '.join(str(arg) for arg in args)
-                
-                level = 'info'
-                if '✅' in message or 'Successfully' in message or 'success' in message.lower():
-                    level = 'success'
-                    message = message.replace('✅', '').strip()
-                elif '❌' in message or 'Error' in message or 'error' in message.lower():
-                    level = 'error'
-                    message = message.replace('❌', '').strip()
-                elif '⚠️' in message or 'Warning' in message or 'warning' in message.lower():
-                    level = 'warning'
-                    message = message.replace('⚠️', '').strip()
-                elif '🗣️' in message or 'Bot speaking' in message:
-                    level = 'speaking'
-                    message = message.replace('🗣️', '').strip()
-                elif '👤' in message or 'User said' in message:
-                    level = 'user'
-                    message = message.replace('👤', '').strip()
-                
-                import re
-                message = re.sub(r'[🤖📹🔗🎯⏳🎮🔍🚀🎤🔊📊🎧💬🔁⏹️✅❌⚠️🗣️👤📋🔌🔄]', '', message).strip()
-                
-                if message and not message.startswith('['):  # Avoid duplicate timestamps
-                    self.log(message, level)
-                
-                original_print(*args, **kwargs)
-            
-            builtins.print = dashboard_print
-            
             self.log("Initializing bot...", 'info')
-            self.update_status('running')
-            
-            bot = EdgeMeetBot()
-            self.bot_instance = bot
-            
-            original_speak = bot.speak
-            def speak_with_counting(text):
-                self.message_sent()
-                return original_speak(text)
-            bot.speak = speak_with_counting
-            
-            original_recognize = bot.recognizer.recognize_google
-            def recognize_with_counting(audio, *args, **kwargs):
-                result = original_recognize(audio, *args, **kwargs)
-                if result and result.strip():
-                    self.user_message()
-                return result
-            bot.recognizer.recognize_google = recognize_with_counting
-            
+            await self.session_manager.launch(meet_url)
             self.log("Bot initialized successfully", 'success')
-            
-            bot.start(meet_url)
-            
-        except KeyboardInterrupt:
-            self.log("Bot stopped by user", 'warning')
-            self.update_status('idle')
+        except RuntimeError as e:
+            self.log(str(e), 'warning')
         except Exception as e:
             self.log(f"Bot error: {str(e)}", 'error')
-            self.update_status('error')
             import traceback
             traceback.print_exc()
-        finally:
-            builtins.print = original_print
-            self.bot_instance = None
-            self.update_status('idle')
+    
+    def install_print_hook(self):
+        """Mirror bot output into the dashboard logs, returns the original print"""
+        import builtins
+        original_print = builtins.print
+        
+        def dashboard_print(*args, **kwargs):
+            message = ' '.join(str(arg) for arg in args)
+            
+            level = 'info'
+            if '✅' in message or 'Successfully' in message or 'success' in message.lower():
+                level = 'success'
+                message = message.replace('✅', '').strip()
+            elif '❌' in message or 'Error' in message or 'error' in message.lower():
+                level = 'error'
+                message = message.replace('❌', '').strip()
+            elif '⚠️' in message or 'Warning' in message or 'warning' in message.lower():
+                level = 'warning'
+                message = message.replace('⚠️', '').strip()
+            elif '🗣️' in message or 'Bot speaking' in message:
+                level = 'speaking'
+                message = message.replace('🗣️', '').strip()
+            elif '👤' in message or 'User said' in message:
+                level = 'user'
+                message = message.replace('👤', '').strip()
             
+            import re
+            message = re.sub(r'[🤖📹🔗🎯⏳🎮🔍🚀🎤🔊📊🎧💬🔁⏹️✅❌⚠️🗣️👤📋🔌🔄]', '', message).strip()
+            
+            if message and not message.startswith('['):  # Avoid duplicate timestamps
+                self.log(message, level)
+            
+            original_print(*args, **kwargs)
+        
+        builtins.print = dashboard_print
+        return original_print
+    
     async def start_server(self):
+        import sys
+        import os
+        import builtins
+        
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        src_dir = os.path.dirname(current_dir)
+        sys.path.insert(0, src_dir)
+            
+        from bot.session_manager import SessionManager
+        from bot.tracing import get_tracer
+            
         self.running = True
+        get_tracer().add_listener(self.trace_recorded)
+        self.session_manager = SessionManager(bot_factory=self.create_bot, on_change=self.update_sessions)
+        original_print = self.install_print_hook()
         
         asyncio.create_task(self.process_queue())
         
-        async with websockets.serve(self.handle_client, "localhost", 8765):
-            self.log("Dashboard server started on ws://localhost:8765", 'success')
-            self.log("Open dashboard.html in your browser", 'info')
-            await asyncio.Future()
+        try:
+            async with websockets.serve(self.handle_client, "localhost", 8765):
+                self.log("Dashboard server started on ws://localhost:8765", 'success')
+                self.log("Open dashboard.html in your browser", 'info')
+                await asyncio.Future()
+        finally:
+            await self.session_manager.stop_all()
+            builtins.print = original_print
             
     def start(self):
         try: